@@ -1,3 +1,13 @@
-from .app import create_app
+from typing import Any
 
 __all__ = ["create_app"]
+
+
+def __getattr__(name: str) -> Any:
+    # Resolved lazily so lightweight submodules (config, startup) can be
+    # imported without pulling in FastAPI and the service layer.
+    if name == "create_app":
+        from .app import create_app
+
+        return create_app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
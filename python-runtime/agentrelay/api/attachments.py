@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status
+from pydantic import BaseModel
+
+from ..services.attachment_store import AttachmentTooLargeError
+from ..services.run_manager import RunManager
+from .runs import get_run_manager
+
+router = APIRouter(prefix="/attachments", tags=["attachments"])
+
+
+class AttachmentResponse(BaseModel):
+    attachmentId: str
+    size: int
+    contentType: str
+    deduplicated: bool = False
+
+
+@router.post("", status_code=status.HTTP_201_CREATED, response_model=AttachmentResponse)
+async def upload_attachment(
+    request: Request,
+    response: Response,
+    manager: RunManager = Depends(get_run_manager),
+    content_type: Optional[str] = Header(default=None, alias="Content-Type"),
+    content_length: Optional[int] = Header(default=None, alias="Content-Length"),
+) -> AttachmentResponse:
+    """Store the raw request body; runs reference it by ``attachmentId``.
+
+    Uploading bytes that are already stored answers 200 with the existing id.
+    """
+    store = manager.attachments
+    too_large = HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Attachment exceeds {store.max_attachment_bytes} bytes",
+    )
+    if content_length is not None and content_length > store.max_attachment_bytes:
+        raise too_large
+    try:
+        attachment, existed = await store.put(request.stream(), content_type)
+    except AttachmentTooLargeError:
+        raise too_large from None
+    if existed:
+        response.status_code = status.HTTP_200_OK
+    response.headers["Location"] = f"/attachments/{attachment.attachment_id}"
+    return AttachmentResponse(**attachment.summary(), deduplicated=existed)
+
+
+@router.get("/{attachment_id}", response_model=AttachmentResponse)
+async def get_attachment(attachment_id: str, manager: RunManager = Depends(get_run_manager)) -> AttachmentResponse:
+    attachment = manager.attachments.get(attachment_id)
+    if attachment is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Attachment not found")
+    return AttachmentResponse(**attachment.summary())
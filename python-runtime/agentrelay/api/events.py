@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import asyncio
+import uuid
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
+from pydantic import BaseModel, Field
+
+from ..services.event_mux import EventMux, EventSource, parse_cursor
+from ..services.events import encode_json
+from ..services.run_manager import RunManager, RunNotFoundError
+from ..services.workers import WorkerRouter
+from .forwarding import forward, get_worker_router, relay_events, remote_owner
+from .runs import get_run_manager
+from .sse import EncodedEventSourceResponse
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+# How often a client subscription looks for new runs owned by peer workers.
+PEER_DISCOVERY_INTERVAL_SEC = 1.0
+
+
+class StreamUpdateRequest(BaseModel):
+    add: List[str] = Field(default_factory=list)
+    remove: List[str] = Field(default_factory=list)
+
+
+class StreamUpdateResponse(BaseModel):
+    streamId: str
+    runs: List[str]
+    unknown: List[str] = Field(default_factory=list)
+
+
+def _open_streams(request: Request) -> Dict[str, EventMux]:
+    streams: Dict[str, EventMux] | None = getattr(request.app.state, "event_streams", None)
+    if streams is None:
+        streams = request.app.state.event_streams = {}
+    return streams
+
+
+def _event_source(manager: RunManager, workers: Optional[WorkerRouter]) -> EventSource:
+    def source(run_id: str, last_event_id: Optional[int]):
+        owner = remote_owner(workers, run_id)
+        if owner is None:
+            return manager.stream_events(run_id, last_event_id)
+        return relay_events(workers, owner, run_id, last_event_id)
+
+    return source
+
+
+async def _run_exists(manager: RunManager, workers: Optional[WorkerRouter], run_id: str) -> bool:
+    owner = remote_owner(workers, run_id)
+    if owner is not None:
+        response = await forward(workers, owner, "GET", f"/runs/{run_id}")
+        return response.status_code == status.HTTP_200_OK
+    try:
+        await manager.ensure_run_exists(run_id)
+    except RunNotFoundError:
+        return False
+    return True
+
+
+async def _discover_peer_runs(mux: EventMux, workers: WorkerRouter, client_id: str) -> None:
+    while True:
+        for _, peer in await workers.gather("/runs", {"clientId": client_id}):
+            for run in peer["runs"]:
+                mux.add(run["runId"], ephemeral=True)
+        await asyncio.sleep(PEER_DISCOVERY_INTERVAL_SEC)
+
+
+@router.get("")
+async def stream_events(
+    request: Request,
+    runs: Optional[str] = Query(default=None, description="Comma-separated run ids"),
+    clientId: Optional[str] = None,
+    manager: RunManager = Depends(get_run_manager),
+    workers: Optional[WorkerRouter] = Depends(get_worker_router),
+    last_event_id: Optional[str] = Header(default=None, alias="Last-Event-ID"),
+) -> EncodedEventSourceResponse:
+    run_ids = list(dict.fromkeys(run_id for run_id in (runs or "").split(",") if run_id))
+    if not run_ids and clientId is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="runs or clientId is required")
+    try:
+        cursors = parse_cursor(last_event_id) if last_event_id else {}
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid Last-Event-ID") from None
+    unknown = [run_id for run_id in run_ids if not await _run_exists(manager, workers, run_id)]
+    if unknown:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Runs not found: {', '.join(unknown)}")
+
+    stream_id = uuid.uuid4().hex
+    if workers:
+        stream_id = f"{workers.topology.index}-{stream_id}"
+    mux = EventMux(_event_source(manager, workers), persistent=clientId is not None, stream_id=stream_id)
+    streams = _open_streams(request)
+
+    async def event_publisher():
+        # Everything that needs cleaning up is set up here, once the response
+        # is actually being sent.
+        for run_id in run_ids:
+            mux.add(run_id, cursors.get(run_id))
+        for run_id, event_id in cursors.items():
+            mux.add(run_id, event_id, ephemeral=clientId is not None)
+        unsubscribe = discovery = None
+        if clientId is not None:
+            for run in manager.list_runs(client_id=clientId):
+                mux.add(run["runId"], ephemeral=True)
+            unsubscribe = manager.subscribe_runs(
+                lambda run_id, client_id: client_id == clientId and mux.add(run_id, ephemeral=True)
+            )
+            if workers:
+                discovery = asyncio.create_task(_discover_peer_runs(mux, workers, clientId))
+        streams[mux.stream_id] = mux
+        try:
+            # The only frame carrying the composite cursor: a client that
+            # reconnects before any run event resumes every run from here.
+            opened = {"streamId": mux.stream_id, "runs": mux.runs, "cursor": mux.cursor}
+            frame_id = f"id: {mux.cursor}\r\n" if mux.cursor else ""
+            yield f"{frame_id}event: stream.opened\r\ndata: {encode_json(opened)}\r\n\r\n".encode("utf-8")
+            async for run_id, event in mux.events():
+                yield event.encode_as(mux.run_cursor(run_id))
+        finally:
+            streams.pop(mux.stream_id, None)
+            if unsubscribe is not None:
+                unsubscribe()
+            if discovery is not None:
+                discovery.cancel()
+
+    return EncodedEventSourceResponse(event_publisher(), write_latency=manager.metrics.sse_write)
+
+
+@router.post("/{stream_id}", response_model=StreamUpdateResponse)
+async def update_stream(
+    stream_id: str,
+    body: StreamUpdateRequest,
+    request: Request,
+    manager: RunManager = Depends(get_run_manager),
+    workers: Optional[WorkerRouter] = Depends(get_worker_router),
+) -> StreamUpdateResponse:
+    if workers:
+        owner, _, _ = stream_id.partition("-")
+        if owner.isdigit() and int(owner) != workers.topology.index and int(owner) < workers.topology.count:
+            return await forward(workers, int(owner), "POST", f"/events/{stream_id}", json=body.model_dump())
+    mux = _open_streams(request).get(stream_id)
+    if mux is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Stream not found")
+    unknown = []
+    for run_id in body.add:
+        if await _run_exists(manager, workers, run_id):
+            mux.add(run_id)
+        else:
+            unknown.append(run_id)
+    for run_id in body.remove:
+        mux.remove(run_id)
+    return StreamUpdateResponse(streamId=stream_id, runs=mux.runs, unknown=unknown)
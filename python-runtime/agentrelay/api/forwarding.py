@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from typing import Any, AsyncIterator, Optional
+
+from fastapi import HTTPException, Request, status
+from fastapi.responses import Response, StreamingResponse
+
+from ..services.event_mux import parse_sse
+from ..services.events import RelayedEvent
+from ..services.workers import FORWARDED_HEADER, WorkerRouter, WorkerUnavailableError
+
+# Response headers worth relaying from the owning worker.
+_RELAYED_HEADERS = ("location", "retry-after", "cache-control", "x-accel-buffering")
+
+
+def get_worker_router(request: Request) -> Optional[WorkerRouter]:
+    """The peer router, or ``None`` when this request must be served locally.
+
+    Single-process mode has no router; a request forwarded by a peer carries
+    ``FORWARDED_HEADER`` and is never forwarded again.
+    """
+    router: WorkerRouter | None = getattr(request.app.state, "worker_router", None)
+    if router is None or FORWARDED_HEADER in request.headers:
+        return None
+    return router
+
+
+def remote_owner(router: Optional[WorkerRouter], run_id: str) -> Optional[int]:
+    """Index of the worker owning ``run_id`` if it is not this one."""
+    if router is None:
+        return None
+    owner = router.topology.owner(run_id)
+    return None if owner == router.topology.index else owner
+
+
+async def forward(router: WorkerRouter, index: int, method: str, path: str, **kwargs: Any) -> Response:
+    try:
+        upstream = await router.send(index, method, path, **kwargs)
+    except WorkerUnavailableError as exc:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(exc)) from exc
+    return Response(
+        content=upstream.content,
+        status_code=upstream.status_code,
+        headers=_relayed_headers(upstream.headers),
+        media_type=upstream.headers.get("content-type"),
+    )
+
+
+async def forward_stream(router: WorkerRouter, index: int, path: str, **kwargs: Any) -> Response:
+    """Relay an SSE stream from the owning worker byte for byte."""
+    try:
+        upstream = await router.send(index, "GET", path, stream=True, **kwargs)
+    except WorkerUnavailableError as exc:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(exc)) from exc
+    if upstream.status_code != status.HTTP_200_OK:
+        await upstream.aread()
+        await upstream.aclose()
+        return Response(
+            content=upstream.content,
+            status_code=upstream.status_code,
+            media_type=upstream.headers.get("content-type"),
+        )
+
+    async def relay():
+        try:
+            async for chunk in upstream.aiter_raw():
+                yield chunk
+        finally:
+            await upstream.aclose()
+
+    return StreamingResponse(
+        relay(),
+        headers=_relayed_headers(upstream.headers),
+        media_type=upstream.headers.get("content-type"),
+    )
+
+
+async def relay_events(
+    router: WorkerRouter, index: int, run_id: str, last_event_id: Optional[int] = None
+) -> AsyncIterator[RelayedEvent]:
+    """A run's events read from its owning worker, for multiplexed streams."""
+    headers = {"Last-Event-ID": str(last_event_id)} if last_event_id else None
+    upstream = await router.send(index, "GET", f"/runs/{run_id}/events", stream=True, headers=headers)
+    try:
+        if upstream.status_code != status.HTTP_200_OK:
+            return
+        async for event in parse_sse(upstream.aiter_lines()):
+            yield event
+    finally:
+        await upstream.aclose()
+
+
+def _relayed_headers(headers: Any) -> dict[str, str]:
+    return {name: headers[name] for name in _RELAYED_HEADERS if name in headers}
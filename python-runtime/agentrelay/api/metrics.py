@@ -0,0 +1,35 @@
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+
+from ..services.metrics import merge_expositions
+from ..services.run_manager import RunManager
+from ..services.workers import WorkerRouter, WorkerUnavailableError
+from .forwarding import get_worker_router
+from .runs import get_run_manager
+
+router = APIRouter(tags=["metrics"])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics(
+    manager: RunManager = Depends(get_run_manager),
+    workers: Optional[WorkerRouter] = Depends(get_worker_router),
+) -> PlainTextResponse:
+    text = manager.render_metrics()
+    if workers:
+
+        async def fetch(index: int) -> Optional[str]:
+            try:
+                response = await workers.send(index, "GET", "/metrics")
+            except WorkerUnavailableError:
+                return None
+            return response.text if response.status_code == 200 else None
+
+        peers = await asyncio.gather(*(fetch(index) for index in workers.topology.peers()))
+        text = merge_expositions([text, *(peer for peer in peers if peer is not None)])
+    return PlainTextResponse(text, media_type=PROMETHEUS_CONTENT_TYPE)
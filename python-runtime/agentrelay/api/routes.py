@@ -1,7 +1,11 @@
 from fastapi import APIRouter, FastAPI
 
 from ..config import AgentRelaySettings
+from .attachments import router as attachments_router
+from .events import router as events_router
+from .metrics import router as metrics_router
 from .runs import router as runs_router
+from .sessions import router as sessions_router
 from .settings import router as settings_router
 from .status import router as status_router
 
@@ -11,6 +15,10 @@ def register_routes(app: FastAPI, settings: AgentRelaySettings) -> None:
     api_router.include_router(status_router, prefix="/status", tags=["status"])
     api_router.include_router(settings_router)
     api_router.include_router(runs_router)
+    api_router.include_router(events_router)
+    api_router.include_router(sessions_router)
+    api_router.include_router(attachments_router)
+    api_router.include_router(metrics_router)
 
     app.dependency_overrides.setdefault(AgentRelaySettings, lambda: settings)
     app.include_router(api_router)
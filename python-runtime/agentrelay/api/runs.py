@@ -1,13 +1,22 @@
 from __future__ import annotations
 
 import uuid
-from typing import Any, Dict, List, Literal, Optional
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Literal, Optional, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status
 from pydantic import BaseModel, Field
-from sse_starlette.sse import EventSourceResponse
 
+from ..config import AgentRelaySettings
+from ..services.admission import TooManyRunsError
+from ..services.attachment_store import AttachmentNotFoundError
 from ..services.run_manager import RunManager, RunNotFoundError
+from ..services.session_store import SessionBusyError
+from ..services.tool_calls import ToolCallClosedError, ToolCallNotFoundError
+from ..services.workers import WorkerRouter
+from .forwarding import forward, forward_stream, get_worker_router, remote_owner
+from .settings import get_settings
+from .sse import EncodedEventSourceResponse
 
 router = APIRouter(prefix="/runs", tags=["runs"])
 
@@ -28,18 +37,36 @@ class ToolDefinition(BaseModel):
     id: str
     name: Optional[str] = None
     timeoutSec: Optional[int] = Field(default=None, ge=1)
+    description: Optional[str] = None
+    # JSON Schema of the arguments, passed to the model as the function parameters.
+    parameters: Optional[Dict[str, Any]] = None
+
+
+class DeltaCoalescing(BaseModel):
+    mode: Literal["off", "coalesce"] = "coalesce"
+    flushIntervalMs: Optional[int] = Field(default=None, ge=1, le=1000)
+    flushBytes: Optional[int] = Field(default=None, ge=1)
+    flushOnSentence: Optional[bool] = None
+    immediateFirst: Optional[bool] = None
 
 
 class Constraints(BaseModel):
     allowNetwork: Optional[bool] = None
-    maxToolConcurrency: Optional[int] = None
+    maxToolConcurrency: Optional[int] = Field(default=None, ge=1)
     temperature: Optional[float] = Field(default=None, ge=0.0, le=2.0)
+    cache: Optional[bool] = None
+    deltaCoalescing: Optional[DeltaCoalescing] = None
+    slowConsumerPolicy: Optional[Literal["block", "coalesce", "drop"]] = None
 
 
 class CreateRunRequest(BaseModel):
     runId: Optional[str] = None
+    # With a session, conversation carries only the new turn; history is kept server-side.
+    sessionId: Optional[str] = Field(default=None, min_length=1)
     recordId: Optional[str] = None
     prompt: Optional[str] = None
+    # An attachmentId returned by POST /attachments.
+    imageReference: Optional[str] = None
     agentId: Optional[str] = None
     locale: Optional[str] = None
     conversation: List[ConversationMessage] = Field(default_factory=list)
@@ -53,48 +80,410 @@ class CreateRunResponse(BaseModel):
     status: Literal["accepted"] = "accepted"
 
 
+class RunStatusResponse(BaseModel):
+    runId: str
+    status: Literal["queued", "running", "completed", "failed", "cancelled"]
+    agentId: Optional[str] = None
+    clientId: Optional[str] = None
+    sessionId: Optional[str] = None
+    response: Optional[str] = None
+    metadata: Optional[Dict[str, Any]] = None
+    errorCode: Optional[str] = None
+    message: Optional[str] = None
+
+
+class ToolResultRequest(BaseModel):
+    status: Literal["ok", "error", "timeout"]
+    exitCode: Optional[int] = None
+    stdout: Optional[str] = None
+    stderr: Optional[str] = None
+    durationMs: Optional[float] = Field(default=None, ge=0)
+
+
+class ToolProgressRequest(BaseModel):
+    streamChunk: str
+
+
+class RunListResponse(BaseModel):
+    runs: List[RunStatusResponse]
+
+
+class BatchRunResult(BaseModel):
+    runId: str
+    status: int
+    eventsUrl: Optional[str] = None
+    errorCode: Optional[str] = None
+    retryAfterSec: Optional[int] = None
+
+
+class CreateRunBatchResponse(BaseModel):
+    accepted: int
+    runs: List[BatchRunResult]
+
+
+def _run_payload(request: CreateRunRequest, run_id: str, client_id: Optional[str]) -> Dict[str, Any]:
+    payload = request.model_dump(exclude_none=True)
+    payload["runId"] = run_id
+    client_id = client_id or request.metadata.get("clientId")
+    if isinstance(client_id, str) and client_id:
+        payload["clientId"] = client_id
+    return payload
+
+
 @router.post("", status_code=status.HTTP_202_ACCEPTED, response_model=CreateRunResponse)
 async def create_run(
     request: CreateRunRequest,
     response: Response,
     manager: RunManager = Depends(get_run_manager),
+    workers: Optional[WorkerRouter] = Depends(get_worker_router),
+    client_id: Optional[str] = Header(default=None, alias="X-AgentRelay-Client"),
 ) -> CreateRunResponse:
-    run_id = request.runId or str(uuid.uuid4())
-    payload = request.model_dump(exclude_none=True)
-    payload["runId"] = run_id
-
+    run_id = request.runId or _new_run_id(workers, request.sessionId)
+    _check_session_placement(workers, [run_id], [request])
+    owner = remote_owner(workers, run_id)
+    if owner is not None:
+        headers = {"X-AgentRelay-Client": client_id} if client_id else None
+        body = request.model_copy(update={"runId": run_id}).model_dump(mode="json", exclude_none=True)
+        return await forward(workers, owner, "POST", "/runs", json=body, headers=headers)
     try:
-        await manager.create_run(run_id, payload)
+        await manager.create_run(run_id, _run_payload(request, run_id, client_id))
     except ValueError:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Run already exists") from None
+    except SessionBusyError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={"errorCode": "SESSION_BUSY", "runId": exc.run_id},
+        ) from None
+    except AttachmentNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail={"errorCode": "ATTACHMENT_NOT_FOUND", "imageReference": request.imageReference},
+        ) from None
+    except TooManyRunsError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail={"errorCode": "TOO_MANY_RUNS", "retryAfterSec": exc.retry_after_sec},
+            headers={"Retry-After": str(exc.retry_after_sec)},
+        ) from None
 
     response.headers["Location"] = f"/runs/{run_id}/events"
     return CreateRunResponse(runId=run_id)
 
 
+@router.post(":batch", response_model=CreateRunBatchResponse, response_model_exclude_none=True)
+async def create_run_batch(
+    requests: List[CreateRunRequest],
+    response: Response,
+    mode: Literal["atomic", "partial"] = "partial",
+    manager: RunManager = Depends(get_run_manager),
+    workers: Optional[WorkerRouter] = Depends(get_worker_router),
+    settings: AgentRelaySettings = Depends(get_settings),
+    client_id: Optional[str] = Header(default=None, alias="X-AgentRelay-Client"),
+) -> CreateRunBatchResponse:
+    """Create several runs with one request.
+
+    ``partial`` creates every run that can be created and reports the rest
+    with their own status codes (207 if any failed). ``atomic`` creates all
+    runs or none, answering 409 or 429 with the per-run reasons.
+    """
+    if not requests:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Batch is empty")
+    if len(requests) > settings.max_batch_runs:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch exceeds {settings.max_batch_runs} runs",
+        )
+
+    run_ids = [request.runId or _new_run_id(workers, request.sessionId) for request in requests]
+    _check_session_placement(workers, run_ids, requests)
+    owners = [remote_owner(workers, run_id) for run_id in run_ids]
+    if workers and any(owner is not None for owner in owners):
+        return await _split_batch(requests, run_ids, owners, mode, manager, workers, client_id, response)
+
+    code, batch, retry_after = await _create_batch(manager, requests, run_ids, mode, client_id)
+    response.status_code = code
+    if retry_after is not None:
+        response.headers["Retry-After"] = str(retry_after)
+    return batch
+
+
+async def _create_batch(
+    manager: RunManager,
+    requests: List[CreateRunRequest],
+    run_ids: List[str],
+    mode: str,
+    client_id: Optional[str],
+) -> Tuple[int, CreateRunBatchResponse, Optional[int]]:
+    """Create a batch of locally owned runs; returns (status, body, Retry-After)."""
+    items = [(run_id, _run_payload(request, run_id, client_id)) for request, run_id in zip(requests, run_ids)]
+    # Queued runs of one batch share an admission group and take turns with
+    # other clients' runs rather than queueing ahead of them all.
+    group = client_id or f"batch:{uuid.uuid4()}"
+    errors = await manager.create_runs(items, atomic=mode == "atomic", group=group)
+
+    results = [_batch_result(run_id, error) for run_id, error in zip(run_ids, errors)]
+    failed = [result for result in results if result.status != status.HTTP_202_ACCEPTED]
+    if not failed:
+        return status.HTTP_202_ACCEPTED, CreateRunBatchResponse(accepted=len(results), runs=results), None
+    if mode != "atomic":
+        batch = CreateRunBatchResponse(accepted=len(results) - len(failed), runs=results)
+        return status.HTTP_207_MULTI_STATUS, batch, None
+
+    for result in results:
+        if result.status == status.HTTP_202_ACCEPTED:
+            result.status = status.HTTP_424_FAILED_DEPENDENCY
+            result.eventsUrl = None
+            result.errorCode = "BATCH_ABORTED"
+    batch = CreateRunBatchResponse(accepted=0, runs=results)
+    if any(result.status == status.HTTP_409_CONFLICT for result in failed):
+        return status.HTTP_409_CONFLICT, batch, None
+    return status.HTTP_429_TOO_MANY_REQUESTS, batch, max(result.retryAfterSec or 1 for result in failed)
+
+
+def _new_run_id(workers: Optional[WorkerRouter], session_id: Optional[str]) -> str:
+    if workers is None:
+        return str(uuid.uuid4())
+    # A session lives on one worker, so its runs are minted there.
+    return workers.topology.new_run_id(workers.topology.owner(session_id) if session_id else None)
+
+
+def _check_session_placement(
+    workers: Optional[WorkerRouter], run_ids: List[str], requests: List[CreateRunRequest]
+) -> None:
+    if workers is None:
+        return
+    topology = workers.topology
+    for run_id, request in zip(run_ids, requests):
+        if request.sessionId and topology.owner(run_id) != topology.owner(request.sessionId):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"runId {run_id} cannot join session {request.sessionId}; omit runId to have one assigned",
+            )
+
+
+def _batch_result(run_id: str, error: Optional[Exception]) -> BatchRunResult:
+    if error is None:
+        return BatchRunResult(runId=run_id, status=status.HTTP_202_ACCEPTED, eventsUrl=f"/runs/{run_id}/events")
+    if isinstance(error, TooManyRunsError):
+        return BatchRunResult(
+            runId=run_id,
+            status=status.HTTP_429_TOO_MANY_REQUESTS,
+            errorCode="TOO_MANY_RUNS",
+            retryAfterSec=error.retry_after_sec,
+        )
+    if isinstance(error, AttachmentNotFoundError):
+        return BatchRunResult(
+            runId=run_id, status=status.HTTP_422_UNPROCESSABLE_ENTITY, errorCode="ATTACHMENT_NOT_FOUND"
+        )
+    if isinstance(error, SessionBusyError):
+        return BatchRunResult(runId=run_id, status=status.HTTP_409_CONFLICT, errorCode="SESSION_BUSY")
+    return BatchRunResult(runId=run_id, status=status.HTTP_409_CONFLICT, errorCode="RUN_EXISTS")
+
+
+async def _split_batch(
+    requests: List[CreateRunRequest],
+    run_ids: List[str],
+    owners: List[Optional[int]],
+    mode: str,
+    manager: RunManager,
+    workers: WorkerRouter,
+    client_id: Optional[str],
+    response: Response,
+) -> Any:
+    """Create a batch naming runs owned by other workers as one sub-batch per owner."""
+    local = workers.topology.index
+    by_owner: Dict[int, List[int]] = {}
+    for position, owner in enumerate(owners):
+        by_owner.setdefault(local if owner is None else owner, []).append(position)
+    if mode == "atomic":
+        if len(by_owner) > 1:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="An atomic batch can only name runIds owned by a single worker",
+            )
+        owner = next(iter(by_owner))
+        return await forward(
+            workers,
+            owner,
+            "POST",
+            "/runs:batch",
+            params={"mode": mode},
+            json=_forwarded_batch(requests, run_ids, range(len(requests))),
+            headers={"X-AgentRelay-Client": client_id} if client_id else None,
+        )
+
+    results: List[Optional[BatchRunResult]] = [None] * len(requests)
+    for owner, positions in by_owner.items():
+        if owner == local:
+            _, batch, _ = await _create_batch(
+                manager, [requests[p] for p in positions], [run_ids[p] for p in positions], mode, client_id
+            )
+        else:
+            try:
+                forwarded = await forward(
+                    workers,
+                    owner,
+                    "POST",
+                    "/runs:batch",
+                    params={"mode": mode},
+                    json=_forwarded_batch(requests, run_ids, positions),
+                    headers={"X-AgentRelay-Client": client_id} if client_id else None,
+                )
+            except HTTPException as exc:
+                forwarded = Response(status_code=exc.status_code)
+            if forwarded.status_code in (status.HTTP_202_ACCEPTED, status.HTTP_207_MULTI_STATUS):
+                batch = CreateRunBatchResponse.model_validate_json(forwarded.body)
+            else:
+                # The rest of the batch may already exist, so report the
+                # owner's failure per run instead of failing the request.
+                failure = [
+                    BatchRunResult(runId=run_ids[p], status=forwarded.status_code, errorCode="WORKER_UNAVAILABLE")
+                    for p in positions
+                ]
+                batch = CreateRunBatchResponse(accepted=0, runs=failure)
+        for position, result in zip(positions, batch.runs):
+            results[position] = result
+    merged = [result for result in results if result is not None]
+    accepted = sum(result.status == status.HTTP_202_ACCEPTED for result in merged)
+    response.status_code = status.HTTP_202_ACCEPTED if accepted == len(merged) else status.HTTP_207_MULTI_STATUS
+    return CreateRunBatchResponse(accepted=accepted, runs=merged)
+
+
+def _forwarded_batch(requests: List[CreateRunRequest], run_ids: List[str], positions: Any) -> List[Dict[str, Any]]:
+    return [
+        requests[position].model_copy(update={"runId": run_ids[position]}).model_dump(mode="json", exclude_none=True)
+        for position in positions
+    ]
+
+
+@router.get("", response_model=RunListResponse, response_model_exclude_none=True)
+async def list_runs(
+    state: Optional[Literal["queued", "running"]] = None,
+    agentId: Optional[str] = None,
+    clientId: Optional[str] = None,
+    manager: RunManager = Depends(get_run_manager),
+    workers: Optional[WorkerRouter] = Depends(get_worker_router),
+) -> RunListResponse:
+    runs = manager.list_runs(state=state, agent_id=agentId, client_id=clientId)
+    if workers:
+        params = {key: value for key, value in (("state", state), ("agentId", agentId), ("clientId", clientId)) if value}
+        for _, peer in await workers.gather("/runs", params):
+            runs.extend(peer["runs"])
+    return RunListResponse(runs=[RunStatusResponse(**run) for run in runs])
+
+
+@router.get("/{run_id}", response_model=RunStatusResponse, response_model_exclude_none=True)
+async def get_run(
+    run_id: str,
+    manager: RunManager = Depends(get_run_manager),
+    workers: Optional[WorkerRouter] = Depends(get_worker_router),
+) -> RunStatusResponse:
+    owner = remote_owner(workers, run_id)
+    if owner is not None:
+        return await forward(workers, owner, "GET", f"/runs/{run_id}")
+    try:
+        summary = await manager.get_run(run_id)
+    except RunNotFoundError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Run not found") from exc
+    return RunStatusResponse(**summary)
+
+
 @router.get("/{run_id}/events")
-async def stream_run_events(run_id: str, manager: RunManager = Depends(get_run_manager)) -> EventSourceResponse:
+async def stream_run_events(
+    run_id: str,
+    manager: RunManager = Depends(get_run_manager),
+    workers: Optional[WorkerRouter] = Depends(get_worker_router),
+    last_event_id: Optional[str] = Header(default=None, alias="Last-Event-ID"),
+) -> EncodedEventSourceResponse:
+    owner = remote_owner(workers, run_id)
+    if owner is not None:
+        headers = {"Last-Event-ID": last_event_id} if last_event_id is not None else None
+        return await forward_stream(workers, owner, f"/runs/{run_id}/events", headers=headers)
     try:
         await manager.ensure_run_exists(run_id)
     except RunNotFoundError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Run not found") from exc
 
-    event_generator = manager.stream_events(run_id)
+    event_generator = manager.stream_events(run_id, _parse_last_event_id(last_event_id))
 
     async def event_publisher():
         try:
             async for event in event_generator:
-                yield event
+                yield event.encode()
         except RunNotFoundError as exc:  # pragma: no cover - cleanup
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Run not found") from exc
 
-    return EventSourceResponse(event_publisher())
+    return EncodedEventSourceResponse(event_publisher(), write_latency=manager.metrics.sse_write)
+
+
+def _parse_last_event_id(value: Optional[str]) -> Optional[int]:
+    if value is None:
+        return None
+    try:
+        return int(value.strip())
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid Last-Event-ID") from None
 
 
 @router.post("/{run_id}/cancel", status_code=status.HTTP_202_ACCEPTED)
-async def cancel_run(run_id: str, manager: RunManager = Depends(get_run_manager)) -> dict[str, str]:
+async def cancel_run(
+    run_id: str,
+    manager: RunManager = Depends(get_run_manager),
+    workers: Optional[WorkerRouter] = Depends(get_worker_router),
+) -> dict[str, str]:
+    owner = remote_owner(workers, run_id)
+    if owner is not None:
+        return await forward(workers, owner, "POST", f"/runs/{run_id}/cancel")
     try:
         await manager.cancel_run(run_id)
     except RunNotFoundError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Run not found") from exc
     return {"runId": run_id, "status": "cancelling"}
+
+
+@router.post("/{run_id}/tools/{tool_call_id}")
+async def submit_tool_result(
+    run_id: str,
+    tool_call_id: str,
+    result: ToolResultRequest,
+    manager: RunManager = Depends(get_run_manager),
+    workers: Optional[WorkerRouter] = Depends(get_worker_router),
+) -> dict[str, str]:
+    owner = remote_owner(workers, run_id)
+    if owner is not None:
+        body = result.model_dump(mode="json", exclude_none=True)
+        return await forward(workers, owner, "POST", f"/runs/{run_id}/tools/{tool_call_id}", json=body)
+    with _tool_call_errors():
+        manager.submit_tool_result(run_id, tool_call_id, result.model_dump(exclude_none=True))
+    return {"runId": run_id, "toolCallId": tool_call_id, "status": "accepted"}
+
+
+@router.post("/{run_id}/tools/{tool_call_id}/progress", status_code=status.HTTP_202_ACCEPTED)
+async def report_tool_progress(
+    run_id: str,
+    tool_call_id: str,
+    progress: ToolProgressRequest,
+    manager: RunManager = Depends(get_run_manager),
+    workers: Optional[WorkerRouter] = Depends(get_worker_router),
+) -> dict[str, str]:
+    owner = remote_owner(workers, run_id)
+    if owner is not None:
+        body = progress.model_dump(mode="json")
+        return await forward(workers, owner, "POST", f"/runs/{run_id}/tools/{tool_call_id}/progress", json=body)
+    with _tool_call_errors():
+        manager.report_tool_progress(run_id, tool_call_id, progress.streamChunk)
+    return {"runId": run_id, "toolCallId": tool_call_id, "status": "accepted"}
+
+
+@contextmanager
+def _tool_call_errors() -> Iterator[None]:
+    try:
+        yield
+    except RunNotFoundError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Run not found") from exc
+    except ToolCallNotFoundError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tool call not found") from exc
+    except ToolCallClosedError as exc:
+        # A timed-out call is gone for good; a call that already has its result is a conflict.
+        code = status.HTTP_409_CONFLICT if exc.error_code == "TOOL_RESULT_RECEIVED" else status.HTTP_410_GONE
+        raise HTTPException(status_code=code, detail={"errorCode": exc.error_code}) from None
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from pydantic import BaseModel
+
+from ..services.run_manager import RunManager
+from ..services.workers import WorkerRouter
+from .forwarding import forward, get_worker_router, remote_owner
+from .runs import get_run_manager
+
+router = APIRouter(prefix="/sessions", tags=["sessions"])
+
+
+class SessionResponse(BaseModel):
+    sessionId: str
+    messages: int
+    droppedMessages: int
+    windowTokens: int
+    activeRunId: Optional[str] = None
+
+
+@router.get("/{session_id}", response_model=SessionResponse, response_model_exclude_none=True)
+async def get_session(
+    session_id: str,
+    manager: RunManager = Depends(get_run_manager),
+    workers: Optional[WorkerRouter] = Depends(get_worker_router),
+) -> SessionResponse:
+    owner = remote_owner(workers, session_id)
+    if owner is not None:
+        return await forward(workers, owner, "GET", f"/sessions/{session_id}")
+    session = manager.sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found")
+    return SessionResponse(**session.summary())
+
+
+@router.delete("/{session_id}", status_code=status.HTTP_204_NO_CONTENT, response_class=Response)
+async def delete_session(
+    session_id: str,
+    manager: RunManager = Depends(get_run_manager),
+    workers: Optional[WorkerRouter] = Depends(get_worker_router),
+) -> Response:
+    owner = remote_owner(workers, session_id)
+    if owner is not None:
+        return await forward(workers, owner, "DELETE", f"/sessions/{session_id}")
+    if not manager.sessions.delete(session_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found")
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
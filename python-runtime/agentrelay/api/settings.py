@@ -24,6 +24,12 @@ def get_settings(request: Request) -> AgentRelaySettings:
     return settings
 
 
+def _persist_for_peers(request: Request, store: SettingsStore) -> None:
+    # Other worker processes read settings.json, so skip the coalescing delay.
+    if getattr(request.app.state, "worker_router", None) is not None:
+        store.flush()
+
+
 class DeepSeekSettingsPayload(BaseModel):
     apiKey: str | None = None
     baseUrl: str | None = None
@@ -51,10 +57,12 @@ async def get_deepseek_settings(
 @router.post("/deepseek", response_model=DeepSeekSettingsResponse)
 async def set_deepseek_settings(
     payload: DeepSeekSettingsPayload,
+    request: Request,
     settings: AgentRelaySettings = Depends(get_settings),
     store: SettingsStore = Depends(get_settings_store),
 ) -> DeepSeekSettingsResponse:
     store.set_deepseek_settings(payload.apiKey, payload.baseUrl)
+    _persist_for_peers(request, store)
     resolved = store.get_deepseek_settings(default_base=settings.deepseek_api_base)
     return DeepSeekSettingsResponse(
         apiKeySet=bool(resolved.get("apiKey")),
@@ -65,8 +73,10 @@ async def set_deepseek_settings(
 
 @router.delete("/deepseek", response_model=DeepSeekSettingsResponse)
 async def reset_deepseek_settings(
+    request: Request,
     settings: AgentRelaySettings = Depends(get_settings),
     store: SettingsStore = Depends(get_settings_store),
 ) -> DeepSeekSettingsResponse:
     store.set_deepseek_settings(None, settings.deepseek_api_base)
+    _persist_for_peers(request, store)
     return DeepSeekSettingsResponse(apiKeySet=False, apiKey=None, baseUrl=settings.deepseek_api_base)
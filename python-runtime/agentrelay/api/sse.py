@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import time
+from typing import Any, AsyncIterable, Optional
+
+from sse_starlette.sse import EventSourceResponse
+from starlette.types import Send
+
+from ..services.metrics import Histogram
+
+
+class EncodedEventSourceResponse(EventSourceResponse):
+    """EventSourceResponse for bodies that already yield complete SSE frames.
+
+    The stock ``stream_response`` re-checks every chunk and formats a debug log
+    line per event; run events arrive pre-encoded, so they are sent as-is.
+    When ``write_latency`` is given, the time spent in each ``send`` is observed.
+    """
+
+    body_iterator: AsyncIterable[bytes]
+
+    def __init__(self, *args: Any, write_latency: Optional[Histogram] = None, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._write_latency = write_latency
+
+    async def stream_response(self, send: Send) -> None:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            }
+        )
+        histogram = self._write_latency
+        async for chunk in self.body_iterator:
+            if histogram is None:
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                continue
+            started = time.perf_counter()
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            histogram.observe(time.perf_counter() - started)
+
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
@@ -5,7 +5,10 @@ from fastapi import APIRouter, Depends, HTTPException, Request, status
 from pydantic import BaseModel, Field
 
 from ..config import AgentRelaySettings
+from ..services.run_manager import RunManager
 from ..services.settings_store import SettingsStore
+from ..services.workers import WorkerRouter, merge_counts
+from .forwarding import get_worker_router
 
 router = APIRouter()
 
@@ -35,12 +38,35 @@ def get_settings(request: Request) -> AgentRelaySettings:
     return settings
 
 
+def get_optional_run_manager(request: Request) -> RunManager | None:
+    return getattr(request.app.state, "run_manager", None)
+
+
 @router.get("", response_model=ServiceStatusResponse)
 async def get_status(
+    request: Request,
     settings: AgentRelaySettings = Depends(get_settings),
     store: SettingsStore = Depends(get_settings_store),
+    manager: RunManager | None = Depends(get_optional_run_manager),
+    workers: WorkerRouter | None = Depends(get_worker_router),
 ) -> ServiceStatusResponse:
     deepseek_settings = store.get_deepseek_settings(settings.deepseek_api_base)
+    metadata: dict[str, Any] = {
+        "offlineMode": settings.offline_mode,
+        "deepseek": {
+            "apiKeySet": bool(deepseek_settings.get("apiKey")),
+            "model": settings.deepseek_model,
+            "baseUrl": deepseek_settings.get("baseUrl") or settings.deepseek_api_base,
+        },
+    }
+    if manager:
+        metadata["runs"] = manager.stats()
+        metadata["metrics"] = manager.metrics.summary()
+    profile = getattr(request.app.state, "startup_profile", None)
+    if profile is not None:
+        metadata["startup"] = profile.summary()
+    if workers and manager:
+        await _aggregate_workers(metadata, workers)
 
     return ServiceStatusResponse(
         service=settings.service_name,
@@ -48,12 +74,16 @@ async def get_status(
         protocolVersion=settings.protocol_version,
         agentsEtag=settings.agents_etag,
         maxConcurrentRuns=settings.max_concurrent_runs,
-        metadata={
-            "offlineMode": settings.offline_mode,
-            "deepseek": {
-                "apiKeySet": bool(deepseek_settings.get("apiKey")),
-                "model": settings.deepseek_model,
-                "baseUrl": deepseek_settings.get("baseUrl") or settings.deepseek_api_base,
-            },
-        },
+        metadata=metadata,
     )
+
+
+async def _aggregate_workers(metadata: dict[str, Any], workers: WorkerRouter) -> None:
+    """Sum run stats across workers; percentile summaries stay per worker."""
+    per_worker = [{"index": workers.topology.index, "runs": metadata["runs"], "metrics": metadata.pop("metrics")}]
+    for index, peer in await workers.gather("/status"):
+        peer_metadata = peer.get("metadata", {})
+        per_worker.append({"index": index, "runs": peer_metadata.get("runs"), "metrics": peer_metadata.get("metrics")})
+    per_worker.sort(key=lambda worker: worker["index"])
+    metadata["runs"] = merge_counts(worker["runs"] for worker in per_worker)
+    metadata["workers"] = {"count": workers.topology.count, "reachable": len(per_worker), "perWorker": per_worker}
@@ -1,3 +1,7 @@
+import asyncio
+import logging
+from typing import Callable
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -5,10 +9,26 @@ from .api.routes import register_routes
 from .config import AgentRelaySettings
 from .services.run_manager import RunManager
 from .services.settings_store import SettingsStore
+from .services.workers import WorkerRouter, WorkerTopology
+from .startup import StartupProfile, warm_up
+
+logger = logging.getLogger(__name__)
+
 
+def create_app(
+    settings: AgentRelaySettings | None = None,
+    startup_profile: StartupProfile | None = None,
+    worker_topology: WorkerTopology | None = None,
+    announce_ready: Callable[[], None] | None = None,
+) -> FastAPI:
+    """Build the service app.
 
-def create_app(settings: AgentRelaySettings | None = None) -> FastAPI:
+    ``worker_topology`` is set when running as one of several worker processes;
+    those report readiness through ``announce_ready`` instead of printing the
+    READY line, which the supervisor prints once every worker is up.
+    """
     resolved_settings = settings or AgentRelaySettings()
+    profile = startup_profile or StartupProfile()
     app = FastAPI(
         title="AgentRelay Service",
         version=resolved_settings.service_version,
@@ -24,16 +44,54 @@ def create_app(settings: AgentRelaySettings | None = None) -> FastAPI:
         allow_headers=["*"] ,
     )
 
-    settings_store = SettingsStore(app_name="AgentRelay", app_author="AgentRelay")
+    store_options = {}
+    if worker_topology is not None:
+        # Peers write settings.json too; check its mtime on every read.
+        store_options["revalidate_interval"] = 0.0
+    settings_store = SettingsStore(
+        app_name="AgentRelay",
+        app_author="AgentRelay",
+        settings_dir=resolved_settings.data_dir,
+        **store_options,
+    )
     run_manager = RunManager(resolved_settings, settings_store)
     app.state.settings_store = settings_store
     app.state.run_manager = run_manager
     app.state.settings_config = resolved_settings
+    app.state.startup_profile = profile
+    app.state.warmup_task = None
+    app.state.worker_router = WorkerRouter(worker_topology) if worker_topology is not None else None
 
     register_routes(app, resolved_settings)
+    profile.mark("create_app")
+
+    async def _warm_up() -> None:
+        try:
+            await warm_up()
+        except Exception:  # noqa: BLE001
+            logger.debug("Background warm-up failed", exc_info=True)
+        profile.mark("warm_up")
+        profile.complete()
 
     @app.on_event("startup")
     async def _announce_ready() -> None:
-        print(f"AGENTRELAY READY {resolved_settings.port}", flush=True)
+        profile.mark("server_start")
+        if announce_ready is not None:
+            announce_ready()
+        else:
+            print(f"AGENTRELAY READY {resolved_settings.port}", flush=True)
+        if resolved_settings.warmup_enabled:
+            app.state.warmup_task = asyncio.create_task(_warm_up())
+        else:
+            profile.complete()
+
+    @app.on_event("shutdown")
+    async def _shutdown_runs() -> None:
+        if app.state.warmup_task is not None:
+            await app.state.warmup_task
+        await app.state.run_manager.aclose()
+        if app.state.worker_router is not None:
+            await app.state.worker_router.aclose()
+        app.state.settings_store.flush()
 
     return app
@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Literal, Optional
 
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -12,7 +12,146 @@ class AgentRelaySettings(BaseSettings):
     service_version: str = Field(default="0.1.0-dev")
     protocol_version: str = Field(default="1.0")
     max_concurrent_runs: int = Field(default=1, ge=1)
+    max_queued_runs: int = Field(
+        default=32,
+        ge=0,
+        description="Runs allowed to wait for a free slot before POST /runs answers 429.",
+    )
+    run_event_buffer_size: int = Field(
+        default=256,
+        ge=100,
+        description="Events kept per run for Last-Event-ID replay (the protocol requires at least 100).",
+    )
+    retained_run_ttl_sec: float = Field(
+        default=300.0,
+        gt=0,
+        description="How long finished runs (result plus compacted events) stay available.",
+    )
+    retained_run_max_bytes: int = Field(
+        default=32 * 1024 * 1024,
+        ge=1024,
+        description="Memory cap for retained finished runs; least recently used runs are evicted first.",
+    )
+    retention_sweep_interval_sec: float = Field(default=30.0, gt=0)
+    run_buffer_max_bytes: int = Field(
+        default=4 * 1024 * 1024,
+        ge=1024,
+        description="Per-run budget for buffered SSE events before the slow-consumer policy applies.",
+    )
+    event_buffer_max_bytes: int = Field(
+        default=64 * 1024 * 1024,
+        ge=1024,
+        description="Budget for buffered SSE events across all runs.",
+    )
+    slow_consumer_policy: Literal["block", "coalesce", "drop"] = Field(
+        default="coalesce",
+        description="What to do when a run's event buffer is over budget; runs may override it.",
+    )
+    event_buffer_block_timeout_sec: float = Field(
+        default=30.0,
+        gt=0,
+        description="How long the 'block' policy may stall the upstream read before shedding events.",
+    )
+    delta_coalescing: Literal["off", "coalesce"] = Field(
+        default="off",
+        description="Default run.delta coalescing mode; runs may override it via constraints.deltaCoalescing.",
+    )
+    delta_flush_interval_ms: int = Field(default=40, ge=1, le=1000)
+    delta_flush_bytes: int = Field(default=256, ge=1)
+    delta_flush_on_sentence: bool = Field(default=True)
+    delta_immediate_first: bool = Field(
+        default=True,
+        description="Emit the first upstream chunk immediately so coalescing never delays the first token.",
+    )
+    max_batch_runs: int = Field(
+        default=256,
+        ge=1,
+        description="Maximum number of runs accepted by one POST /runs:batch request.",
+    )
+    session_max_count: int = Field(
+        default=512,
+        ge=1,
+        description="Conversation sessions kept in memory; the least recently used are dropped first.",
+    )
+    session_ttl_sec: float = Field(
+        default=3600.0,
+        gt=0,
+        description="Idle time after which a conversation session is dropped.",
+    )
+    session_token_budget: int = Field(
+        default=48000,
+        ge=256,
+        description="Estimated prompt tokens a session may send upstream before its oldest messages are dropped.",
+    )
+    max_tool_concurrency: int = Field(
+        default=4,
+        ge=1,
+        description="Tool calls of one model turn dispatched to the Host at once, unless constraints.maxToolConcurrency is set.",
+    )
+    tool_timeout_sec: float = Field(
+        default=60.0,
+        gt=0,
+        description="Time the Host has to post a tool result when the tool sets no timeoutSec; then TOOL_TIMEOUT.",
+    )
+    max_tool_rounds: int = Field(
+        default=8,
+        ge=1,
+        description="Model turns per run that may request tools before the run must answer.",
+    )
+    tool_output_max_chars: int = Field(
+        default=16000,
+        ge=256,
+        description="Characters of a tool's stdout or stderr passed back to the model.",
+    )
+    cancel_deadline_sec: float = Field(
+        default=2.0,
+        gt=0,
+        description="Upper bound between a cancel request and run.cancelled; a run still busy by then is aborted.",
+    )
+    single_flight_enabled: bool = Field(
+        default=True,
+        description="Attach runs with an identical request to the upstream generation already streaming for it.",
+    )
+    upstream_read_ahead_chunks: int = Field(
+        default=64,
+        ge=1,
+        description="Upstream chunks read ahead of the slowest run following a generation before the read pauses.",
+    )
+    completion_cache_enabled: bool = Field(
+        default=False,
+        description="Serve repeated identical requests from the completion cache; runs may opt in via constraints.cache.",
+    )
+    completion_cache_memory_bytes: int = Field(default=16 * 1024 * 1024, ge=0)
+    completion_cache_disk_bytes: int = Field(
+        default=256 * 1024 * 1024,
+        ge=0,
+        description="Size cap for the on-disk completion cache tier (0 disables it).",
+    )
+    completion_cache_ttl_sec: float = Field(default=7 * 24 * 3600, gt=0)
+    attachment_max_bytes: int = Field(
+        default=20 * 1024 * 1024,
+        ge=1,
+        description="Largest single upload accepted by POST /attachments.",
+    )
+    attachment_store_max_bytes: int = Field(
+        default=512 * 1024 * 1024,
+        ge=1,
+        description="Size cap for stored attachments; least recently used ones are evicted first.",
+    )
     agents_etag: str = Field(default="bootstrap")
+    workflows: Dict[str, str] = Field(
+        default_factory=dict,
+        description="LangGraph workflows as agentId -> 'module:builder'; the builder returns an uncompiled StateGraph.",
+    )
+    workflow_checkpoint_persist: bool = Field(
+        default=False,
+        description="Save workflow checkpoints to the data directory on shutdown and reload them on first use.",
+    )
+    workflow_max_threads: int = Field(
+        default=1024,
+        ge=1,
+        description="Workflow checkpoint threads kept in memory; the least recently used are deleted first.",
+    )
     tokens_file: Path = Field(default=Path("tokens.json"))
     allow_guest_requests: bool = Field(
         default=False,
@@ -23,6 +162,19 @@ class AgentRelaySettings(BaseSettings):
         description="When enabled, blocks outbound network calls (enforced by middleware).",
     )
     log_level: str = Field(default="INFO")
+    workers: int = Field(
+        default=1,
+        ge=1,
+        description="Worker processes sharing the listening socket; runs are routed to their owning worker over IPC.",
+    )
+    warmup_enabled: bool = Field(
+        default=True,
+        description="Import the upstream client libraries in the background after READY instead of on the first run.",
+    )
+    data_dir: Optional[Path] = Field(
+        default=None,
+        description="Directory for settings.json and caches; defaults to the per-user data directory.",
+    )
     python_executable: Optional[Path] = Field(
         default=None,
         description="Optional override for embedded Python interpreter paths.",
@@ -35,5 +187,33 @@ class AgentRelaySettings(BaseSettings):
         default="deepseek-chat",
         description="Default DeepSeek model identifier.",
     )
+    upstream_max_connections: int = Field(
+        default=20,
+        ge=1,
+        description="Maximum open connections per pooled upstream client.",
+    )
+    upstream_max_keepalive_connections: int = Field(
+        default=10,
+        ge=0,
+        description="Idle keep-alive connections retained per pooled upstream client.",
+    )
+    upstream_keepalive_expiry: float = Field(
+        default=60.0,
+        ge=0,
+        description="Seconds an idle upstream connection is kept alive.",
+    )
+    upstream_include_usage: bool = Field(
+        default=True,
+        description="Ask the upstream to report token usage on the last stream chunk.",
+    )
+    upstream_http2: bool = Field(
+        default=False,
+        description="Negotiate HTTP/2 with the upstream; requires the optional 'h2' package.",
+    )
+    upstream_client_idle_ttl: float = Field(
+        default=300.0,
+        ge=0,
+        description="Seconds an unused upstream client stays cached before eviction (0 disables eviction).",
+    )
 
     model_config = SettingsConfigDict(env_prefix="AGENTRELAY_", env_file=".env", extra="ignore")
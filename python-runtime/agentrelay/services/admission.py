@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Iterator, Optional
+
+PositionCallback = Callable[[int], None]
+
+
+class TooManyRunsError(Exception):
+    def __init__(self, retry_after_sec: int):
+        super().__init__(f"Too many runs; retry after {retry_after_sec}s")
+        self.retry_after_sec = retry_after_sec
+
+
+@dataclass(eq=False)
+class AdmissionTicket:
+    run_id: str
+    granted: asyncio.Future[None]
+    group: str = ""
+    enqueued_at: float = field(default_factory=time.monotonic)
+    granted_at: Optional[float] = None
+    released: bool = False
+    on_position: Optional[PositionCallback] = None
+
+    @property
+    def queue_time(self) -> float:
+        end = self.granted_at if self.granted_at is not None else time.monotonic()
+        return end - self.enqueued_at
+
+
+class AdmissionController:
+    """Bound concurrently executing runs and park the overflow in a fair queue.
+
+    ``reserve`` decides synchronously so the HTTP layer can answer 429 before a
+    run is created; queued runs await ``ticket.granted`` and are told about
+    position changes through ``ticket.on_position``.
+
+    Waiting tickets are FIFO within their group (a client or a batch) and
+    groups take turns, so a large batch cannot hold back runs submitted
+    after it by someone else. Tickets without a group each form their own,
+    which makes the queue plain FIFO for unrelated single runs.
+    """
+
+    def __init__(
+        self,
+        max_active: int,
+        max_queued: int,
+        default_run_sec: float = 5.0,
+        duration_window: int = 50,
+    ):
+        self._max_active = max_active
+        self._max_queued = max_queued
+        self._default_run_sec = default_run_sec
+        self._active = 0
+        # Round-robin rotation: the first group is granted next, then moves last.
+        self._groups: OrderedDict[str, Deque[AdmissionTicket]] = OrderedDict()
+        self._queued = 0
+        self._durations: Deque[float] = deque(maxlen=duration_window)
+        self._admitted = 0
+        self._rejected = 0
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def queued(self) -> int:
+        return self._queued
+
+    def available(self) -> int:
+        """How many more reservations would currently succeed, granted or queued."""
+        return max(0, self._max_active - self._active) + max(0, self._max_queued - self._queued)
+
+    def reserve(self, run_id: str, group: Optional[str] = None) -> AdmissionTicket:
+        ticket = AdmissionTicket(
+            run_id=run_id,
+            granted=asyncio.get_running_loop().create_future(),
+            group=group or f"run:{run_id}",
+        )
+        if self._active < self._max_active and not self._queued:
+            self._grant(ticket)
+        elif self._queued < self._max_queued:
+            self._groups.setdefault(ticket.group, deque()).append(ticket)
+            self._queued += 1
+        else:
+            self._rejected += 1
+            raise TooManyRunsError(self.retry_after_sec())
+        return ticket
+
+    def position(self, ticket: AdmissionTicket) -> int:
+        """1-based place in the projected grant order, or 0 once the ticket holds a slot."""
+        if ticket.granted.done():
+            return 0
+        waiting = self._groups.get(ticket.group)
+        try:
+            depth = waiting.index(ticket) if waiting is not None else -1
+        except ValueError:
+            depth = -1
+        if depth < 0:
+            return 0
+        ahead = 0
+        before_own_group = True
+        for group, tickets in self._groups.items():
+            if group == ticket.group:
+                before_own_group = False
+                continue
+            # Groups ahead in the rotation get one extra turn in ticket's round.
+            ahead += min(len(tickets), depth + 1 if before_own_group else depth)
+        return ahead + depth + 1
+
+    def release(self, ticket: AdmissionTicket) -> None:
+        if ticket.released:
+            return
+        ticket.released = True
+        if ticket.granted_at is not None:
+            self._active -= 1
+            self._durations.append(time.monotonic() - ticket.granted_at)
+            self._drain(shifted=False)
+            return
+        if not ticket.granted.done():
+            ticket.granted.cancel()
+        waiting = self._groups.get(ticket.group)
+        if waiting is None or ticket not in waiting:
+            return
+        waiting.remove(ticket)
+        self._queued -= 1
+        if not waiting:
+            del self._groups[ticket.group]
+        self._drain(shifted=True)
+
+    def retry_after_sec(self) -> int:
+        average = sum(self._durations) / len(self._durations) if self._durations else self._default_run_sec
+        backlog = (self._queued + 1) / self._max_active
+        return max(1, math.ceil(average * backlog))
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "activeRuns": self._active,
+            "queuedRuns": self._queued,
+            "queuedGroups": len(self._groups),
+            "maxQueuedRuns": self._max_queued,
+            "admitted": self._admitted,
+            "rejected": self._rejected,
+            "retryAfterSec": self.retry_after_sec(),
+        }
+
+    def _grant(self, ticket: AdmissionTicket) -> None:
+        self._active += 1
+        self._admitted += 1
+        ticket.granted_at = time.monotonic()
+        if not ticket.granted.done():
+            ticket.granted.set_result(None)
+
+    def _next_waiting(self) -> AdmissionTicket:
+        group, waiting = next(iter(self._groups.items()))
+        ticket = waiting.popleft()
+        self._queued -= 1
+        if waiting:
+            self._groups.move_to_end(group)
+        else:
+            del self._groups[group]
+        return ticket
+
+    def _projected_order(self) -> Iterator[AdmissionTicket]:
+        """Waiting tickets in the order ``_drain`` would grant them."""
+        groups = [list(waiting) for waiting in self._groups.values()]
+        depth = 0
+        while groups:
+            for waiting in groups:
+                yield waiting[depth]
+            depth += 1
+            groups = [waiting for waiting in groups if len(waiting) > depth]
+
+    def _drain(self, shifted: bool) -> None:
+        while self._queued and self._active < self._max_active:
+            self._grant(self._next_waiting())
+            shifted = True
+        if not shifted:
+            return
+        for index, waiting in enumerate(self._projected_order(), start=1):
+            if waiting.on_position:
+                waiting.on_position(index)
@@ -0,0 +1,233 @@
+"""Content-addressed on-disk store for binary attachments such as screenshots.
+
+Uploads are streamed to a temporary file while being hashed, then renamed to
+their SHA-256 digest, so the same bytes uploaded twice are stored once and
+every worker process sharing the data directory sees them. Files are only
+read back, memory-mapped, when a run builds its upstream request.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import hashlib
+import logging
+import mimetypes
+import mmap
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_CONTENT_TYPE = "application/octet-stream"
+
+
+class AttachmentNotFoundError(Exception):
+    pass
+
+
+class AttachmentTooLargeError(Exception):
+    def __init__(self, limit: int):
+        super().__init__(f"Attachment exceeds {limit} bytes")
+        self.limit = limit
+
+
+@dataclass
+class Attachment:
+    attachment_id: str
+    size: int
+    content_type: str
+    path: Path
+
+    def summary(self) -> Dict[str, object]:
+        return {"attachmentId": self.attachment_id, "size": self.size, "contentType": self.content_type}
+
+
+def _is_digest(value: str) -> bool:
+    return len(value) == 64 and all(char in "0123456789abcdef" for char in value)
+
+
+class AttachmentStore:
+    """Attachments under ``directory``, evicted least recently used beyond ``max_bytes``.
+
+    Attachments pinned by a live run are never evicted.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int, max_attachment_bytes: int):
+        self._dir = directory
+        self._max_bytes = max_bytes
+        self._max_attachment_bytes = max_attachment_bytes
+        self._index: Optional[OrderedDict[str, Attachment]] = None
+        self._bytes = 0
+        self._pins: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._uploads = 0
+        self._deduplicated = 0
+        self._evicted = 0
+
+    @property
+    def max_attachment_bytes(self) -> int:
+        return self._max_attachment_bytes
+
+    async def put(self, chunks: AsyncIterator[bytes], content_type: Optional[str] = None) -> tuple[Attachment, bool]:
+        """Store a streamed upload; returns the attachment and whether it already existed."""
+        self._dir.mkdir(parents=True, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_name = tempfile.mkstemp(dir=self._dir, suffix=".upload")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if size > self._max_attachment_bytes:
+                        raise AttachmentTooLargeError(self._max_attachment_bytes)
+                    digest.update(chunk)
+                    await asyncio.to_thread(handle.write, chunk)
+            attachment_id = digest.hexdigest()
+            return await asyncio.to_thread(self._commit, Path(tmp_name), attachment_id, size, content_type)
+        finally:
+            Path(tmp_name).unlink(missing_ok=True)
+
+    def get(self, attachment_id: str) -> Optional[Attachment]:
+        with self._lock:
+            return self._lookup(attachment_id)
+
+    def pin(self, attachment_id: str) -> Attachment:
+        """Keep an attachment from eviction until ``unpin``; raises if it does not exist."""
+        with self._lock:
+            attachment = self._lookup(attachment_id)
+            if attachment is None:
+                raise AttachmentNotFoundError(attachment_id)
+            self._pins[attachment_id] = self._pins.get(attachment_id, 0) + 1
+            return attachment
+
+    def unpin(self, attachment_id: str) -> None:
+        with self._lock:
+            count = self._pins.pop(attachment_id, 0) - 1
+            if count > 0:
+                self._pins[attachment_id] = count
+
+    async def data_url(self, attachment_id: str) -> str:
+        """The attachment as a base64 ``data:`` URL, read through a memory map."""
+        return await asyncio.to_thread(self._data_url, attachment_id)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            index = self._load_index()
+            return {
+                "attachments": len(index),
+                "bytes": self._bytes,
+                "pinned": len(self._pins),
+                "uploads": self._uploads,
+                "deduplicated": self._deduplicated,
+                "evicted": self._evicted,
+            }
+
+    # Runs in a worker thread ---------------------------------------------------
+    def _data_url(self, attachment_id: str) -> str:
+        attachment = self.get(attachment_id)
+        if attachment is None:
+            raise AttachmentNotFoundError(attachment_id)
+        try:
+            with open(attachment.path, "rb") as handle:
+                if attachment.size == 0:
+                    encoded = b""
+                else:
+                    with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                        encoded = base64.b64encode(mapped)
+        except FileNotFoundError:
+            # Evicted by another worker sharing the directory.
+            with self._lock:
+                self._forget(attachment_id)
+            raise AttachmentNotFoundError(attachment_id) from None
+        return f"data:{attachment.content_type};base64,{encoded.decode('ascii')}"
+
+    def _commit(self, tmp_path: Path, attachment_id: str, size: int, content_type: Optional[str]) -> tuple[Attachment, bool]:
+        with self._lock:
+            self._uploads += 1
+            existing = self._lookup(attachment_id)
+            if existing is not None:
+                self._deduplicated += 1
+                os.utime(existing.path)
+                return existing, True
+            path = self._path(attachment_id, content_type or _DEFAULT_CONTENT_TYPE)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp_path, path)
+            attachment = Attachment(attachment_id, size, _content_type(path), path)
+            self._remember(attachment)
+            self._evict()
+            return attachment, False
+
+    def _path(self, attachment_id: str, content_type: str) -> Path:
+        extension = mimetypes.guess_extension(content_type.split(";")[0].strip()) or ".bin"
+        return self._dir / attachment_id[:2] / f"{attachment_id}{extension}"
+
+    def _load_index(self) -> OrderedDict[str, Attachment]:
+        if self._index is None:
+            found = []
+            if self._dir.exists():
+                for path in self._dir.glob("*/*"):
+                    found.extend(self._scan(path))
+            found.sort(key=lambda item: item[0])
+            self._index = OrderedDict()
+            self._bytes = 0
+            for _, attachment in found:
+                self._remember(attachment)
+        return self._index
+
+    def _scan(self, path: Path) -> list[tuple[float, Attachment]]:
+        attachment_id = path.name.split(".", 1)[0]
+        if not _is_digest(attachment_id):
+            return []
+        try:
+            stat = path.stat()
+        except OSError:
+            return []
+        return [(stat.st_mtime, Attachment(attachment_id, stat.st_size, _content_type(path), path))]
+
+    def _lookup(self, attachment_id: str) -> Optional[Attachment]:
+        index = self._load_index()
+        attachment = index.get(attachment_id)
+        if attachment is None and _is_digest(attachment_id):
+            # Another worker sharing the directory may have stored it.
+            found = [item for path in self._dir.glob(f"{attachment_id[:2]}/{attachment_id}.*") for item in self._scan(path)]
+            if found:
+                attachment = found[0][1]
+                self._remember(attachment)
+        if attachment is not None:
+            index.move_to_end(attachment_id)
+        return attachment
+
+    def _remember(self, attachment: Attachment) -> None:
+        assert self._index is not None
+        self._bytes += attachment.size
+        self._index[attachment.attachment_id] = attachment
+
+    def _forget(self, attachment_id: str) -> Optional[Attachment]:
+        attachment = self._load_index().pop(attachment_id, None)
+        if attachment is not None:
+            self._bytes -= attachment.size
+        return attachment
+
+    def _evict(self) -> None:
+        index = self._load_index()
+        for attachment_id in list(index):
+            if self._bytes <= self._max_bytes:
+                return
+            if attachment_id in self._pins:
+                continue
+            attachment = self._forget(attachment_id)
+            self._evicted += 1
+            try:
+                attachment.path.unlink()  # type: ignore[union-attr]
+            except OSError:
+                pass
+
+
+def _content_type(path: Path) -> str:
+    return mimetypes.guess_type(path.name)[0] or _DEFAULT_CONTENT_TYPE
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import logging
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, Optional, Set, Tuple
+
+from ..config import AgentRelaySettings
+
+if TYPE_CHECKING:
+    import httpx
+    from openai import AsyncOpenAI
+
+logger = logging.getLogger(__name__)
+
+ClientKey = Tuple[str, str]
+
+
+@dataclass
+class _PooledClient:
+    key: ClientKey
+    client: AsyncOpenAI
+    leases: int = 0
+    last_used: float = field(default_factory=time.monotonic)
+    retired: bool = False
+
+
+class UpstreamClientPool:
+    """Keep long-lived AsyncOpenAI clients keyed by (api_key, base_url).
+
+    Each client owns one httpx connection pool, so consecutive runs against the
+    same upstream reuse keep-alive connections instead of paying a fresh
+    TCP/TLS handshake per run.
+    """
+
+    def __init__(
+        self,
+        settings: AgentRelaySettings,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self._settings = settings
+        self._transport = transport
+        self._clients: Dict[ClientKey, _PooledClient] = {}
+        self._closing: Set[asyncio.Task] = set()
+        self._http2 = settings.upstream_http2 and self._http2_available()
+        self._created = 0
+        self._evicted = 0
+
+    @staticmethod
+    def _http2_available() -> bool:
+        if importlib.util.find_spec("h2") is None:
+            logger.warning("upstream_http2 requested but the 'h2' package is not installed; using HTTP/1.1")
+            return False
+        return True
+
+    @asynccontextmanager
+    async def lease(self, api_key: str, base_url: str) -> AsyncIterator[AsyncOpenAI]:
+        await self.evict_idle()
+        key = (api_key, base_url)
+        entry = self._clients.get(key)
+        if entry is None:
+            entry = _PooledClient(key=key, client=self._build_client(api_key, base_url))
+            self._clients[key] = entry
+            self._created += 1
+        entry.leases += 1
+        try:
+            yield entry.client
+        finally:
+            entry.leases -= 1
+            entry.last_used = time.monotonic()
+            if entry.retired and entry.leases == 0:
+                self._close_later(entry)
+
+    def _build_client(self, api_key: str, base_url: str) -> AsyncOpenAI:
+        # Imported here rather than at module load: openai and httpx dominate
+        # cold start and are only needed once the first run reaches upstream.
+        import httpx
+        from openai import DEFAULT_TIMEOUT, AsyncOpenAI
+
+        settings = self._settings
+        http_client = httpx.AsyncClient(
+            timeout=DEFAULT_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=settings.upstream_max_connections,
+                max_keepalive_connections=settings.upstream_max_keepalive_connections,
+                keepalive_expiry=settings.upstream_keepalive_expiry,
+            ),
+            http2=self._http2,
+            transport=self._transport,
+            follow_redirects=True,
+        )
+        return AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client)
+
+    def invalidate(self) -> None:
+        """Retire every cached client; in-flight leases finish on the old client."""
+        for entry in list(self._clients.values()):
+            self._retire(entry)
+
+    async def evict_idle(self) -> int:
+        ttl = self._settings.upstream_client_idle_ttl
+        if ttl <= 0:
+            return 0
+        cutoff = time.monotonic() - ttl
+        stale = [entry for entry in self._clients.values() if entry.leases == 0 and entry.last_used < cutoff]
+        for entry in stale:
+            self._retire(entry)
+        return len(stale)
+
+    def _retire(self, entry: _PooledClient) -> None:
+        if entry.retired:
+            return
+        entry.retired = True
+        if self._clients.get(entry.key) is entry:
+            del self._clients[entry.key]
+        self._evicted += 1
+        if entry.leases == 0:
+            self._close_later(entry)
+
+    def _close_later(self, entry: _PooledClient) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = loop.create_task(self._close(entry))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    @staticmethod
+    async def _close(entry: _PooledClient) -> None:
+        try:
+            await entry.client.close()
+        except Exception:  # noqa: BLE001
+            logger.debug("Failed to close upstream client for %s", entry.key[1], exc_info=True)
+
+    async def aclose(self) -> None:
+        entries = list(self._clients.values())
+        self._clients.clear()
+        for entry in entries:
+            entry.retired = True
+        await asyncio.gather(*(self._close(entry) for entry in entries), *self._closing)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "clients": len(self._clients),
+            "activeLeases": sum(entry.leases for entry in self._clients.values()),
+            "created": self._created,
+            "evicted": self._evicted,
+            "http2": self._http2,
+        }
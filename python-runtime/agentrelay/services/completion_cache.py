@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def completion_cache_key(messages: List[dict[str, Any]], model: str, params: dict[str, Any]) -> str:
+    """Hash the exact upstream request (messages, model, sampling params) canonically."""
+    canonical = json.dumps(
+        {"messages": messages, "model": model, "params": params},
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CachedCompletion:
+    chunks: List[str]
+    created_at: float
+
+    @property
+    def text(self) -> str:
+        return "".join(self.chunks)
+
+    @property
+    def size_bytes(self) -> int:
+        return sum(len(chunk.encode("utf-8")) for chunk in self.chunks) + 64 * len(self.chunks)
+
+
+class CompletionCache:
+    """Two-tier (memory LRU + on-disk) cache of streamed completions.
+
+    Entries keep the original chunk boundaries so hits can be replayed as a
+    regular ``run.delta`` stream. Disk entries live as one JSON file per key
+    under ``disk_dir`` and are evicted oldest-first once ``disk_max_bytes`` is
+    exceeded; both tiers honour ``ttl_sec``.
+    """
+
+    def __init__(
+        self,
+        memory_max_bytes: int,
+        ttl_sec: float,
+        disk_dir: Optional[Path] = None,
+        disk_max_bytes: int = 0,
+    ):
+        self._memory_max_bytes = memory_max_bytes
+        self._ttl = ttl_sec
+        self._disk_dir = disk_dir if disk_max_bytes > 0 else None
+        self._disk_max_bytes = disk_max_bytes
+        self._memory: OrderedDict[str, CachedCompletion] = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_index: Optional[OrderedDict[str, int]] = None
+        self._disk_bytes = 0
+        self._disk_lock = threading.Lock()
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+
+    async def get(self, key: str) -> Optional[CachedCompletion]:
+        entry = self._memory.get(key)
+        if entry is not None:
+            if self._expired(entry):
+                self._drop_memory(key)
+            else:
+                self._memory.move_to_end(key)
+                self._hits += 1
+                return entry
+        if self._disk_dir is not None:
+            entry = await asyncio.to_thread(self._read_disk, key)
+            if entry is not None:
+                self._remember(key, entry)
+                self._hits += 1
+                self._disk_hits += 1
+                return entry
+        self._misses += 1
+        return None
+
+    async def put(self, key: str, chunks: List[str]) -> None:
+        entry = CachedCompletion(chunks=list(chunks), created_at=time.time())
+        self._remember(key, entry)
+        if self._disk_dir is not None:
+            try:
+                await asyncio.to_thread(self._write_disk, key, entry)
+            except OSError:
+                logger.exception("Failed to persist completion cache entry %s", key)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "hits": self._hits,
+            "diskHits": self._disk_hits,
+            "misses": self._misses,
+            "memoryEntries": len(self._memory),
+            "memoryBytes": self._memory_bytes,
+            "diskEntries": len(self._disk_index) if self._disk_index is not None else None,
+            "diskBytes": self._disk_bytes if self._disk_index is not None else None,
+        }
+
+    def _expired(self, entry: CachedCompletion) -> bool:
+        return entry.created_at + self._ttl <= time.time()
+
+    def _remember(self, key: str, entry: CachedCompletion) -> None:
+        if key in self._memory:
+            self._drop_memory(key)
+        size = entry.size_bytes
+        if size > self._memory_max_bytes:
+            return
+        self._memory[key] = entry
+        self._memory_bytes += size
+        while self._memory_bytes > self._memory_max_bytes:
+            oldest = next(iter(self._memory))
+            self._drop_memory(oldest)
+
+    def _drop_memory(self, key: str) -> None:
+        entry = self._memory.pop(key)
+        self._memory_bytes -= entry.size_bytes
+
+    # Disk tier (runs in a worker thread) ---------------------------------------
+    def _path(self, key: str) -> Path:
+        assert self._disk_dir is not None
+        return self._disk_dir / key[:2] / f"{key}.json"
+
+    def _load_index(self) -> OrderedDict[str, int]:
+        if self._disk_index is None:
+            assert self._disk_dir is not None
+            found = []
+            if self._disk_dir.exists():
+                for path in self._disk_dir.glob("*/*.json"):
+                    try:
+                        stat = path.stat()
+                    except OSError:
+                        continue
+                    found.append((stat.st_mtime, path.stem, stat.st_size))
+            found.sort()
+            self._disk_index = OrderedDict((key, size) for _, key, size in found)
+            self._disk_bytes = sum(size for _, _, size in found)
+        return self._disk_index
+
+    def _read_disk(self, key: str) -> Optional[CachedCompletion]:
+        with self._disk_lock:
+            return self._read_disk_locked(key)
+
+    def _write_disk(self, key: str, entry: CachedCompletion) -> None:
+        with self._disk_lock:
+            self._write_disk_locked(key, entry)
+
+    def _read_disk_locked(self, key: str) -> Optional[CachedCompletion]:
+        index = self._load_index()
+        if key not in index:
+            return None
+        try:
+            raw = json.loads(self._path(key).read_text(encoding="utf-8"))
+            entry = CachedCompletion(chunks=list(raw["chunks"]), created_at=float(raw["createdAt"]))
+        except (OSError, ValueError, KeyError, TypeError):
+            self._delete_disk(key)
+            return None
+        if self._expired(entry):
+            self._delete_disk(key)
+            return None
+        index.move_to_end(key)
+        return entry
+
+    def _write_disk_locked(self, key: str, entry: CachedCompletion) -> None:
+        index = self._load_index()
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = json.dumps({"createdAt": entry.created_at, "chunks": entry.chunks}, ensure_ascii=False).encode("utf-8")
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(data)
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        self._disk_bytes += len(data) - index.pop(key, 0)
+        index[key] = len(data)
+        while self._disk_bytes > self._disk_max_bytes and len(index) > 1:
+            self._delete_disk(next(iter(index)))
+
+    def _delete_disk(self, key: str) -> None:
+        index = self._load_index()
+        self._disk_bytes -= index.pop(key, 0)
+        try:
+            self._path(key).unlink()
+        except OSError:
+            pass
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional
+
+from ..config import AgentRelaySettings
+
+SENTENCE_ENDINGS = frozenset(".!?;:\n。！？；：")
+
+
+@dataclass(frozen=True)
+class CoalescingPolicy:
+    mode: str = "off"
+    flush_interval_ms: int = 40
+    flush_bytes: int = 256
+    flush_on_sentence: bool = True
+    immediate_first: bool = True
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode == "coalesce"
+
+    @classmethod
+    def resolve(cls, settings: AgentRelaySettings, overrides: Optional[dict[str, Any]] = None) -> "CoalescingPolicy":
+        """Merge the per-run ``constraints.deltaCoalescing`` object over the global defaults."""
+        overrides = overrides or {}
+        return cls(
+            mode=overrides.get("mode", settings.delta_coalescing),
+            flush_interval_ms=overrides.get("flushIntervalMs", settings.delta_flush_interval_ms),
+            flush_bytes=overrides.get("flushBytes", settings.delta_flush_bytes),
+            flush_on_sentence=overrides.get("flushOnSentence", settings.delta_flush_on_sentence),
+            immediate_first=overrides.get("immediateFirst", settings.delta_immediate_first),
+        )
+
+
+class DeltaCoalescer:
+    """Merge upstream text chunks into fewer ``run.delta`` events.
+
+    Pending text is flushed after ``flush_interval_ms``, once it reaches
+    ``flush_bytes``, or at a sentence boundary, whichever comes first. With
+    ``immediate_first`` the very first chunk is emitted straight away so
+    time-to-first-token is unaffected.
+    """
+
+    def __init__(self, policy: CoalescingPolicy, emit: Callable[[str], None]):
+        self._policy = policy
+        self._emit = emit
+        self._pending: List[str] = []
+        self._pending_bytes = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._emitted = 0
+
+    @property
+    def emitted(self) -> int:
+        return self._emitted
+
+    def push(self, text: str) -> None:
+        policy = self._policy
+        if not policy.enabled or (policy.immediate_first and self._emitted == 0 and not self._pending):
+            self._emit_text(text)
+            return
+        self._pending.append(text)
+        self._pending_bytes += len(text.encode("utf-8"))
+        if self._pending_bytes >= policy.flush_bytes or (
+            policy.flush_on_sentence and text.rstrip(" ")[-1:] in SENTENCE_ENDINGS
+        ):
+            self.flush()
+        elif self._timer is None:
+            loop = asyncio.get_running_loop()
+            self._timer = loop.call_later(policy.flush_interval_ms / 1000, self._on_timer)
+
+    def flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        text = "".join(self._pending)
+        self._pending.clear()
+        self._pending_bytes = 0
+        self._emit_text(text)
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self.flush()
+
+    def _emit_text(self, text: str) -> None:
+        self._emitted += 1
+        self._emit(text)
@@ -0,0 +1,341 @@
+from __future__ import annotations
+
+import asyncio
+import bisect
+from dataclasses import dataclass
+from typing import AsyncIterator, List, Literal, Optional
+
+from .events import RunDelta, RunEvent, RunFailed
+
+SlowConsumerPolicy = Literal["block", "coalesce", "drop"]
+
+# Shedding after a ``block`` timeout goes down to this share of ``max_bytes``,
+# so the next few appends do not push the log straight back over budget.
+_LOW_WATER = 0.5
+
+
+class BufferBudget:
+    """Byte budget shared by every run's event log (the global gauge)."""
+
+    def __init__(self, limit_bytes: int):
+        self.limit_bytes = limit_bytes
+        self.used_bytes = 0
+        self.dropped_subscribers = 0
+        self.coalesced_events = 0
+        self.blocked_appends = 0
+
+    @property
+    def exceeded(self) -> bool:
+        return self.used_bytes > self.limit_bytes
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "bufferedBytes": self.used_bytes,
+            "limitBytes": self.limit_bytes,
+            "droppedSubscribers": self.dropped_subscribers,
+            "coalescedEvents": self.coalesced_events,
+            "blockedAppends": self.blocked_appends,
+        }
+
+
+@dataclass(eq=False)
+class _Subscriber:
+    cursor: int
+    dropped: bool = False
+
+
+class RunEventLog:
+    """Ordered record of the SSE events emitted by a single run.
+
+    Every appended event gets a monotonically increasing integer ``id`` which is
+    sent as the SSE ``id:`` field, so reconnecting clients can resume with
+    ``Last-Event-ID`` from whatever is still buffered.
+
+    The log doubles as the run's fan-out hub: each subscriber created by
+    ``follow`` keeps its own cursor into the shared buffer, and the producer
+    only appends and resolves one shared wake-up future, so it never blocks on
+    or copies events for individual subscribers.
+
+    Events that every subscriber has seen are kept for the most recent
+    ``capacity`` replay window (less while over budget). Events nobody has
+    received yet stay buffered until the run's ``max_bytes`` or the shared
+    ``budget`` is exceeded, at which point ``policy`` decides: ``block`` makes
+    the producer wait in ``wait_for_capacity``, ``coalesce`` merges undelivered
+    deltas, and ``drop`` (also the fallback for the other two) evicts the
+    oldest events and disconnects subscribers that had not received them with
+    ``SLOW_CONSUMER``. A ``block`` log falls back to ``drop`` for good once a
+    wait times out, and never waits while nobody is subscribed.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        run_id: str = "",
+        max_bytes: Optional[int] = None,
+        policy: SlowConsumerPolicy = "drop",
+        budget: Optional[BufferBudget] = None,
+    ):
+        self._capacity = capacity
+        self._run_id = run_id
+        self._max_bytes = max_bytes
+        self._policy = policy
+        self._budget = budget
+        self._events: List[RunEvent] = []
+        self._sizes: List[int] = []
+        self._head = 0
+        self._bytes = 0
+        self._last_id = 0
+        self._delivered = 0
+        self._closed = False
+        self._waiter: Optional[asyncio.Future[None]] = None
+        self._capacity_waiter: Optional[asyncio.Future[None]] = None
+        self._subscribers: List[_Subscriber] = []
+
+    @property
+    def last_id(self) -> int:
+        return self._last_id
+
+    @property
+    def first_id(self) -> int:
+        if self._head < len(self._events):
+            return self._events[self._head].id  # type: ignore[return-value]
+        return self._last_id + 1
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    @property
+    def buffered_bytes(self) -> int:
+        return self._bytes
+
+    @property
+    def policy(self) -> SlowConsumerPolicy:
+        return self._policy
+
+    def __len__(self) -> int:
+        return len(self._events) - self._head
+
+    def append(self, event: RunEvent) -> RunEvent:
+        self._last_id += 1
+        event.id = self._last_id
+        size = len(event.encode())
+        self._events.append(event)
+        self._sizes.append(size)
+        self._account(size)
+        self._trim()
+        if self._over_budget() and self._policy != "block":
+            if self._policy == "coalesce":
+                self._coalesce_pending()
+            self._shed()
+        self._wake()
+        return event
+
+    def close(self) -> None:
+        """Mark the run as finished; subscribers drain the buffer and stop.
+
+        The buffer is released as soon as the last subscriber is done with it.
+        """
+        self._closed = True
+        self._wake()
+        self._wake_capacity()
+        if not self._subscribers:
+            self.release()
+
+    def release(self) -> None:
+        """Drop every buffered event and return its bytes to the shared budget."""
+        self._account(-self._bytes)
+        self._events.clear()
+        self._sizes.clear()
+        self._head = 0
+
+    def since(self, last_event_id: Optional[int]) -> List[RunEvent]:
+        """Return buffered events newer than ``last_event_id`` (all when None)."""
+        if last_event_id is None:
+            return self._events[self._head :]
+        start = bisect.bisect_right(self._events, last_event_id, lo=self._head, key=_event_id)
+        return self._events[start:]
+
+    async def follow(self, last_event_id: Optional[int] = None) -> AsyncIterator[RunEvent]:
+        """Yield buffered events after ``last_event_id``, then live events until closed.
+
+        A subscriber that falls behind the retained window resumes from the
+        oldest event still buffered, unless the events it missed were shed while
+        it was attached, in which case it receives ``run.failed``/``SLOW_CONSUMER``.
+        """
+        subscriber = _Subscriber(cursor=last_event_id or 0)
+        self._subscribers.append(subscriber)
+        try:
+            while True:
+                if subscriber.dropped:
+                    yield RunFailed(
+                        self._run_id,
+                        "SLOW_CONSUMER",
+                        "Subscriber fell too far behind; buffered events were discarded.",
+                    )
+                    return
+                # One event at a time from the live buffer: while this
+                # subscriber is suspended in ``yield``, ``coalesce`` may merge
+                # the events after its cursor, so a copied slice goes stale.
+                event = self._next_after(subscriber.cursor) if subscriber.cursor < self._last_id else None
+                if event is not None:
+                    subscriber.cursor = event.id  # type: ignore[assignment]
+                    self._advance(subscriber.cursor)
+                    yield event
+                    continue
+                if self._closed:
+                    return
+                await asyncio.shield(self._wait_future())
+        finally:
+            self._subscribers.remove(subscriber)
+            if self._closed and not self._subscribers:
+                self.release()
+            else:
+                self._trim()
+                self._wake_capacity()
+
+    async def wait_for_capacity(self, timeout: float) -> bool:
+        """Block the producer while the buffer is over budget (``block`` policy).
+
+        Returns False when events were shed instead: the oldest ones go, down
+        to a low-water mark, when ``timeout`` elapses (after which the log uses
+        the ``drop`` policy for the rest of the run) or when there is no
+        subscriber to wait for.
+        """
+        if self._policy != "block" or not self._over_budget():
+            return True
+        if not self._subscribers:
+            self._shed(_LOW_WATER)
+            return False
+        if self._budget:
+            self._budget.blocked_appends += 1
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while self._over_budget() and not self._closed:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                # Waiting again on every event would stall the run for the full
+                # timeout each time, so the stalled subscriber is shed instead.
+                self._policy = "drop"
+                self._shed(_LOW_WATER)
+                self._wake()
+                return False
+            if self._capacity_waiter is None:
+                self._capacity_waiter = loop.create_future()
+            try:
+                await asyncio.wait_for(asyncio.shield(self._capacity_waiter), remaining)
+            except asyncio.TimeoutError:
+                continue
+        return True
+
+    def _over_budget(self, share: float = 1.0) -> bool:
+        if self._max_bytes is not None and self._bytes > self._max_bytes * share:
+            return True
+        return bool(self._budget and self._budget.exceeded and self._bytes > 0)
+
+    def _min_cursor(self) -> int:
+        if self._subscribers:
+            return min(subscriber.cursor for subscriber in self._subscribers)
+        return self._delivered
+
+    def _next_after(self, cursor: int) -> Optional[RunEvent]:
+        index = bisect.bisect_right(self._events, cursor, lo=self._head, key=_event_id)
+        return self._events[index] if index < len(self._events) else None
+
+    def _advance(self, cursor: int) -> None:
+        if cursor > self._delivered:
+            self._delivered = cursor
+        self._trim()
+        if self._policy == "block":
+            self._wake_capacity()
+
+    def _trim(self) -> None:
+        """Evict delivered events outside the replay window, or inside it while over budget."""
+        if len(self) <= self._capacity and not self._over_budget():
+            return
+        delivered = self._min_cursor()
+        while (
+            len(self)
+            and self._events[self._head].id <= delivered  # type: ignore[operator]
+            and (len(self) > self._capacity or self._over_budget())
+        ):
+            self._evict_head()
+        self._compact()
+
+    def _shed(self, share: float = 1.0) -> None:
+        """Evict the oldest events until the log fits ``share`` of its budget, dropping lagging subscribers."""
+        while self._over_budget(share) and len(self) > 1:
+            event = self._evict_head()
+            for subscriber in self._subscribers:
+                if not subscriber.dropped and subscriber.cursor < event.id:  # type: ignore[operator]
+                    subscriber.dropped = True
+                    if self._budget:
+                        self._budget.dropped_subscribers += 1
+        self._compact()
+
+    def _coalesce_pending(self) -> None:
+        """Merge the trailing run of deltas that no subscriber has received yet."""
+        delivered = max((subscriber.cursor for subscriber in self._subscribers), default=self._delivered)
+        start = len(self._events)
+        while (
+            start - 1 >= self._head
+            and isinstance(self._events[start - 1], RunDelta)
+            and self._events[start - 1].id > delivered  # type: ignore[operator]
+        ):
+            start -= 1
+        count = len(self._events) - start
+        if count < 2:
+            return
+        pending = self._events[start:]
+        merged = RunDelta(pending[-1].run_id, "".join(event.text for event in pending))  # type: ignore[attr-defined]
+        merged.id = pending[-1].id
+        size = len(merged.encode())
+        self._account(size - sum(self._sizes[start:]))
+        self._events[start:] = [merged]
+        self._sizes[start:] = [size]
+        if self._budget:
+            self._budget.coalesced_events += count - 1
+
+    def _evict_head(self) -> RunEvent:
+        event = self._events[self._head]
+        self._account(-self._sizes[self._head])
+        self._head += 1
+        return event
+
+    def _compact(self) -> None:
+        if self._head and self._head * 2 >= len(self._events):
+            del self._events[: self._head]
+            del self._sizes[: self._head]
+            self._head = 0
+
+    def _account(self, delta: int) -> None:
+        self._bytes += delta
+        if self._budget:
+            self._budget.used_bytes += delta
+
+    def _wait_future(self) -> asyncio.Future[None]:
+        if self._waiter is None:
+            self._waiter = asyncio.get_running_loop().create_future()
+        return self._waiter
+
+    def _wake(self) -> None:
+        waiter = self._waiter
+        if waiter is not None:
+            self._waiter = None
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def _wake_capacity(self) -> None:
+        waiter = self._capacity_waiter
+        if waiter is not None:
+            self._capacity_waiter = None
+            if not waiter.done():
+                waiter.set_result(None)
+
+
+def _event_id(event: RunEvent) -> int:
+    return event.id  # type: ignore[return-value]
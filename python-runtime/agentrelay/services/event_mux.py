@@ -0,0 +1,202 @@
+"""Interleave the event streams of many runs over one subscriber connection.
+
+Each subscribed run contributes at most one pending read, so a slow
+connection applies backpressure to every run's event log exactly as a
+dedicated ``/runs/{id}/events`` subscriber would, and events of one run are
+always delivered in order.
+
+Each frame's SSE id names only the delivering run (``runA:12``, run ids
+percent-encoded), so ids stay short however many runs share the stream. To
+resume, the client joins the last id it saw per run into a composite cursor
+(``runA:12,runB:7``) and sends that as ``Last-Event-ID``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import uuid
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Tuple
+from urllib.parse import quote, unquote
+
+from .events import RelayedEvent
+
+logger = logging.getLogger(__name__)
+
+EventSource = Callable[[str, Optional[int]], AsyncIterator[Any]]
+
+# Remembered so a client subscription does not pick a finished run up again.
+_FINISHED_MEMORY = 1024
+
+
+def parse_cursor(value: str) -> Dict[str, int]:
+    """Parse a composite Last-Event-ID; raises ``ValueError`` when malformed."""
+    cursors: Dict[str, int] = {}
+    for part in value.strip().split(","):
+        if not part:
+            continue
+        run_id, separator, event_id = part.rpartition(":")
+        if not separator or not run_id:
+            raise ValueError(f"Invalid cursor entry {part!r}")
+        cursors[unquote(run_id)] = int(event_id)
+    return cursors
+
+
+async def parse_sse(lines: AsyncIterator[str]) -> AsyncIterator[RelayedEvent]:
+    event_id: Optional[int] = None
+    event = "message"
+    data: list[str] = []
+    async for line in lines:
+        if not line:
+            if data:
+                yield RelayedEvent(event_id, event, "\n".join(data))
+            event_id, event, data = None, "message", []
+            continue
+        if line.startswith(":"):
+            continue
+        field, _, value = line.partition(":")
+        value = value[1:] if value.startswith(" ") else value
+        if field == "id":
+            event_id = int(value) if value.isdigit() else None
+        elif field == "event":
+            event = value
+        elif field == "data":
+            data.append(value)
+
+
+class EventMux:
+    """One subscriber's merged view over several runs' events.
+
+    ``source(run_id, last_event_id)`` yields a run's events (normally
+    ``RunManager.stream_events``). Runs can be added and removed while
+    ``events()`` is being consumed. Unless ``persistent``, the stream ends
+    once every subscribed run has delivered its last event.
+    """
+
+    def __init__(self, source: EventSource, persistent: bool = False, stream_id: Optional[str] = None):
+        self.stream_id = stream_id or uuid.uuid4().hex
+        self.persistent = persistent
+        self._source = source
+        self._iterators: Dict[str, AsyncIterator[Any]] = {}
+        self._pending: Dict[str, asyncio.Future[Any]] = {}
+        self._cursors: Dict[str, int] = {}
+        self._cursor_parts: Dict[str, str] = {}
+        self._ephemeral: set[str] = set()
+        self._finished: OrderedDict[str, None] = OrderedDict()
+        self._changed: Optional[asyncio.Future[None]] = None
+        self._closed = False
+
+    @property
+    def runs(self) -> list[str]:
+        """Runs still streaming on this connection."""
+        return list(self._iterators)
+
+    @property
+    def cursor(self) -> str:
+        """Composite cursor over every run on the stream."""
+        return ",".join(self._cursor_parts.values())
+
+    def run_cursor(self, run_id: str) -> str:
+        """``runId:eventId`` of the last event delivered for ``run_id``."""
+        return self._cursor_parts.get(run_id) or _cursor_part(run_id, self._cursors.get(run_id, 0))
+
+    def add(self, run_id: str, last_event_id: Optional[int] = None, ephemeral: bool = False) -> bool:
+        """Subscribe to ``run_id``; ``ephemeral`` runs leave the cursor once finished."""
+        if self._closed or run_id in self._iterators or (ephemeral and run_id in self._finished):
+            return False
+        if last_event_id is None:
+            last_event_id = self._cursors.get(run_id)
+        if ephemeral:
+            self._ephemeral.add(run_id)
+        self._set_cursor(run_id, last_event_id or 0)
+        self._iterators[run_id] = self._source(run_id, last_event_id)
+        self._notify()
+        return True
+
+    def remove(self, run_id: str) -> bool:
+        iterator = self._iterators.pop(run_id, None)
+        self._cursors.pop(run_id, None)
+        self._cursor_parts.pop(run_id, None)
+        self._ephemeral.discard(run_id)
+        pending = self._pending.pop(run_id, None)
+        if pending is not None:
+            pending.cancel()
+        self._notify()
+        return iterator is not None
+
+    def close(self) -> None:
+        self._closed = True
+        self._notify()
+
+    async def events(self) -> AsyncIterator[Tuple[str, Any]]:
+        """Yield ``(run_id, event)`` pairs as they arrive from any subscribed run."""
+        loop = asyncio.get_running_loop()
+        try:
+            while not self._closed and (self._iterators or self.persistent):
+                for run_id, iterator in self._iterators.items():
+                    if run_id not in self._pending:
+                        self._pending[run_id] = asyncio.ensure_future(iterator.__anext__())
+                self._changed = loop.create_future()
+                await asyncio.wait([*self._pending.values(), self._changed], return_when=asyncio.FIRST_COMPLETED)
+                for run_id, pending in list(self._pending.items()):
+                    # add()/remove() may run while a previous event is being sent.
+                    if not pending.done() or self._pending.get(run_id) is not pending:
+                        continue
+                    del self._pending[run_id]
+                    try:
+                        event = pending.result()
+                    except StopAsyncIteration:
+                        self._finish(run_id)
+                        continue
+                    except asyncio.CancelledError:
+                        continue
+                    except Exception:  # noqa: BLE001
+                        logger.warning("Event stream for run %s failed", run_id, exc_info=True)
+                        self._finish(run_id)
+                        continue
+                    if event.id is not None:
+                        self._set_cursor(run_id, event.id)
+                    yield run_id, event
+        finally:
+            self._closed = True
+            await self._shutdown()
+
+    def _set_cursor(self, run_id: str, event_id: int) -> None:
+        self._cursors[run_id] = event_id
+        self._cursor_parts[run_id] = _cursor_part(run_id, event_id)
+
+    def _finish(self, run_id: str) -> None:
+        self._iterators.pop(run_id, None)
+        if run_id in self._ephemeral:
+            self._ephemeral.discard(run_id)
+            self._cursors.pop(run_id, None)
+            self._cursor_parts.pop(run_id, None)
+            self._finished[run_id] = None
+            if len(self._finished) > _FINISHED_MEMORY:
+                self._finished.popitem(last=False)
+
+    def _notify(self) -> None:
+        changed = self._changed
+        if changed is not None and not changed.done():
+            changed.set_result(None)
+
+    async def _shutdown(self) -> None:
+        pending = list(self._pending.values())
+        self._pending.clear()
+        for future in pending:
+            future.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        iterators = list(self._iterators.values())
+        self._iterators.clear()
+        await asyncio.gather(*(_aclose(iterator) for iterator in iterators), return_exceptions=True)
+
+
+def _cursor_part(run_id: str, event_id: int) -> str:
+    return f"{quote(run_id, safe='')}:{event_id}"
+
+
+async def _aclose(iterator: AsyncIterator[Any]) -> None:
+    aclose = getattr(iterator, "aclose", None)
+    if aclose is not None:
+        await aclose()
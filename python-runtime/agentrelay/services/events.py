@@ -0,0 +1,268 @@
+"""Typed run events and their direct-to-bytes SSE encoding.
+
+Event payloads are small dicts of strings and numbers, so the hot event types
+render their JSON from a fixed template with the C-accelerated string quoter
+instead of going through ``jsonable_encoder`` + ``json.dumps``. The resulting
+frames are byte-identical to what sse-starlette produces for
+``{"id": ..., "event": ..., "data": json.dumps(payload)}``.
+"""
+
+from __future__ import annotations
+
+import json
+from json.encoder import encode_basestring_ascii as _quote
+from typing import Any, ClassVar, Optional
+
+_SEP = b"\r\n"
+_TERMINATOR = b"\r\n\r\n"
+
+
+def _fallback(value: Any) -> Any:
+    from fastapi.encoders import jsonable_encoder
+
+    return jsonable_encoder(value)
+
+
+def encode_json(payload: Any) -> str:
+    return json.dumps(payload, default=_fallback)
+
+
+class RunEvent:
+    """Base class for SSE events emitted by a run.
+
+    Subclasses declare ``event`` (the SSE event name) and ``payload``; the
+    per-type ``event:``/``data:`` framing prefix is computed once per class.
+    Serialised data and the encoded frame are cached on the instance so every
+    subscriber shares the same bytes.
+    """
+
+    __slots__ = ("id", "_data", "_frame")
+
+    event: ClassVar[str] = ""
+    _prefix: ClassVar[bytes] = b""
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        if cls.event:
+            cls._prefix = b"event: " + cls.event.encode("utf-8") + _SEP + b"data: "
+
+    def __init__(self) -> None:
+        self.id: Optional[int] = None
+        self._data: Optional[str] = None
+        self._frame: Optional[bytes] = None
+
+    def payload(self) -> dict[str, Any]:
+        raise NotImplementedError
+
+    def _encode_data(self) -> str:
+        return encode_json(self.payload())
+
+    @property
+    def data(self) -> str:
+        data = self._data
+        if data is None:
+            data = self._data = self._encode_data()
+        return data
+
+    def encode(self) -> bytes:
+        """Return the complete SSE frame (``id``/``event``/``data`` lines plus blank line)."""
+        frame = self._frame
+        if frame is None:
+            head = b"id: %d\r\n" % self.id if self.id is not None else b""
+            frame = self._frame = head + self._prefix + self.data.encode("utf-8") + _TERMINATOR
+        return frame
+
+    def encode_as(self, event_id: str) -> bytes:
+        """Frame the event under another SSE ``id``, e.g. a multiplexed stream's cursor."""
+        return b"id: " + event_id.encode("utf-8") + _SEP + self._prefix + self.data.encode("utf-8") + _TERMINATOR
+
+    def as_dict(self) -> dict[str, Any]:
+        event: dict[str, Any] = {"event": self.event, "data": self.data}
+        if self.id is not None:
+            event["id"] = self.id
+        return event
+
+    def __getitem__(self, key: str) -> Any:
+        # Dict-style access kept for callers written against the old event dicts.
+        if key == "event":
+            return self.event
+        if key == "data":
+            return self.data
+        if key == "id" and self.id is not None:
+            return self.id
+        raise KeyError(key)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(id={self.id!r}, data={self.data!r})"
+
+
+class RunStarted(RunEvent):
+    __slots__ = ("run_id",)
+    event = "run.started"
+
+    def __init__(self, run_id: str):
+        super().__init__()
+        self.run_id = run_id
+
+    def payload(self) -> dict[str, Any]:
+        return {"runId": self.run_id}
+
+    def _encode_data(self) -> str:
+        return '{"runId": ' + _quote(self.run_id) + "}"
+
+
+class RunQueued(RunEvent):
+    __slots__ = ("run_id", "position")
+    event = "run.queued"
+
+    def __init__(self, run_id: str, position: int):
+        super().__init__()
+        self.run_id = run_id
+        self.position = position
+
+    def payload(self) -> dict[str, Any]:
+        return {"runId": self.run_id, "position": self.position}
+
+    def _encode_data(self) -> str:
+        return '{"runId": ' + _quote(self.run_id) + ', "position": ' + str(int(self.position)) + "}"
+
+
+class RunDelta(RunEvent):
+    __slots__ = ("run_id", "text")
+    event = "run.delta"
+
+    def __init__(self, run_id: str, text: str):
+        super().__init__()
+        self.run_id = run_id
+        self.text = text
+
+    def payload(self) -> dict[str, Any]:
+        return {"runId": self.run_id, "text": self.text}
+
+    def _encode_data(self) -> str:
+        return '{"runId": ' + _quote(self.run_id) + ', "text": ' + _quote(self.text) + "}"
+
+
+class RunToolCall(RunEvent):
+    __slots__ = ("run_id", "tool_call_id", "tool_id", "arguments", "timeout_sec")
+    event = "run.tool_call"
+
+    def __init__(self, run_id: str, tool_call_id: str, tool_id: str, arguments: Any, timeout_sec: float):
+        super().__init__()
+        self.run_id = run_id
+        self.tool_call_id = tool_call_id
+        self.tool_id = tool_id
+        self.arguments = arguments
+        self.timeout_sec = timeout_sec
+
+    def payload(self) -> dict[str, Any]:
+        return {
+            "runId": self.run_id,
+            "toolCallId": self.tool_call_id,
+            "toolId": self.tool_id,
+            "arguments": self.arguments,
+            "timeoutSec": self.timeout_sec,
+        }
+
+
+class RunToolProgress(RunEvent):
+    __slots__ = ("run_id", "tool_call_id", "stream_chunk")
+    event = "run.tool_progress"
+
+    def __init__(self, run_id: str, tool_call_id: str, stream_chunk: str):
+        super().__init__()
+        self.run_id = run_id
+        self.tool_call_id = tool_call_id
+        self.stream_chunk = stream_chunk
+
+    def payload(self) -> dict[str, Any]:
+        return {"runId": self.run_id, "toolCallId": self.tool_call_id, "streamChunk": self.stream_chunk}
+
+    def _encode_data(self) -> str:
+        return (
+            '{"runId": '
+            + _quote(self.run_id)
+            + ', "toolCallId": '
+            + _quote(self.tool_call_id)
+            + ', "streamChunk": '
+            + _quote(self.stream_chunk)
+            + "}"
+        )
+
+
+class RunNodeOutput(RunEvent):
+    __slots__ = ("run_id", "node", "output")
+    event = "run.node_output"
+
+    def __init__(self, run_id: str, node: str, output: Any):
+        super().__init__()
+        self.run_id = run_id
+        self.node = node
+        self.output = output
+
+    def payload(self) -> dict[str, Any]:
+        return {"runId": self.run_id, "node": self.node, "output": self.output}
+
+
+class RunCompleted(RunEvent):
+    __slots__ = ("run_id", "response", "metadata")
+    event = "run.completed"
+
+    def __init__(self, run_id: str, response: str, metadata: Optional[dict[str, Any]] = None):
+        super().__init__()
+        self.run_id = run_id
+        self.response = response
+        self.metadata = metadata or {}
+
+    def payload(self) -> dict[str, Any]:
+        return {"runId": self.run_id, "response": self.response, "metadata": self.metadata}
+
+
+class RunFailed(RunEvent):
+    __slots__ = ("run_id", "error_code", "message", "details")
+    event = "run.failed"
+
+    def __init__(self, run_id: str, error_code: str, message: str, details: Optional[dict[str, Any]] = None):
+        super().__init__()
+        self.run_id = run_id
+        self.error_code = error_code
+        self.message = message
+        self.details = details
+
+    def payload(self) -> dict[str, Any]:
+        payload: dict[str, Any] = {"runId": self.run_id, "errorCode": self.error_code, "message": self.message}
+        if self.details is not None:
+            payload["details"] = self.details
+        return payload
+
+
+class RunCancelled(RunEvent):
+    __slots__ = ("run_id", "reason")
+    event = "run.cancelled"
+
+    def __init__(self, run_id: str, reason: str = "cancelled_by_client"):
+        super().__init__()
+        self.run_id = run_id
+        self.reason = reason
+
+    def payload(self) -> dict[str, Any]:
+        return {"runId": self.run_id, "reason": self.reason}
+
+    def _encode_data(self) -> str:
+        return '{"runId": ' + _quote(self.run_id) + ', "reason": ' + _quote(self.reason) + "}"
+
+
+class RelayedEvent:
+    """An event parsed from another worker's SSE stream, re-framed as received."""
+
+    __slots__ = ("id", "event", "data")
+
+    def __init__(self, event_id: Optional[int], event: str, data: str):
+        self.id = event_id
+        self.event = event
+        self.data = data
+
+    def encode_as(self, event_id: str) -> bytes:
+        prefix = b"event: " + self.event.encode("utf-8") + _SEP + b"data: "
+        data = self.data.encode("utf-8").replace(b"\n", _SEP + b"data: ")
+        return b"id: " + event_id.encode("utf-8") + _SEP + prefix + data + _TERMINATOR
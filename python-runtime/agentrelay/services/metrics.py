@@ -0,0 +1,226 @@
+"""Low-overhead run instrumentation rendered in the Prometheus text format.
+
+Instruments are only touched from the event loop thread, so they are plain
+counters without locks; histograms use fixed buckets so an observation is a
+bisect plus two integer increments.
+"""
+
+from __future__ import annotations
+
+import bisect
+import math
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+LATENCY_BUCKETS_SEC = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+WRITE_BUCKETS_SEC = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0)
+RATE_BUCKETS = (1.0, 2.0, 5.0, 10.0, 20.0, 35.0, 50.0, 75.0, 100.0, 150.0, 250.0, 500.0)
+
+
+def _format(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    __slots__ = ("name", "documentation", "label", "values")
+
+    def __init__(self, name: str, documentation: str, label: Optional[str] = None):
+        self.name = name
+        self.documentation = documentation
+        self.label = label
+        self.values: Dict[str, float] = {} if label else {"": 0}
+
+    def inc(self, amount: float = 1, label: str = "") -> None:
+        self.values[label] = self.values.get(label, 0) + amount
+
+    @property
+    def value(self) -> float:
+        return sum(self.values.values())
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        for label, value in self.values.items():
+            suffix = f'{{{self.label}="{label}"}}' if self.label else ""
+            yield f"{self.name}{suffix} {_format(value)}"
+
+
+class Histogram:
+    __slots__ = ("name", "documentation", "buckets", "counts", "sum", "count")
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float]):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate the ``q`` quantile by linear interpolation inside its bucket."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = self.buckets[index - 1] if index else 0.0
+                if index == len(self.buckets):
+                    return lower
+                upper = self.buckets[index]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.buckets[-1]
+
+    def summary(self, scale: float = 1.0) -> dict[str, Any]:
+        def scaled(value: Optional[float]) -> Optional[float]:
+            return round(value * scale, 3) if value is not None else None
+
+        return {
+            "count": self.count,
+            "mean": scaled(self.sum / self.count) if self.count else None,
+            "p50": scaled(self.quantile(0.5)),
+            "p95": scaled(self.quantile(0.95)),
+            "p99": scaled(self.quantile(0.99)),
+        }
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        cumulative = 0
+        for bound, bucket_count in zip((*self.buckets, math.inf), self.counts):
+            cumulative += bucket_count
+            yield f'{self.name}_bucket{{le="{_format(bound)}"}} {cumulative}'
+        yield f"{self.name}_sum {_format(self.sum)}"
+        yield f"{self.name}_count {self.count}"
+
+
+class RunMetrics:
+    """The instruments recorded by ``RunManager`` and the runs router."""
+
+    def __init__(self) -> None:
+        self.runs_started = Counter("agentrelay_runs_started_total", "Runs accepted by POST /runs.")
+        self.runs_finished = Counter("agentrelay_runs_finished_total", "Runs that reached a terminal event.", "status")
+        self.upstream_tokens = Counter(
+            "agentrelay_upstream_tokens_total", "Tokens reported by upstream usage, by kind.", "kind"
+        )
+        self.tool_calls = Counter(
+            "agentrelay_tool_calls_total", "Tool calls dispatched to the Host, by outcome.", "status"
+        )
+        self.tool_wait = Histogram(
+            "agentrelay_tool_wait_seconds", "Time from run.tool_call to the Host's result.", LATENCY_BUCKETS_SEC
+        )
+        self.queue_wait = Histogram(
+            "agentrelay_run_queue_wait_seconds", "Time a run waited for an admission slot.", LATENCY_BUCKETS_SEC
+        )
+        self.settings_load = Histogram(
+            "agentrelay_run_settings_load_seconds", "Time to resolve DeepSeek settings for a run.", WRITE_BUCKETS_SEC
+        )
+        self.client_acquire = Histogram(
+            "agentrelay_upstream_client_acquire_seconds",
+            "Time to lease (or build) a pooled upstream client.",
+            WRITE_BUCKETS_SEC,
+        )
+        self.upstream_open = Histogram(
+            "agentrelay_upstream_open_seconds", "Time until the upstream completion stream responded.", LATENCY_BUCKETS_SEC
+        )
+        self.time_to_first_token = Histogram(
+            "agentrelay_run_time_to_first_token_seconds",
+            "Time from admission to the run's first delta.",
+            LATENCY_BUCKETS_SEC,
+        )
+        self.duration = Histogram(
+            "agentrelay_run_duration_seconds", "Time from POST /runs to the run's terminal event.", LATENCY_BUCKETS_SEC
+        )
+        self.tokens_per_second = Histogram(
+            "agentrelay_run_tokens_per_second",
+            "Streaming rate after the first delta, counting content chunks as tokens.",
+            RATE_BUCKETS,
+        )
+        self.cancel_latency = Histogram(
+            "agentrelay_run_cancel_latency_seconds",
+            "Time from a cancel request to the run's run.cancelled event.",
+            LATENCY_BUCKETS_SEC,
+        )
+        self.sse_write = Histogram(
+            "agentrelay_sse_write_seconds", "Time to hand one SSE frame to the server transport.", WRITE_BUCKETS_SEC
+        )
+
+    def instruments(self) -> List[Any]:
+        return [value for value in vars(self).values() if isinstance(value, (Counter, Histogram))]
+
+    def render(self, gauges: Optional[Dict[str, tuple[str, float]]] = None) -> str:
+        """Render every instrument, plus point-in-time ``gauges`` given as name -> (help, value)."""
+        lines: List[str] = []
+        for instrument in self.instruments():
+            lines.extend(instrument.render())
+        for name, (documentation, value) in (gauges or {}).items():
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {_format(value)}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> dict[str, Any]:
+        """Millisecond percentiles for the ``/status`` metadata."""
+        return {
+            "runsStarted": self.runs_started.value,
+            "runsFinished": dict(self.runs_finished.values),
+            "upstreamTokens": dict(self.upstream_tokens.values),
+            "toolCalls": dict(self.tool_calls.values),
+            "toolWaitMs": self.tool_wait.summary(1000),
+            "queueWaitMs": self.queue_wait.summary(1000),
+            "timeToFirstTokenMs": self.time_to_first_token.summary(1000),
+            "durationMs": self.duration.summary(1000),
+            "tokensPerSec": self.tokens_per_second.summary(),
+            "cancelLatencyMs": self.cancel_latency.summary(1000),
+            "sseWriteMs": self.sse_write.summary(1000),
+        }
+
+
+def merge_expositions(texts: Iterable[str]) -> str:
+    """Combine several workers' renders by summing samples with the same name and labels.
+
+    Counters, histogram buckets and the count-style gauges rendered by
+    ``RunManager`` are all additive, so the sum is the process-wide value.
+    Samples are grouped under their family's HELP/TYPE lines, so a label
+    value only a later worker reports still lands inside its family.
+    """
+    # family -> (comment lines, sample key -> summed value), in first-seen order.
+    families: Dict[str, tuple[List[str], Dict[str, float]]] = {}
+    for text in texts:
+        for line in text.splitlines():
+            if not line:
+                continue
+            if line.startswith("#"):
+                parts = line.split(" ", 3)
+                if len(parts) < 3 or parts[1] not in ("HELP", "TYPE"):
+                    continue
+                comments, _ = families.setdefault(parts[2], ([], {}))
+                if line not in comments:
+                    comments.append(line)
+                continue
+            key, _, raw = line.rpartition(" ")
+            _, samples = families.setdefault(_family(key, families), ([], {}))
+            samples[key] = samples.get(key, 0) + float(raw)
+    lines: List[str] = []
+    for comments, samples in families.values():
+        lines.extend(comments)
+        lines.extend(f"{key} {_format(value)}" for key, value in samples.items())
+    return "\n".join(lines) + "\n"
+
+
+def _family(key: str, families: Dict[str, Any]) -> str:
+    """The metric family a sample belongs to, e.g. ``x`` for ``x_bucket{le="1"}``."""
+    name = key.partition("{")[0]
+    for suffix in ("_bucket", "_sum", "_count"):
+        if name.endswith(suffix) and name[: -len(suffix)] in families:
+            return name[: -len(suffix)]
+    return name
@@ -1,205 +1,893 @@
 from __future__ import annotations
 
 import asyncio
-import json
 import logging
-from dataclasses import dataclass, field
-from typing import Any, AsyncGenerator, Dict, List, Optional
-
-from fastapi.encoders import jsonable_encoder
-from openai import AsyncOpenAI
+import time
+from typing import Any, AsyncGenerator, Callable, List, Optional, Sequence, Tuple
 
 from ..config import AgentRelaySettings
+from ..workflows import WorkflowRegistry, WorkflowUnavailableError
+from .admission import AdmissionController, TooManyRunsError
+from .attachment_store import AttachmentNotFoundError, AttachmentStore
+from .client_pool import UpstreamClientPool
+from .completion_cache import CachedCompletion, CompletionCache, completion_cache_key
+from .delta_coalescer import CoalescingPolicy, DeltaCoalescer
+from .event_log import BufferBudget, RunEventLog
+from .events import (
+    RunCancelled,
+    RunCompleted,
+    RunDelta,
+    RunEvent,
+    RunFailed,
+    RunNodeOutput,
+    RunQueued,
+    RunStarted,
+    RunToolCall,
+    RunToolProgress,
+)
+from .metrics import RunMetrics
+from .run_registry import RunContext, RunRegistry, RunState
+from .run_retention import RetainedRun, RunRetentionStore
+from .session_store import SessionBusyError, SessionStore
 from .settings_store import SettingsStore
+from .single_flight import SharedGeneration, SingleFlight
+from .tool_calls import ToolCallClosedError, ToolSpec, parse_arguments, tool_message, tool_specs
 
 logger = logging.getLogger(__name__)
 
+# Used when a run has neither a prompt nor messages. A constant, so such runs
+# share one upstream prefix.
+DEFAULT_SYSTEM_PROMPT = "You are AgentRelay conversation assistant. Keep replies concise."
 
-class RunNotFoundError(Exception):
-    pass
+RunListener = Callable[[str, Optional[str]], Any]
 
 
-@dataclass
-class RunContext:
-    run_id: str
-    queue: asyncio.Queue[Optional[dict[str, Any]]]
-    task: Optional[asyncio.Task] = None
-    cancel_event: asyncio.Event = field(default_factory=asyncio.Event)
+class RunNotFoundError(Exception):
+    pass
 
 
 class RunManager:
-    def __init__(self, settings: AgentRelaySettings, settings_store: SettingsStore):
+    def __init__(
+        self,
+        settings: AgentRelaySettings,
+        settings_store: SettingsStore,
+        client_pool: Optional[UpstreamClientPool] = None,
+    ):
         self._settings = settings
         self._settings_store = settings_store
-        self._runs: Dict[str, RunContext] = {}
-        self._lock = asyncio.Lock()
+        self._client_pool = client_pool or UpstreamClientPool(settings)
+        self._deepseek_snapshot = settings_store.load().get("deepseek")
+        self._unsubscribe_settings = settings_store.subscribe(self._on_settings_changed)
+        self._admission = AdmissionController(settings.max_concurrent_runs, settings.max_queued_runs)
+        self._buffer_budget = BufferBudget(settings.event_buffer_max_bytes)
+        self._runs = RunRegistry()
+        self._retention = RunRetentionStore(
+            settings.retained_run_ttl_sec,
+            settings.retained_run_max_bytes,
+            settings.retention_sweep_interval_sec,
+        )
+        self._completion_cache = CompletionCache(
+            settings.completion_cache_memory_bytes,
+            settings.completion_cache_ttl_sec,
+            disk_dir=settings_store.data_dir / "completion-cache",
+            disk_max_bytes=settings.completion_cache_disk_bytes,
+        )
+        self._single_flight = SingleFlight(settings.single_flight_enabled, settings.upstream_read_ahead_chunks)
+        self._attachments = AttachmentStore(
+            settings_store.data_dir / "attachments",
+            settings.attachment_store_max_bytes,
+            settings.attachment_max_bytes,
+        )
+        self._sessions = SessionStore(settings.session_max_count, settings.session_ttl_sec, settings.session_token_budget)
+        self._workflows = WorkflowRegistry(
+            settings.agents_etag,
+            settings_store.data_dir / "workflow-checkpoints.pickle" if settings.workflow_checkpoint_persist else None,
+            settings.workflow_max_threads,
+        )
+        for agent_id, builder in settings.workflows.items():
+            self._workflows.register(agent_id, builder)
+        self._metrics = RunMetrics()
+        self._run_listeners: List[RunListener] = []
 
     async def create_run(self, run_id: str, payload: dict[str, Any]) -> None:
-        async with self._lock:
-            if run_id in self._runs:
-                raise ValueError("Run already exists")
-            queue: asyncio.Queue[Optional[dict[str, Any]]] = asyncio.Queue()
-            ctx = RunContext(run_id=run_id, queue=queue, task=None)  # type: ignore[arg-type]
-            task = asyncio.create_task(self._execute_run(ctx, payload))
-            ctx.task = task
-            self._runs[run_id] = ctx
-
-        def _cleanup(task: asyncio.Task) -> None:
+        if run_id in self._runs or run_id in self._retention:
+            raise ValueError("Run already exists")
+        payload = self._open_turn(run_id, payload)
+        try:
+            self._start_run(run_id, payload, self._request_key(payload), payload.get("clientId"))
+        except (TooManyRunsError, AttachmentNotFoundError):
+            self._close_turn(run_id, payload.get("sessionId"), None)
+            raise
+
+    async def create_runs(
+        self,
+        runs: Sequence[Tuple[str, dict[str, Any]]],
+        atomic: bool = False,
+        group: Optional[str] = None,
+    ) -> List[Optional[Exception]]:
+        """Create a batch of runs in one synchronous step.
+
+        Returns one entry per run: ``None`` if it was created, otherwise the
+        ``ValueError``, ``SessionBusyError``, ``AttachmentNotFoundError`` or
+        ``TooManyRunsError`` ``create_run`` would have raised. With ``atomic`` nothing is created
+        unless every run can be. Queued runs of the batch share the admission
+        ``group`` so they take turns with other clients instead of blocking
+        them.
+        """
+        errors: List[Optional[Exception]] = []
+        keys: List[Optional[str]] = []
+        seen: set[str] = set()
+        sessions: dict[str, str] = {}
+        capacity = self._admission.available()
+        for run_id, payload in runs:
+            session_id = payload.get("sessionId")
+            # A session turn's request is only known once the turn is opened.
+            key = None if session_id else self._request_key(payload)
+            keys.append(key)
+            busy = self._session_busy(session_id, sessions.get(session_id)) if session_id else None
+            if run_id in seen or run_id in self._runs or run_id in self._retention:
+                errors.append(ValueError("Run already exists"))
+            elif busy is not None:
+                errors.append(busy)
+            elif payload.get("imageReference") and self._attachments.get(payload["imageReference"]) is None:
+                errors.append(AttachmentNotFoundError(payload["imageReference"]))
+            elif key is not None and self._shareable(payload) and self._single_flight.in_flight(key):
+                errors.append(None)
+            elif capacity > 0:
+                capacity -= 1
+                errors.append(None)
+            else:
+                errors.append(TooManyRunsError(self._admission.retry_after_sec()))
+            seen.add(run_id)
+            if session_id and errors[-1] is None:
+                sessions[session_id] = run_id
+        if atomic and any(errors):
+            return errors
+        for (run_id, payload), key, error in zip(runs, keys, errors):
+            if error is None:
+                payload = self._open_turn(run_id, payload)
+                self._start_run(run_id, payload, key or self._request_key(payload), group or payload.get("clientId"))
+        return errors
+
+    def _session_busy(self, session_id: str, batch_run_id: Optional[str]) -> Optional[SessionBusyError]:
+        if batch_run_id is not None:
+            return SessionBusyError(session_id, batch_run_id)
+        try:
+            self._sessions.check(session_id)
+        except SessionBusyError as exc:
+            return exc
+        return None
+
+    def _open_turn(self, run_id: str, payload: dict[str, Any]) -> dict[str, Any]:
+        """Resolve a session run's full message list from the stored history."""
+        session_id = payload.get("sessionId")
+        if not session_id:
+            return payload
+        prompt = payload.get("prompt")
+        system = {"role": "system", "content": prompt} if prompt else None
+        messages = self._sessions.begin_turn(session_id, run_id, _conversation_messages(payload), system)
+        return {**payload, "messages": messages}
+
+    def _close_turn(self, run_id: str, session_id: Optional[str], reply: Optional[str]) -> None:
+        if session_id:
+            self._sessions.end_turn(session_id, run_id, reply)
+
+    @property
+    def sessions(self) -> SessionStore:
+        return self._sessions
+
+    @property
+    def attachments(self) -> AttachmentStore:
+        return self._attachments
+
+    @property
+    def workflows(self) -> WorkflowRegistry:
+        return self._workflows
+
+    def _shareable(self, payload: dict[str, Any]) -> bool:
+        """Whether the run may share an upstream generation; tool and workflow runs never do."""
+        return not payload.get("toolInventory") and payload.get("agentId") not in self._workflows
+
+    def _start_run(self, run_id: str, payload: dict[str, Any], request_key: str, group: Optional[str]) -> None:
+        # Everything up to registering the run is synchronous, so callers'
+        # existence checks and the insert cannot interleave with another call.
+        self._retention.ensure_sweeper()
+        attachment_id = payload.get("imageReference")
+        if attachment_id and self._attachments.get(attachment_id) is None:
+            raise AttachmentNotFoundError(attachment_id)
+        # A duplicate of a run that is already streaming adds no upstream
+        # load, so it attaches to that generation without an admission slot.
+        generation = self._single_flight.attach(request_key) if self._shareable(payload) else None
+        ticket = self._admission.reserve(run_id, group) if generation is None else None
+        if attachment_id:
+            # Pinned until the run finishes so eviction cannot pull it away.
+            self._attachments.pin(attachment_id)
+        ctx = RunContext(
+            run_id=run_id,
+            log=RunEventLog(
+                self._settings.run_event_buffer_size,
+                run_id=run_id,
+                max_bytes=self._settings.run_buffer_max_bytes,
+                policy=payload.get("constraints", {}).get("slowConsumerPolicy")
+                or self._settings.slow_consumer_policy,
+                budget=self._buffer_budget,
+            ),
+            ticket=ticket,
+            state="queued" if ticket and not ticket.granted.done() else "running",
+            agent_id=payload.get("agentId"),
+            client_id=payload.get("clientId"),
+            session_id=payload.get("sessionId"),
+            attachment_id=attachment_id,
+            request_key=request_key,
+            generation=generation,
+        )
+        self._metrics.runs_started.inc()
+        self._emit(ctx, RunStarted(run_id))
+        if ctx.state == "queued":
+            ticket.on_position = lambda position: self._announce_position(ctx, position)  # type: ignore[union-attr]
+            self._announce_position(ctx, self._admission.position(ticket))  # type: ignore[arg-type]
+        ctx.task = asyncio.create_task(self._execute_run(ctx, payload))
+        self._runs.add(ctx)
+        ctx.task.add_done_callback(lambda task: self._finalize_run(ctx, task))
+        for listener in list(self._run_listeners):
             try:
-                task.result()
-            except asyncio.CancelledError:
-                pass
-            except Exception as exc:  # noqa: BLE001
-                logger.exception("Run %s failed: %s", run_id, exc)
-            finally:
-                asyncio.create_task(self._finalize_run(run_id))
+                listener(run_id, ctx.client_id)
+            except Exception:  # noqa: BLE001
+                logger.exception("Run listener %r failed", listener)
 
-        task.add_done_callback(_cleanup)
+    def subscribe_runs(self, listener: RunListener) -> Callable[[], None]:
+        """Call ``listener(run_id, client_id)`` for every run created from now on."""
+        self._run_listeners.append(listener)
 
-    async def _finalize_run(self, run_id: str) -> None:
-        async with self._lock:
-            ctx = self._runs.pop(run_id, None)
-        if ctx:
-            await ctx.queue.put(None)
-
-    async def stream_events(self, run_id: str) -> AsyncGenerator[dict[str, Any], None]:
-        ctx = await self._get_context(run_id)
-        while True:
-            event = await ctx.queue.get()
-            if event is None:
-                break
+        def unsubscribe() -> None:
+            if listener in self._run_listeners:
+                self._run_listeners.remove(listener)
+
+        return unsubscribe
+
+    @property
+    def client_pool(self) -> UpstreamClientPool:
+        return self._client_pool
+
+    @property
+    def admission(self) -> AdmissionController:
+        return self._admission
+
+    @property
+    def metrics(self) -> RunMetrics:
+        return self._metrics
+
+    def render_metrics(self) -> str:
+        """Prometheus text exposition of the run instruments plus current gauges."""
+        admission = self._admission.stats()
+        return self._metrics.render(
+            {
+                "agentrelay_active_runs": ("Runs holding an admission slot.", admission["activeRuns"]),
+                "agentrelay_queued_runs": ("Runs waiting for an admission slot.", admission["queuedRuns"]),
+                "agentrelay_event_buffer_bytes": ("Bytes buffered across run event logs.", self._buffer_budget.used_bytes),
+                "agentrelay_upstream_in_flight": (
+                    "Upstream generations currently streaming.",
+                    self._single_flight.stats()["inFlight"],
+                ),
+            }
+        )
+
+    def list_runs(
+        self,
+        state: Optional[RunState] = None,
+        agent_id: Optional[str] = None,
+        client_id: Optional[str] = None,
+    ) -> List[dict[str, Any]]:
+        """Summaries of live runs, filtered through the registry's indexes."""
+        return [ctx.summary() for ctx in self._runs.query(state, agent_id, client_id)]
+
+    def stats(self) -> dict[str, Any]:
+        stats = self._admission.stats()
+        stats["registry"] = self._runs.counts()
+        stats["eventBuffers"] = self._buffer_budget.stats()
+        stats["retention"] = self._retention.stats()
+        stats["completionCache"] = self._completion_cache.stats()
+        stats["singleFlight"] = self._single_flight.stats()
+        stats["sessions"] = self._sessions.stats()
+        stats["attachments"] = self._attachments.stats()
+        stats["workflows"] = self._workflows.stats()
+        return stats
+
+    def _on_settings_changed(self, data: dict[str, Any]) -> None:
+        deepseek = data.get("deepseek")
+        if deepseek != self._deepseek_snapshot:
+            self._deepseek_snapshot = dict(deepseek) if deepseek else None
+            self._client_pool.invalidate()
+
+    async def aclose(self) -> None:
+        self._unsubscribe_settings()
+        for ctx in self._runs:
+            if ctx.task:
+                ctx.task.cancel()
+        await self._retention.aclose()
+        await self._workflows.aclose()
+        await self._client_pool.aclose()
+
+    def _finalize_run(self, ctx: RunContext, task: asyncio.Task) -> None:
+        """Move a finished run from the live registry into retention in one step."""
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Run %s failed", ctx.run_id, exc_info=task.exception())
+        # Normally closed by the terminal event; this covers runs that died without one.
+        self._close_turn(ctx.run_id, ctx.session_id, None)
+        ctx.tool_calls.close_all("RUN_FINISHED")
+        if ctx.attachment_id:
+            self._attachments.unpin(ctx.attachment_id)
+        if self._runs.remove(ctx.run_id) is ctx:
+            self._retention.add(RetainedRun.from_events(ctx.run_id, ctx.log.since(None), ctx.log.last_id))
+        ctx.log.close()
+
+    async def stream_events(
+        self,
+        run_id: str,
+        last_event_id: Optional[int] = None,
+    ) -> AsyncGenerator[RunEvent, None]:
+        """Yield a run's events, replaying buffered ones after ``last_event_id`` first.
+
+        Any number of subscribers may follow the same run; each keeps its own
+        cursor into the run's event log, so late joiners catch up from the
+        buffer instead of competing for events.
+        """
+        ctx = self._runs.get(run_id)
+        if ctx is None:
+            record = self._retention.get(run_id)
+            if record is None:
+                raise RunNotFoundError(run_id)
+            for event in record.replay(last_event_id):
+                yield event
+            return
+        async for event in ctx.log.follow(last_event_id):
             yield event
 
     async def cancel_run(self, run_id: str) -> None:
-        ctx = await self._get_context(run_id)
+        ctx = self._runs.get(run_id)
+        if ctx:
+            self._request_cancel(ctx)
+        elif self._retention.get(run_id) is None:
+            raise RunNotFoundError(run_id)
+
+    def _request_cancel(self, ctx: RunContext) -> None:
+        """Stop a run promptly: wake its reader, free its slot and arm the deadline."""
+        if ctx.finished or ctx.cancel_event.is_set():
+            return
+        ctx.cancel_requested_at = time.perf_counter()
         ctx.cancel_event.set()
+        # The slot is free as soon as the run stops consuming; the upstream
+        # stream may take a moment longer to close but no longer counts.
+        self._release_slot(ctx)
+        asyncio.get_running_loop().call_later(self._settings.cancel_deadline_sec, self._enforce_cancel, ctx)
+
+    def _enforce_cancel(self, ctx: RunContext) -> None:
+        if not ctx.finished and ctx.task is not None and not ctx.task.done():
+            logger.warning("Run %s did not stop within the cancel deadline; aborting it", ctx.run_id)
+            ctx.task.cancel()
 
     async def ensure_run_exists(self, run_id: str) -> None:
-        await self._get_context(run_id)
+        await self.get_run(run_id)
 
-    async def _get_context(self, run_id: str) -> RunContext:
-        async with self._lock:
-            ctx = self._runs.get(run_id)
-        if not ctx:
+    async def get_run(self, run_id: str) -> dict[str, Any]:
+        """Summarise a live or retained run (status, and the result once finished)."""
+        ctx = self._runs.get(run_id)
+        if ctx:
+            return ctx.summary()
+        record = self._retention.get(run_id)
+        if record is None:
             raise RunNotFoundError(run_id)
-        return ctx
+        return record.summary()
 
     async def _execute_run(
         self,
         ctx: RunContext,
         payload: dict[str, Any],
     ) -> None:
-        run_id = ctx.run_id
-        queue = ctx.queue
+        try:
+            if await self._wait_for_admission(ctx):
+                self._runs.set_state(ctx, "running")
+                ctx.admitted_at = time.perf_counter()
+                if ctx.ticket:
+                    self._metrics.queue_wait.observe(ctx.ticket.queue_time)
+                if ctx.agent_id in self._workflows:
+                    await self._run_workflow(ctx, payload)
+                else:
+                    await self._stream_completion(ctx, payload)
+        except asyncio.CancelledError:
+            if not ctx.cancel_event.is_set():
+                raise
+            self._emit(ctx, RunCancelled(ctx.run_id))
+        finally:
+            self._release_slot(ctx)
+            if ctx.generation is not None:
+                self._single_flight.leave(ctx.generation)
+                ctx.generation = None
+
+    def _release_slot(self, ctx: RunContext) -> None:
+        """Free the run's admission slot once no joined run still follows its upstream generation.
+
+        Joined runs hold no slot of their own, so the generation keeps the
+        originator's until it finishes; otherwise cancelling originators would
+        let live upstream streams exceed ``max_concurrent_runs``.
+        """
+        ticket, generation = ctx.ticket, ctx.generation
+        if ticket is None:
+            return
+        if generation is not None and generation.attached > 1 and generation.task and not generation.task.done():
+            generation.task.add_done_callback(lambda _: self._admission.release(ticket))
+        else:
+            self._admission.release(ticket)
+
+    async def _wait_for_admission(self, ctx: RunContext) -> bool:
+        ticket = ctx.ticket
+        if ticket is not None and not ticket.granted.done():
+            cancelled = asyncio.ensure_future(ctx.cancel_event.wait())
+            try:
+                await asyncio.wait({ticket.granted, cancelled}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                cancelled.cancel()
+                ticket.on_position = None
+        if ctx.cancel_event.is_set():
+            self._emit(ctx, RunCancelled(ctx.run_id))
+            return False
+        return True
+
+    def _announce_position(self, ctx: RunContext, position: int) -> None:
+        self._emit(ctx, RunQueued(ctx.run_id, position))
 
-        await queue.put(self._event("run.started", {"runId": run_id}))
+    async def _stream_completion(self, ctx: RunContext, payload: dict[str, Any]) -> None:
+        run_id = ctx.run_id
 
+        started = time.perf_counter()
         deepseek_settings = self._settings_store.get_deepseek_settings(
             default_base=self._settings.deepseek_api_base,
         )
+        ctx.settings_load_sec = time.perf_counter() - started
+        self._metrics.settings_load.observe(ctx.settings_load_sec)
         api_key = deepseek_settings.get("apiKey")
         if not api_key:
-            await queue.put(
-                self._event(
-                    "run.failed",
-                    {
-                        "runId": run_id,
-                        "errorCode": "MISSING_API_KEY",
-                        "message": "DeepSeek API key is not configured.",
-                    },
-                )
-            )
+            self._emit(ctx, RunFailed(run_id, "MISSING_API_KEY", "DeepSeek API key is not configured."))
             return
 
         base_url = deepseek_settings.get("baseUrl") or self._settings.deepseek_api_base
 
-        client = AsyncOpenAI(
-            api_key=api_key,
-            base_url=base_url,
+        messages = self._build_messages(payload)
+        constraints = payload.get("constraints", {})
+        temperature = constraints.get("temperature", 0.2)
+        coalescer = DeltaCoalescer(
+            CoalescingPolicy.resolve(self._settings, constraints.get("deltaCoalescing")),
+            lambda text: self._emit(ctx, RunDelta(run_id, text)),
         )
 
-        messages = self._build_messages(payload)
-        temperature = payload.get("constraints", {}).get("temperature", 0.2)
+        request_key = ctx.request_key
+        tools = tool_specs(payload.get("toolInventory") or [])
+        use_cache = constraints.get("cache")
+        use_cache = use_cache if use_cache is not None else self._settings.completion_cache_enabled
+        # A tool run's answer depends on what the Host's tools return.
+        use_cache = use_cache and not tools
+        generation = ctx.generation
+        if generation is None and use_cache:
+            cached = await self._completion_cache.get(request_key)
+            if cached is not None:
+                await self._replay_cached(ctx, cached, coalescer)
+                return
+
+        image_url: Optional[str] = None
+
+        async def produce(generation: SharedGeneration) -> None:
+            nonlocal image_url
+            upstream_messages = messages
+            if ctx.attachment_id:
+                # Read only now, so a cache hit or a joined run never loads it.
+                if image_url is None:
+                    image_url = await self._attachments.data_url(ctx.attachment_id)
+                upstream_messages = _with_image(messages, image_url)
+            await self._produce_completion(api_key, base_url, upstream_messages, temperature, generation, tools)
 
+        joined = generation is not None
+        if generation is None:
+            generation = ctx.generation = self._single_flight.start(request_key, produce, shared=not tools)
+        streamed: List[str] = []
+        usage: Optional[dict[str, int]] = None
+        rounds = 0
         try:
+            while True:
+                async for content in generation.follow(ctx.cancel_event):
+                    self._count_chunk(ctx)
+                    coalescer.push(content)
+                    await ctx.log.wait_for_capacity(self._settings.event_buffer_block_timeout_sec)
+                if ctx.cancel_event.is_set():
+                    coalescer.flush()
+                    self._emit(ctx, RunCancelled(run_id))
+                    return
+                streamed.extend(generation.chunks)
+                usage = _add_usage(usage, generation.usage)
+                if not generation.tool_calls or rounds >= self._settings.max_tool_rounds:
+                    break
+
+                # The model asked for tools: run them on the Host, then let it continue.
+                rounds += 1
+                coalescer.flush()
+                calls = generation.tool_calls
+                for index, call in enumerate(calls):
+                    call["id"] = call["id"] or f"call_{rounds}_{index}"
+                concurrency = constraints.get("maxToolConcurrency") or self._settings.max_tool_concurrency
+                results = await self._call_tools(ctx, tools, calls, concurrency)
+                if ctx.cancel_event.is_set():
+                    self._emit(ctx, RunCancelled(run_id))
+                    return
+                messages = [*messages, _tool_call_message("".join(generation.chunks), calls), *results]
+                self._single_flight.leave(generation)
+                generation = ctx.generation = self._single_flight.start(request_key, produce, shared=False)
+
+            coalescer.flush()
+            full_text = "".join(streamed).strip()
+            metadata = self._run_metadata(ctx)
+            if rounds:
+                metadata["toolRounds"] = rounds
+                if usage is not None:
+                    metadata["usage"] = usage
+            if joined:
+                metadata["deduplicated"] = True
+            if use_cache:
+                if not generation.stored:
+                    generation.stored = True
+                    await self._completion_cache.put(request_key, generation.chunks)
+                metadata["cached"] = False
+            self._emit(ctx, RunCompleted(run_id, full_text, metadata))
+        except AttachmentNotFoundError:
+            coalescer.flush()
+            self._emit(ctx, RunFailed(run_id, "ATTACHMENT_NOT_FOUND", "The referenced attachment is no longer stored."))
+        except Exception as exc:  # noqa: BLE001
+            logger.exception("Run %s failed", run_id)
+            coalescer.flush()
+            self._emit(ctx, RunFailed(run_id, "MODEL_ERROR", str(exc)))
+
+    async def _call_tools(
+        self,
+        ctx: RunContext,
+        tools: dict[str, ToolSpec],
+        calls: List[dict[str, str]],
+        concurrency: int,
+    ) -> List[dict[str, Any]]:
+        """Dispatch one turn's tool calls, at most ``concurrency`` at a time, and await them together."""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def call_with_slot(call: dict[str, str]) -> dict[str, Any]:
+            async with semaphore:
+                return await self._call_tool(ctx, tools.get(call["name"]), call)
+
+        results = await asyncio.gather(*(call_with_slot(call) for call in calls))
+        max_chars = self._settings.tool_output_max_chars
+        return [tool_message(call["id"], result, max_chars) for call, result in zip(calls, results)]
+
+    async def _call_tool(self, ctx: RunContext, spec: Optional[ToolSpec], call: dict[str, str]) -> dict[str, Any]:
+        """Announce one call as ``run.tool_call`` and wait for the Host's result or the timeout."""
+        if spec is None:
+            self._metrics.tool_calls.inc(label="unknown")
+            return {"status": "error", "errorCode": "UNKNOWN_TOOL", "stderr": f"No tool named {call['name']!r}."}
+        if ctx.cancel_event.is_set():
+            return {"status": "error", "errorCode": "RUN_CANCELLED"}
+        timeout = spec.timeout_sec or self._settings.tool_timeout_sec
+        future = ctx.tool_calls.open(call["id"])
+        started = time.perf_counter()
+        self._emit(ctx, RunToolCall(ctx.run_id, call["id"], spec.tool_id, parse_arguments(call["arguments"]), timeout))
+        cancelled = asyncio.ensure_future(ctx.cancel_event.wait())
+        try:
+            await asyncio.wait({future, cancelled}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            cancelled.cancel()
+        if future.done():
+            result = future.result()
+            outcome = result.get("status", "ok")
+            self._metrics.tool_wait.observe(time.perf_counter() - started)
+        elif ctx.cancel_event.is_set():
+            ctx.tool_calls.close(call["id"], "RUN_CANCELLED")
+            result = {"status": "error", "errorCode": "RUN_CANCELLED"}
+            outcome = "cancelled"
+        else:
+            # Late results are refused, so the model's view of the call stays final.
+            ctx.tool_calls.close(call["id"], "TOOL_TIMEOUT")
+            result = {"status": "timeout", "errorCode": "TOOL_TIMEOUT"}
+            outcome = "timeout"
+        self._metrics.tool_calls.inc(label=outcome)
+        return result
+
+    def submit_tool_result(self, run_id: str, tool_call_id: str, result: dict[str, Any]) -> None:
+        """Resolve a pending tool call with the Host's result."""
+        self._pending_tool_run(run_id, tool_call_id).tool_calls.resolve(tool_call_id, result)
+
+    def report_tool_progress(self, run_id: str, tool_call_id: str, chunk: str) -> None:
+        """Relay live tool output as ``run.tool_progress``; the run itself keeps waiting."""
+        ctx = self._pending_tool_run(run_id, tool_call_id)
+        self._emit(ctx, RunToolProgress(run_id, tool_call_id, chunk))
+
+    def _pending_tool_run(self, run_id: str, tool_call_id: str) -> RunContext:
+        ctx = self._runs.get(run_id)
+        if ctx is None:
+            if self._retention.get(run_id) is None:
+                raise RunNotFoundError(run_id)
+            raise ToolCallClosedError(tool_call_id, "RUN_FINISHED")
+        ctx.tool_calls.check(tool_call_id)
+        return ctx
+
+    async def _run_workflow(self, ctx: RunContext, payload: dict[str, Any]) -> None:
+        """Run the agent's compiled graph, emitting each node's update as ``run.node_output``.
+
+        Session runs keep their graph state in the session's checkpoint thread
+        and only pass the new turn; other runs pass the whole conversation on a
+        thread that is dropped when the run ends.
+        """
+        run_id = ctx.run_id
+        try:
+            graph = self._workflows.get(ctx.agent_id, self._settings.agents_etag)  # type: ignore[arg-type]
+        except WorkflowUnavailableError as exc:
+            self._emit(ctx, RunFailed(run_id, "WORKFLOW_UNAVAILABLE", str(exc)))
+            return
+        thread_id = ctx.session_id or run_id
+        messages = _conversation_messages(payload) if ctx.session_id else self._build_messages(payload)
+        config = {
+            "configurable": {
+                "thread_id": thread_id,
+                "run_id": run_id,
+                "agent_id": ctx.agent_id,
+                "locale": payload.get("locale"),
+            }
+        }
+        self._workflows.touch_thread(thread_id)
+        nodes = 0
+        try:
+            async for update in graph.astream({"messages": messages}, config, stream_mode="updates"):
+                if ctx.cancel_event.is_set():
+                    self._emit(ctx, RunCancelled(run_id))
+                    return
+                for node, output in update.items():
+                    nodes += 1
+                    self._emit(ctx, RunNodeOutput(run_id, node, output))
+                await ctx.log.wait_for_capacity(self._settings.event_buffer_block_timeout_sec)
+            state = await graph.aget_state(config)
+            metadata = self._run_metadata(ctx)
+            metadata["workflow"] = {"agentId": ctx.agent_id, "nodes": nodes}
+            self._emit(ctx, RunCompleted(run_id, _workflow_response(state.values), metadata))
+        except Exception as exc:  # noqa: BLE001
+            logger.exception("Workflow run %s failed", run_id)
+            self._emit(ctx, RunFailed(run_id, "WORKFLOW_ERROR", str(exc)))
+        finally:
+            if not ctx.session_id:
+                self._workflows.release_thread(thread_id)
+
+    async def _produce_completion(
+        self,
+        api_key: str,
+        base_url: str,
+        messages: List[dict[str, Any]],
+        temperature: float,
+        generation: SharedGeneration,
+        tools: Optional[dict[str, ToolSpec]] = None,
+    ) -> None:
+        """Stream one upstream completion into ``generation`` for every attached run."""
+        started = time.perf_counter()
+        async with self._client_pool.lease(api_key, base_url) as client:
+            leased = time.perf_counter()
+            self._metrics.client_acquire.observe(leased - started)
+            generation.timings["clientAcquireMs"] = _ms(leased - started)
+            options: dict[str, Any] = {}
+            if self._settings.upstream_include_usage:
+                options["stream_options"] = {"include_usage": True}
+            if tools:
+                options["tools"] = [spec.declaration() for spec in tools.values()]
             stream = await client.chat.completions.create(
                 model=self._settings.deepseek_model,
                 messages=messages,
                 stream=True,
                 temperature=temperature,
+                **options,
             )
-
-            accumulated: List[str] = []
-
-            async for chunk in stream:
-                if ctx.cancel_event.is_set():
-                    await queue.put(
-                        self._event(
-                            "run.cancelled",
-                            {"runId": run_id, "reason": "cancelled_by_client"},
-                        )
-                    )
-                    try:
-                        await stream.aclose()
-                    except Exception:  # noqa: BLE001
-                        pass
-                    return
-                for choice in chunk.choices:
-                    delta = getattr(choice, "delta", None)
-                    if not delta:
-                        continue
-                    content = getattr(delta, "content", None)
-                    if content:
-                        accumulated.append(content)
-                        await queue.put(
-                            self._event(
-                                "run.delta",
-                                {"runId": run_id, "text": content},
+            opened = time.perf_counter() - leased
+            self._metrics.upstream_open.observe(opened)
+            generation.timings["upstreamOpenMs"] = _ms(opened)
+            try:
+                async for chunk in stream:
+                    usage = getattr(chunk, "usage", None)
+                    if usage:
+                        self._record_usage(generation, usage)
+                    for choice in chunk.choices:
+                        delta = getattr(choice, "delta", None)
+                        if not delta:
+                            continue
+                        content = getattr(delta, "content", None)
+                        if content:
+                            await generation.wait_for_room()
+                            generation.push(content)
+                        for call in getattr(delta, "tool_calls", None) or ():
+                            function = call.function
+                            generation.push_tool_call(
+                                call.index,
+                                call.id,
+                                function.name if function else None,
+                                function.arguments if function else None,
                             )
-                        )
-
-            full_text = "".join(accumulated).strip()
-            await queue.put(
-                self._event(
-                    "run.completed",
-                    {"runId": run_id, "response": full_text},
-                )
-            )
-        except Exception as exc:  # noqa: BLE001
-            logger.exception("Run %s failed", run_id)
-            await queue.put(
-                self._event(
-                    "run.failed",
-                    {
-                        "runId": run_id,
-                        "errorCode": "MODEL_ERROR",
-                        "message": str(exc),
-                    },
-                )
-            )
+            finally:
+                try:
+                    await stream.close()
+                except Exception:  # noqa: BLE001
+                    pass
 
-    def _event(self, name: str, data: dict[str, Any]) -> dict[str, Any]:
-        return {
-            "event": name,
-            "data": json.dumps(jsonable_encoder(data)),
+    def _record_usage(self, generation: SharedGeneration, usage: Any) -> None:
+        # DeepSeek reports prefix-cache hits as prompt_cache_hit_tokens; the
+        # OpenAI-style field is prompt_tokens_details.cached_tokens.
+        cached = getattr(usage, "prompt_cache_hit_tokens", None)
+        if cached is None:
+            details = getattr(usage, "prompt_tokens_details", None)
+            cached = details.get("cached_tokens") if isinstance(details, dict) else getattr(details, "cached_tokens", None)
+        generation.usage = {
+            "promptTokens": usage.prompt_tokens or 0,
+            "completionTokens": usage.completion_tokens or 0,
+            "cachedPromptTokens": cached or 0,
         }
+        self._metrics.upstream_tokens.inc(generation.usage["promptTokens"], label="prompt")
+        self._metrics.upstream_tokens.inc(generation.usage["completionTokens"], label="completion")
+        self._metrics.upstream_tokens.inc(generation.usage["cachedPromptTokens"], label="cached_prompt")
+
+    async def _replay_cached(self, ctx: RunContext, cached: CachedCompletion, coalescer: DeltaCoalescer) -> None:
+        """Stream a cached completion through the normal delta path, chunk by chunk."""
+        for chunk in cached.chunks:
+            if ctx.cancel_event.is_set():
+                coalescer.flush()
+                self._emit(ctx, RunCancelled(ctx.run_id))
+                return
+            self._count_chunk(ctx)
+            coalescer.push(chunk)
+            await ctx.log.wait_for_capacity(self._settings.event_buffer_block_timeout_sec)
+            await asyncio.sleep(0)
+        coalescer.flush()
+        metadata = self._run_metadata(ctx)
+        metadata["cached"] = True
+        self._emit(ctx, RunCompleted(ctx.run_id, cached.text.strip(), metadata))
+
+    def _request_key(self, payload: dict[str, Any]) -> str:
+        constraints = payload.get("constraints") or {}
+        params: dict[str, Any] = {"temperature": constraints.get("temperature", 0.2)}
+        # Cached answers outlive restarts, so they must not follow the user
+        # to a different upstream configured through /settings.
+        default_base = self._settings.deepseek_api_base
+        params["baseUrl"] = self._settings_store.get_deepseek_settings(default_base)["baseUrl"] or default_base
+        if payload.get("imageReference"):
+            # The content hash stands in for the image bytes.
+            params["imageReference"] = payload["imageReference"]
+        return completion_cache_key(self._build_messages(payload), self._settings.deepseek_model, params)
+
+    def _count_chunk(self, ctx: RunContext) -> None:
+        ctx.chunks += 1
+        if ctx.first_delta_at is None:
+            ctx.first_delta_at = time.perf_counter()
+            if ctx.admitted_at is not None:
+                self._metrics.time_to_first_token.observe(ctx.first_delta_at - ctx.admitted_at)
+
+    def _run_metadata(self, ctx: RunContext) -> dict[str, Any]:
+        now = time.perf_counter()
+        metadata: dict[str, Any] = {}
+        if ctx.ticket:
+            metadata["queueTimeMs"] = _ms(ctx.ticket.queue_time)
+        if ctx.settings_load_sec is not None:
+            metadata["settingsLoadMs"] = _ms(ctx.settings_load_sec)
+        if ctx.generation is not None:
+            metadata.update(ctx.generation.timings)
+            if ctx.generation.usage is not None:
+                metadata["usage"] = dict(ctx.generation.usage)
+        if ctx.first_delta_at is not None and ctx.admitted_at is not None:
+            metadata["timeToFirstTokenMs"] = _ms(ctx.first_delta_at - ctx.admitted_at)
+        rate = self._tokens_per_second(ctx, now)
+        if rate is not None:
+            metadata["tokensPerSec"] = round(rate, 1)
+        metadata["durationMs"] = _ms(now - ctx.created_at)
+        return metadata
+
+    def _tokens_per_second(self, ctx: RunContext, now: float) -> Optional[float]:
+        if ctx.first_delta_at is None or ctx.chunks < 2 or now <= ctx.first_delta_at:
+            return None
+        return (ctx.chunks - 1) / (now - ctx.first_delta_at)
+
+    def _emit(self, ctx: RunContext, event: RunEvent) -> None:
+        if ctx.finished:
+            # Nothing follows a terminal event, e.g. a late coalescer flush after a forced cancel.
+            return
+        ctx.log.append(event)
+        if isinstance(event, (RunCompleted, RunFailed, RunCancelled)):
+            ctx.finished = True
+            self._record_finished(ctx, event)
+
+    def _record_finished(self, ctx: RunContext, event: RunEvent) -> None:
+        self._close_turn(ctx.run_id, ctx.session_id, event.response if isinstance(event, RunCompleted) else None)
+        now = time.perf_counter()
+        self._metrics.runs_finished.inc(label=event.event.removeprefix("run."))
+        self._metrics.duration.observe(now - ctx.created_at)
+        if isinstance(event, RunCancelled) and ctx.cancel_requested_at is not None:
+            self._metrics.cancel_latency.observe(now - ctx.cancel_requested_at)
+        if isinstance(event, RunCompleted):
+            rate = self._tokens_per_second(ctx, now)
+            if rate is not None:
+                self._metrics.tokens_per_second.observe(rate)
 
     def _build_messages(self, payload: dict[str, Any]) -> List[dict[str, str]]:
-        conversation = payload.get("conversation") or []
-        messages: List[dict[str, str]] = []
-        system_prompt = payload.get("prompt")
-        if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
-        for item in conversation:
-            role = item.get("role")
-            content = item.get("content")
-            if role and content:
-                messages.append({"role": role, "content": content})
+        """The upstream messages, byte-stable for a given conversation.
+
+        The system prompt always comes first and the conversation follows in
+        the order given, each message as ``{"role", "content"}`` only, so a
+        conversation that grows by a turn repeats the previous request as an
+        exact prefix and hits the upstream's context cache.
+        """
+        # Session runs carry the messages resolved by ``_open_turn``.
+        messages = payload.get("messages")
+        if messages is None:
+            messages = []
+            system_prompt = payload.get("prompt")
+            if system_prompt:
+                messages.append({"role": "system", "content": system_prompt})
+            messages.extend(_conversation_messages(payload))
         if not messages:
-            messages.append(
-                {
-                    "role": "system",
-                    "content": "You are AgentRelay conversation assistant. Keep replies concise.",
-                }
-            )
+            messages = [{"role": "system", "content": DEFAULT_SYSTEM_PROMPT}]
         return messages
+
+
+def _tool_call_message(text: str, calls: List[dict[str, str]]) -> dict[str, Any]:
+    """The assistant turn that requested ``calls``, replayed to the model with their results."""
+    return {
+        "role": "assistant",
+        "content": text,
+        "tool_calls": [
+            {"id": call["id"], "type": "function", "function": {"name": call["name"], "arguments": call["arguments"]}}
+            for call in calls
+        ],
+    }
+
+
+def _add_usage(total: Optional[dict[str, int]], usage: Optional[dict[str, int]]) -> Optional[dict[str, int]]:
+    if usage is None:
+        return total
+    if total is None:
+        return dict(usage)
+    return {key: total.get(key, 0) + value for key, value in usage.items()}
+
+
+def _workflow_response(state: Any) -> str:
+    """A graph's answer: its ``response`` value, else the content of its last message."""
+    if not isinstance(state, dict):
+        return ""
+    response = state.get("response")
+    if isinstance(response, str):
+        return response.strip()
+    messages = state.get("messages") or []
+    if not messages:
+        return ""
+    last = messages[-1]
+    content = last.get("content") if isinstance(last, dict) else getattr(last, "content", None)
+    return content.strip() if isinstance(content, str) else ""
+
+
+def _conversation_messages(payload: dict[str, Any]) -> List[dict[str, str]]:
+    messages: List[dict[str, str]] = []
+    for item in payload.get("conversation") or []:
+        role = item.get("role")
+        content = item.get("content")
+        if role and content:
+            messages.append({"role": role, "content": content})
+    return messages
+
+
+def _with_image(messages: List[dict[str, Any]], data_url: str) -> List[dict[str, Any]]:
+    """Attach an image to the last user message as OpenAI-style content parts."""
+    image = {"type": "image_url", "image_url": {"url": data_url}}
+    messages = list(messages)
+    for position in range(len(messages) - 1, -1, -1):
+        if messages[position]["role"] == "user":
+            text = messages[position]["content"]
+            messages[position] = {"role": "user", "content": [{"type": "text", "text": text}, image]}
+            return messages
+    messages.append({"role": "user", "content": [image]})
+    return messages
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
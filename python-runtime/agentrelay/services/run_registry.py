@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Literal, Optional
+
+from .admission import AdmissionTicket
+from .event_log import RunEventLog
+from .single_flight import SharedGeneration
+from .tool_calls import PendingToolCalls
+
+RunState = Literal["queued", "running"]
+
+
+@dataclass(eq=False)
+class RunContext:
+    run_id: str
+    log: RunEventLog
+    task: Optional[asyncio.Task] = None
+    ticket: Optional[AdmissionTicket] = None
+    cancel_event: asyncio.Event = field(default_factory=asyncio.Event)
+    state: RunState = "queued"
+    agent_id: Optional[str] = None
+    client_id: Optional[str] = None
+    session_id: Optional[str] = None
+    attachment_id: Optional[str] = None
+    request_key: str = ""
+    generation: Optional[SharedGeneration] = None
+    tool_calls: PendingToolCalls = field(default_factory=PendingToolCalls)
+    created_at: float = field(default_factory=time.perf_counter)
+    admitted_at: Optional[float] = None
+    first_delta_at: Optional[float] = None
+    chunks: int = 0
+    settings_load_sec: Optional[float] = None
+    cancel_requested_at: Optional[float] = None
+    finished: bool = False
+
+    def summary(self) -> dict[str, object]:
+        summary: dict[str, object] = {"runId": self.run_id, "status": self.state}
+        if self.agent_id:
+            summary["agentId"] = self.agent_id
+        if self.client_id:
+            summary["clientId"] = self.client_id
+        if self.session_id:
+            summary["sessionId"] = self.session_id
+        return summary
+
+
+class RunRegistry:
+    """Live runs keyed by id, with secondary indexes by state, agent and client.
+
+    Every method is synchronous: the registry is only used from the event
+    loop, so a mutation and its index updates happen atomically without an
+    awaitable lock. Index buckets are insertion-ordered dicts, so queries
+    return runs oldest first.
+    """
+
+    def __init__(self) -> None:
+        self._runs: Dict[str, RunContext] = {}
+        self._by_state: Dict[str, Dict[str, RunContext]] = {"queued": {}, "running": {}}
+        self._by_agent: Dict[str, Dict[str, RunContext]] = {}
+        self._by_client: Dict[str, Dict[str, RunContext]] = {}
+
+    def __contains__(self, run_id: str) -> bool:
+        return run_id in self._runs
+
+    def __len__(self) -> int:
+        return len(self._runs)
+
+    def __iter__(self) -> Iterator[RunContext]:
+        return iter(list(self._runs.values()))
+
+    def get(self, run_id: str) -> Optional[RunContext]:
+        return self._runs.get(run_id)
+
+    def add(self, ctx: RunContext) -> None:
+        if ctx.run_id in self._runs:
+            raise ValueError("Run already exists")
+        self._runs[ctx.run_id] = ctx
+        self._by_state[ctx.state][ctx.run_id] = ctx
+        if ctx.agent_id:
+            self._by_agent.setdefault(ctx.agent_id, {})[ctx.run_id] = ctx
+        if ctx.client_id:
+            self._by_client.setdefault(ctx.client_id, {})[ctx.run_id] = ctx
+
+    def remove(self, run_id: str) -> Optional[RunContext]:
+        ctx = self._runs.pop(run_id, None)
+        if ctx is None:
+            return None
+        self._by_state[ctx.state].pop(run_id, None)
+        _discard(self._by_agent, ctx.agent_id, run_id)
+        _discard(self._by_client, ctx.client_id, run_id)
+        return ctx
+
+    def set_state(self, ctx: RunContext, state: RunState) -> None:
+        if ctx.state == state:
+            return
+        if self._runs.get(ctx.run_id) is ctx:
+            self._by_state[ctx.state].pop(ctx.run_id, None)
+            self._by_state[state][ctx.run_id] = ctx
+        ctx.state = state
+
+    def query(
+        self,
+        state: Optional[RunState] = None,
+        agent_id: Optional[str] = None,
+        client_id: Optional[str] = None,
+    ) -> List[RunContext]:
+        """Runs matching every given filter, starting from the narrowest index."""
+        candidates = [self._runs]
+        if state is not None:
+            candidates.append(self._by_state.get(state, {}))
+        if agent_id is not None:
+            candidates.append(self._by_agent.get(agent_id, {}))
+        if client_id is not None:
+            candidates.append(self._by_client.get(client_id, {}))
+        smallest = min(candidates, key=len)
+        return [
+            ctx
+            for ctx in smallest.values()
+            if (state is None or ctx.state == state)
+            and (agent_id is None or ctx.agent_id == agent_id)
+            and (client_id is None or ctx.client_id == client_id)
+        ]
+
+    def counts(self) -> dict[str, object]:
+        return {
+            "queued": len(self._by_state["queued"]),
+            "running": len(self._by_state["running"]),
+            "byAgent": {agent: len(runs) for agent, runs in self._by_agent.items()},
+            "byClient": {client: len(runs) for client, runs in self._by_client.items()},
+        }
+
+
+def _discard(index: Dict[str, Dict[str, RunContext]], key: Optional[str], run_id: str) -> None:
+    if not key:
+        return
+    bucket = index.get(key)
+    if bucket is None:
+        return
+    bucket.pop(run_id, None)
+    if not bucket:
+        del index[key]
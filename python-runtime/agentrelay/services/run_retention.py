@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import asyncio
+import bisect
+import logging
+import time
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Iterator, List, Optional, Union
+
+from .events import RunCancelled, RunCompleted, RunDelta, RunEvent, RunFailed
+
+logger = logging.getLogger(__name__)
+
+_RECORD_OVERHEAD = 512
+
+
+class _CompactDelta:
+    """Consecutive run.delta events folded into one string plus per-event offsets."""
+
+    __slots__ = ("ids", "ends", "parts")
+
+    def __init__(self) -> None:
+        self.ids = array("Q")
+        self.ends = array("I")
+        self.parts: List[str] = []
+
+    def add(self, event: RunDelta) -> None:
+        self.ids.append(event.id or 0)
+        self.ends.append((self.ends[-1] if self.ends else 0) + len(event.text))
+        self.parts.append(event.text)
+
+    def freeze(self) -> str:
+        return "".join(self.parts)
+
+
+@dataclass
+class RetainedRun:
+    run_id: str
+    status: str
+    response: Optional[str] = None
+    metadata: dict[str, Any] = field(default_factory=dict)
+    error_code: Optional[str] = None
+    message: Optional[str] = None
+    last_event_id: int = 0
+    size_bytes: int = 0
+    expires_at: float = 0.0
+    _items: List[Union[RunEvent, tuple[array, array, str]]] = field(default_factory=list, repr=False)
+
+    @classmethod
+    def from_events(cls, run_id: str, events: Iterable[RunEvent], last_event_id: int) -> "RetainedRun":
+        record = cls(run_id=run_id, status="failed", last_event_id=last_event_id)
+        size = _RECORD_OVERHEAD
+        pending: Optional[_CompactDelta] = None
+        for event in events:
+            if isinstance(event, RunDelta):
+                pending = pending or _CompactDelta()
+                pending.add(event)
+                continue
+            if pending is not None:
+                size += record._append_delta(pending)
+                pending = None
+            record._items.append(event)
+            size += len(event.encode())
+            record._apply_terminal(event)
+        if pending is not None:
+            size += record._append_delta(pending)
+        record.size_bytes = size
+        return record
+
+    def _append_delta(self, pending: _CompactDelta) -> int:
+        text = pending.freeze()
+        self._items.append((pending.ids, pending.ends, text))
+        return len(text.encode("utf-8")) + pending.ids.itemsize * len(pending.ids) * 2
+
+    def _apply_terminal(self, event: RunEvent) -> None:
+        if isinstance(event, RunCompleted):
+            self.status = "completed"
+            self.response = event.response
+            self.metadata = event.metadata
+        elif isinstance(event, RunFailed):
+            self.status = "failed"
+            self.error_code = event.error_code
+            self.message = event.message
+        elif isinstance(event, RunCancelled):
+            self.status = "cancelled"
+            self.message = event.reason
+
+    def replay(self, last_event_id: Optional[int] = None) -> Iterator[RunEvent]:
+        """Yield the compacted events after ``last_event_id``.
+
+        Folded deltas are re-emitted as a single run.delta carrying the id of
+        the last folded event; resuming inside a folded range only replays
+        the text the client has not seen yet.
+        """
+        cursor = last_event_id or 0
+        for item in self._items:
+            if isinstance(item, RunEvent):
+                if item.id is not None and item.id > cursor:
+                    yield item
+                continue
+            ids, ends, text = item
+            if ids[-1] <= cursor:
+                continue
+            seen = bisect.bisect_right(ids, cursor)
+            event = RunDelta(self.run_id, text[ends[seen - 1] :] if seen else text)
+            event.id = ids[-1]
+            yield event
+
+    def summary(self) -> dict[str, Any]:
+        summary: dict[str, Any] = {"runId": self.run_id, "status": self.status}
+        if self.response is not None:
+            summary["response"] = self.response
+        if self.metadata:
+            summary["metadata"] = self.metadata
+        if self.error_code:
+            summary["errorCode"] = self.error_code
+        if self.message:
+            summary["message"] = self.message
+        return summary
+
+
+class RunRetentionStore:
+    """Keep finished runs around for late subscribers, bounded by TTL and memory.
+
+    Records are held in LRU order; ``add`` evicts the least recently used runs
+    once ``max_bytes`` is exceeded and a background sweeper drops expired ones.
+    """
+
+    def __init__(self, ttl_sec: float, max_bytes: int, sweep_interval_sec: float):
+        self._ttl = ttl_sec
+        self._max_bytes = max_bytes
+        self._sweep_interval = sweep_interval_sec
+        self._runs: OrderedDict[str, RetainedRun] = OrderedDict()
+        self._bytes = 0
+        self._expired = 0
+        self._evicted = 0
+        self._sweeper: Optional[asyncio.Task] = None
+
+    def __contains__(self, run_id: str) -> bool:
+        return self.get(run_id, touch=False) is not None
+
+    def __len__(self) -> int:
+        return len(self._runs)
+
+    def add(self, record: RetainedRun) -> None:
+        self.discard(record.run_id)
+        record.expires_at = time.monotonic() + self._ttl
+        self._runs[record.run_id] = record
+        self._bytes += record.size_bytes
+        while self._bytes > self._max_bytes and len(self._runs) > 1:
+            _, evicted = self._runs.popitem(last=False)
+            self._bytes -= evicted.size_bytes
+            self._evicted += 1
+
+    def get(self, run_id: str, touch: bool = True) -> Optional[RetainedRun]:
+        record = self._runs.get(run_id)
+        if record is None:
+            return None
+        if record.expires_at <= time.monotonic():
+            self._drop(run_id)
+            self._expired += 1
+            return None
+        if touch:
+            self._runs.move_to_end(run_id)
+        return record
+
+    def discard(self, run_id: str) -> None:
+        if run_id in self._runs:
+            self._drop(run_id)
+
+    def sweep(self) -> int:
+        now = time.monotonic()
+        expired = [run_id for run_id, record in self._runs.items() if record.expires_at <= now]
+        for run_id in expired:
+            self._drop(run_id)
+        self._expired += len(expired)
+        return len(expired)
+
+    def ensure_sweeper(self) -> None:
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.get_running_loop().create_task(self._sweep_forever())
+
+    async def aclose(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "retainedRuns": len(self._runs),
+            "retainedBytes": self._bytes,
+            "limitBytes": self._max_bytes,
+            "expired": self._expired,
+            "evicted": self._evicted,
+        }
+
+    def _drop(self, run_id: str) -> None:
+        record = self._runs.pop(run_id)
+        self._bytes -= record.size_bytes
+
+    async def _sweep_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self._sweep_interval)
+            try:
+                self.sweep()
+            except Exception:  # noqa: BLE001
+                logger.exception("Retention sweep failed")
@@ -0,0 +1,179 @@
+"""Server-side conversation history, so clients only send each new turn.
+
+A session holds the canonical message list of one conversation. A run
+naming the session contributes its new messages as a pending turn; the turn
+and the assistant reply are appended once the run completes, and dropped if
+it fails or is cancelled, so a retried turn is never recorded twice.
+
+Before each run the history is cut to a token budget by dropping the oldest
+messages. The cut only moves forward and goes well below the budget, so the
+prefix sent upstream stays identical for many turns instead of shifting on
+every one.
+"""
+
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+# Rough token estimate: ~4 characters per token plus per-message framing.
+_CHARS_PER_TOKEN = 4
+_MESSAGE_OVERHEAD_TOKENS = 4
+# Truncation drops history down to this share of the budget.
+_TRUNCATE_TO = 0.75
+
+
+class SessionBusyError(Exception):
+    """Another run of the session is still in progress."""
+
+    def __init__(self, session_id: str, run_id: str):
+        super().__init__(f"Session {session_id} is in use by run {run_id}")
+        self.session_id = session_id
+        self.run_id = run_id
+
+
+def estimate_tokens(message: Dict[str, Any]) -> int:
+    return len(message.get("content") or "") // _CHARS_PER_TOKEN + _MESSAGE_OVERHEAD_TOKENS
+
+
+@dataclass
+class Session:
+    session_id: str
+    system: Optional[Dict[str, str]] = None
+    messages: List[Dict[str, str]] = field(default_factory=list)
+    tokens: List[int] = field(default_factory=list)
+    start: int = 0
+    dropped: int = 0
+    window_tokens: int = 0
+    pending: List[Dict[str, str]] = field(default_factory=list)
+    run_id: Optional[str] = None
+    last_used: float = field(default_factory=time.monotonic)
+
+    def append(self, message: Dict[str, str]) -> None:
+        tokens = estimate_tokens(message)
+        self.messages.append(message)
+        self.tokens.append(tokens)
+        self.window_tokens += tokens
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "sessionId": self.session_id,
+            "messages": len(self.messages) - self.start,
+            "droppedMessages": self.dropped,
+            "windowTokens": self.window_tokens,
+            "activeRunId": self.run_id,
+        }
+
+
+class SessionStore:
+    """Sessions in LRU order, dropped after ``ttl_sec`` idle or beyond ``max_sessions``."""
+
+    def __init__(self, max_sessions: int, ttl_sec: float, token_budget: int):
+        self._max_sessions = max_sessions
+        self._ttl = ttl_sec
+        self._token_budget = token_budget
+        self._sessions: OrderedDict[str, Session] = OrderedDict()
+        self._evicted = 0
+        self._truncated = 0
+
+    def __contains__(self, session_id: str) -> bool:
+        return self.get(session_id) is not None
+
+    def get(self, session_id: str) -> Optional[Session]:
+        session = self._sessions.get(session_id)
+        if session is not None and self._expired(session, time.monotonic()):
+            del self._sessions[session_id]
+            self._evicted += 1
+            return None
+        return session
+
+    def check(self, session_id: str) -> None:
+        """Raise ``SessionBusyError`` if a turn cannot start on the session now."""
+        session = self.get(session_id)
+        if session is not None and session.run_id is not None:
+            raise SessionBusyError(session_id, session.run_id)
+
+    def begin_turn(
+        self,
+        session_id: str,
+        run_id: str,
+        new_messages: List[Dict[str, str]],
+        system: Optional[Dict[str, str]] = None,
+    ) -> List[Dict[str, str]]:
+        """Start ``run_id``'s turn and return the messages to send upstream."""
+        self.check(session_id)
+        session = self._sessions.get(session_id)
+        if session is None:
+            self._evict(room_for=1)
+            session = self._sessions[session_id] = Session(session_id)
+        self._sessions.move_to_end(session_id)
+        session.last_used = time.monotonic()
+        if system is not None:
+            session.system = system
+        session.run_id = run_id
+        session.pending = list(new_messages)
+        pending_tokens = sum(estimate_tokens(message) for message in session.pending)
+        self._truncate(session, pending_tokens)
+        messages = [session.system] if session.system else []
+        messages.extend(session.messages[session.start :])
+        messages.extend(session.pending)
+        return messages
+
+    def end_turn(self, session_id: str, run_id: str, reply: Optional[str]) -> None:
+        """Record the turn with ``reply`` if the run completed; otherwise drop it."""
+        session = self._sessions.get(session_id)
+        if session is None or session.run_id != run_id:
+            return
+        if reply is not None:
+            for message in session.pending:
+                session.append(message)
+            session.append({"role": "assistant", "content": reply})
+        session.pending = []
+        session.run_id = None
+        session.last_used = time.monotonic()
+
+    def delete(self, session_id: str) -> bool:
+        return self._sessions.pop(session_id, None) is not None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "sessions": len(self._sessions),
+            "evicted": self._evicted,
+            "truncated": self._truncated,
+        }
+
+    def _truncate(self, session: Session, pending_tokens: int) -> None:
+        system_tokens = estimate_tokens(session.system) if session.system else 0
+        if system_tokens + session.window_tokens + pending_tokens <= self._token_budget:
+            return
+        dropped_before = session.start
+        target = self._token_budget * _TRUNCATE_TO - system_tokens - pending_tokens
+        while session.start < len(session.messages) and session.window_tokens > target:
+            session.window_tokens -= session.tokens[session.start]
+            session.start += 1
+        # Never start the window on an assistant reply without its question.
+        while session.start < len(session.messages) and session.messages[session.start]["role"] == "assistant":
+            session.window_tokens -= session.tokens[session.start]
+            session.start += 1
+        session.dropped += session.start - dropped_before
+        self._truncated += 1
+        if session.start > len(session.messages) // 2:
+            # Messages before the window are never sent again.
+            del session.messages[: session.start]
+            del session.tokens[: session.start]
+            session.start = 0
+
+    def _expired(self, session: Session, now: float) -> bool:
+        return session.run_id is None and now - session.last_used > self._ttl
+
+    def _evict(self, room_for: int = 0) -> None:
+        now = time.monotonic()
+        for session_id, session in list(self._sessions.items()):
+            over = len(self._sessions) + room_for > self._max_sessions
+            if not over and not self._expired(session, now):
+                break
+            if session.run_id is None:
+                del self._sessions[session_id]
+                self._evicted += 1
@@ -1,40 +1,178 @@
 from __future__ import annotations
 
+import asyncio
+import copy
 import json
+import logging
+import os
+import tempfile
+import time
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, List, Optional
 
 from platformdirs import PlatformDirs
 
+logger = logging.getLogger(__name__)
+
+SettingsListener = Callable[[dict[str, Any]], None]
 
-class SettingsStore:
-    """Persist simple AgentRelay runtime settings on disk."""
 
-    def __init__(self, app_name: str = "AgentRelay", app_author: str = "AgentRelay"):
-        dirs = PlatformDirs(appname=app_name, appauthor=app_author, roaming=False)
-        self._settings_dir = Path(dirs.user_data_dir)
+class SettingsStore:
+    """Persist simple AgentRelay runtime settings on disk.
+
+    Reads are served from an in-memory snapshot that is revalidated against the
+    file's mtime at most every ``revalidate_interval`` seconds. Writes replace the
+    file atomically, and saves issued while an event loop is running are
+    coalesced into a single write after ``save_delay`` seconds.
+    """
+
+    def __init__(
+        self,
+        app_name: str = "AgentRelay",
+        app_author: str = "AgentRelay",
+        settings_dir: Path | None = None,
+        revalidate_interval: float = 0.5,
+        save_delay: float = 0.05,
+    ):
+        if settings_dir is None:
+            dirs = PlatformDirs(appname=app_name, appauthor=app_author, roaming=False)
+            settings_dir = Path(dirs.user_data_dir)
+        self._settings_dir = settings_dir
         self._settings_file = self._settings_dir / "settings.json"
         self._settings_dir.mkdir(parents=True, exist_ok=True)
+        self._revalidate_interval = revalidate_interval
+        self._save_delay = save_delay
+        self._data: Optional[dict[str, Any]] = None
+        self._stat_key: Optional[tuple[int, int]] = None
+        self._checked_at = 0.0
+        self._version = 0
+        self._dirty = False
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._listeners: List[SettingsListener] = []
 
     @property
     def settings_path(self) -> Path:
         return self._settings_file
 
+    @property
+    def data_dir(self) -> Path:
+        """Per-user data directory that also hosts caches next to settings.json."""
+        return self._settings_dir
+
+    @property
+    def version(self) -> int:
+        """Incremented every time the in-memory settings change."""
+        self._current()
+        return self._version
+
+    def subscribe(self, listener: SettingsListener) -> Callable[[], None]:
+        """Call ``listener`` with the new settings whenever they change."""
+        self._listeners.append(listener)
+
+        def unsubscribe() -> None:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+        return unsubscribe
+
     def load(self) -> dict[str, Any]:
-        if not self._settings_file.exists():
-            return {}
-        try:
-            return json.loads(self._settings_file.read_text(encoding="utf-8"))
-        except json.JSONDecodeError:
-            return {}
+        return copy.deepcopy(self._current())
 
     def save(self, data: dict[str, Any]) -> None:
+        self._data = copy.deepcopy(data)
+        self._version += 1
+        self._dirty = True
+        self._schedule_flush()
+        self._notify()
+
+    def flush(self) -> None:
+        """Write pending changes to disk immediately."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._dirty or self._data is None:
+            return
+        self._write(self._data)
+        self._dirty = False
+
+    def _current(self) -> dict[str, Any]:
+        if self._data is None:
+            self._reload(self._read_stat_key())
+            return self._data  # type: ignore[return-value]
+        if self._dirty:
+            return self._data
+        now = time.monotonic()
+        if now - self._checked_at >= self._revalidate_interval:
+            self._checked_at = now
+            stat_key = self._read_stat_key()
+            if stat_key != self._stat_key:
+                previous = self._data
+                self._reload(stat_key)
+                if self._data != previous:
+                    self._version += 1
+                    self._notify()
+        return self._data
+
+    def _read_stat_key(self) -> Optional[tuple[int, int]]:
+        try:
+            stat = self._settings_file.stat()
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _reload(self, stat_key: Optional[tuple[int, int]]) -> None:
+        self._stat_key = stat_key
+        self._checked_at = time.monotonic()
+        if stat_key is None:
+            self._data = {}
+            return
+        try:
+            data = json.loads(self._settings_file.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            data = {}
+        self._data = data if isinstance(data, dict) else {}
+
+    def _schedule_flush(self) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+        if self._flush_handle is None:
+            self._flush_handle = loop.call_later(self._save_delay, self._flush_scheduled)
+
+    def _flush_scheduled(self) -> None:
+        self._flush_handle = None
+        try:
+            self.flush()
+        except OSError:
+            logger.exception("Failed to persist settings to %s", self._settings_file)
+
+    def _write(self, data: dict[str, Any]) -> None:
         self._settings_dir.mkdir(parents=True, exist_ok=True)
-        self._settings_file.write_text(json.dumps(data, indent=2), encoding="utf-8")
+        fd, tmp_name = tempfile.mkstemp(dir=self._settings_dir, prefix=".settings-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as handle:
+                json.dump(data, handle, indent=2)
+                handle.flush()
+                os.fsync(handle.fileno())
+            os.replace(tmp_name, self._settings_file)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        self._stat_key = self._read_stat_key()
+        self._checked_at = time.monotonic()
+
+    def _notify(self) -> None:
+        for listener in list(self._listeners):
+            try:
+                listener(self._data or {})
+            except Exception:  # noqa: BLE001
+                logger.exception("Settings listener %r failed", listener)
 
     # DeepSeek specific helpers -------------------------------------------------
     def get_deepseek_settings(self, default_base: str | None = None) -> dict[str, str | None]:
-        data = self.load()
+        data = self._current()
         deepseek = data.get("deepseek") or {}
         api_key = deepseek.get("apiKey")
         base_url = deepseek.get("baseUrl") or default_base
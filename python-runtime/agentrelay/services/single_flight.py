@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+
+class SharedGeneration:
+    """One upstream completion whose chunks are shared by every attached run.
+
+    The producer appends chunks and each attached run reads them through its
+    own cursor in ``follow``, so a run that attaches mid-stream still receives
+    the generation from the first chunk. Before each chunk the producer awaits
+    ``wait_for_room``, which holds it while the slowest follower is
+    ``read_ahead`` chunks behind, so a run stalled on its event log (the
+    ``block`` policy) stops the upstream read instead of letting it buffer.
+    """
+
+    def __init__(self, key: str, read_ahead: int = 64):
+        self.key = key
+        self.read_ahead = read_ahead
+        self.chunks: List[str] = []
+        self.attached = 0
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.stored = False
+        self.timings: Dict[str, float] = {}
+        self.usage: Optional[Dict[str, int]] = None
+        # Tool calls requested by the model, as {"id", "name", "arguments"}.
+        self.tool_calls: List[Dict[str, str]] = []
+        self.task: Optional[asyncio.Task] = None
+        self._waiter: Optional[asyncio.Future[None]] = None
+        self._cursors: List[List[int]] = []
+        self._room: Optional[asyncio.Future[None]] = None
+
+    async def wait_for_room(self) -> None:
+        """Wait until every follower is fewer than ``read_ahead`` chunks behind."""
+        while self._cursors and len(self.chunks) - min(cursor[0] for cursor in self._cursors) >= self.read_ahead:
+            if self._room is None:
+                self._room = asyncio.get_running_loop().create_future()
+            await self._room
+
+    def push(self, text: str) -> None:
+        self.chunks.append(text)
+        self._wake()
+
+    def push_tool_call(self, index: int, call_id: Optional[str], name: Optional[str], arguments: Optional[str]) -> None:
+        """Merge one streamed tool-call fragment; fragments share the call's ``index``."""
+        while len(self.tool_calls) <= index:
+            self.tool_calls.append({"id": "", "name": "", "arguments": ""})
+        call = self.tool_calls[index]
+        if call_id:
+            call["id"] = call_id
+        if name:
+            call["name"] += name
+        if arguments:
+            call["arguments"] += arguments
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        self.done = True
+        self.error = error
+        self._wake()
+
+    async def follow(self, stop: Optional[asyncio.Event] = None) -> AsyncIterator[str]:
+        """Yield every chunk, then raise the producer's error if it failed.
+
+        Iteration ends early, without error, as soon as ``stop`` is set.
+        """
+        # A one-element list, so ``wait_for_room`` sees the cursor move.
+        cursor = [0]
+        self._cursors.append(cursor)
+        try:
+            while True:
+                if stop is not None and stop.is_set():
+                    return
+                while cursor[0] < len(self.chunks):
+                    cursor[0] += 1
+                    self._wake_room()
+                    yield self.chunks[cursor[0] - 1]
+                if self.done:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                if self._waiter is None:
+                    self._waiter = asyncio.get_running_loop().create_future()
+                if stop is None:
+                    await asyncio.shield(self._waiter)
+                    continue
+                stopped = asyncio.ensure_future(stop.wait())
+                try:
+                    await asyncio.wait({self._waiter, stopped}, return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    stopped.cancel()
+        finally:
+            self._cursors.remove(cursor)
+            self._wake_room()
+
+    def _wake_room(self) -> None:
+        room = self._room
+        if room is not None:
+            self._room = None
+            if not room.done():
+                room.set_result(None)
+
+    def _wake(self) -> None:
+        waiter = self._waiter
+        if waiter is not None:
+            self._waiter = None
+            if not waiter.done():
+                waiter.set_result(None)
+
+
+class SingleFlight:
+    """Deduplicate identical in-flight upstream generations.
+
+    A run first tries to ``attach`` to the generation currently streaming for
+    its request key and otherwise ``start``s a new one. The upstream request
+    is cancelled only when the last attached run ``leave``s before it finished.
+    """
+
+    def __init__(self, enabled: bool = True, read_ahead: int = 64):
+        self._enabled = enabled
+        self._read_ahead = read_ahead
+        self._inflight: Dict[str, SharedGeneration] = {}
+        self._started = 0
+        self._joined = 0
+
+    def in_flight(self, key: str) -> bool:
+        """Whether ``attach(key)`` would currently join a generation."""
+        generation = self._inflight.get(key) if self._enabled else None
+        return generation is not None and not generation.done
+
+    def attach(self, key: str) -> Optional[SharedGeneration]:
+        """Attach to the generation currently streaming for ``key``, if any."""
+        generation = self._inflight.get(key) if self._enabled else None
+        if generation is None or generation.done:
+            return None
+        generation.attached += 1
+        self._joined += 1
+        return generation
+
+    def start(
+        self,
+        key: str,
+        produce: Callable[[SharedGeneration], Awaitable[None]],
+        shared: bool = True,
+    ) -> SharedGeneration:
+        """Start a new upstream generation for ``key`` with the caller attached.
+
+        With ``shared=False`` no other run can attach to it.
+        """
+        generation = SharedGeneration(key, self._read_ahead)
+        generation.attached = 1
+        if self._enabled and shared:
+            self._inflight[key] = generation
+        generation.task = asyncio.create_task(self._produce(generation, produce))
+        self._started += 1
+        return generation
+
+    def leave(self, generation: SharedGeneration) -> None:
+        generation.attached -= 1
+        if generation.attached <= 0 and not generation.done and generation.task is not None:
+            generation.task.cancel()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "inFlight": len(self._inflight),
+            "upstreamStarted": self._started,
+            "deduplicated": self._joined,
+        }
+
+    async def _produce(
+        self,
+        generation: SharedGeneration,
+        produce: Callable[[SharedGeneration], Awaitable[None]],
+    ) -> None:
+        try:
+            await produce(generation)
+        except asyncio.CancelledError:
+            generation.finish(RuntimeError("Upstream generation was cancelled."))
+        except Exception as exc:  # noqa: BLE001
+            generation.finish(exc)
+        else:
+            generation.finish()
+        finally:
+            if self._inflight.get(generation.key) is generation:
+                del self._inflight[generation.key]
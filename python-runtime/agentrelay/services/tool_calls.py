@@ -0,0 +1,129 @@
+"""Tool round trips between the model and the Host.
+
+The model's tool calls are announced as ``run.tool_call`` events; the Host
+executes them and posts each result to ``/runs/{id}/tools/{toolCallId}``,
+which resolves a future the run is waiting on. This module holds the pieces
+that do not need the run manager: the upstream tool declarations, the
+pending-call table and the message a result becomes for the model.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+_INVALID_NAME_CHARS = re.compile(r"[^a-zA-Z0-9_-]")
+
+
+class ToolCallNotFoundError(Exception):
+    pass
+
+
+class ToolCallClosedError(Exception):
+    """The call no longer accepts input; ``error_code`` says why."""
+
+    def __init__(self, tool_call_id: str, error_code: str):
+        super().__init__(f"Tool call {tool_call_id} is closed ({error_code})")
+        self.tool_call_id = tool_call_id
+        self.error_code = error_code
+
+
+@dataclass
+class ToolSpec:
+    tool_id: str
+    name: str
+    timeout_sec: Optional[float] = None
+    description: Optional[str] = None
+    parameters: Dict[str, Any] = field(default_factory=lambda: {"type": "object", "properties": {}})
+
+    def declaration(self) -> Dict[str, Any]:
+        function: Dict[str, Any] = {"name": self.name, "parameters": self.parameters}
+        if self.description:
+            function["description"] = self.description
+        return {"type": "function", "function": function}
+
+
+def tool_specs(inventory: List[Dict[str, Any]]) -> Dict[str, ToolSpec]:
+    """The run's tools keyed by the function name the model sees.
+
+    Upstream function names only allow ``[a-zA-Z0-9_-]`` (at most 64), so
+    other characters in Host tool ids are replaced and mapped back on the way
+    out. Tools whose names collide after that, e.g. ``fs.read`` and
+    ``fs:read``, get a short hash of their tool id appended.
+    """
+    specs: Dict[str, ToolSpec] = {}
+    for tool in inventory:
+        name = _INVALID_NAME_CHARS.sub("_", tool.get("name") or tool["id"])[:64]
+        if name in specs:
+            digest = hashlib.sha256(tool["id"].encode("utf-8")).hexdigest()[:8]
+            name = f"{name[:55]}_{digest}"
+        specs[name] = ToolSpec(
+            tool_id=tool["id"],
+            name=name,
+            timeout_sec=tool.get("timeoutSec"),
+            description=tool.get("description"),
+            parameters=tool.get("parameters") or {"type": "object", "properties": {}},
+        )
+    return specs
+
+
+def parse_arguments(raw: str) -> Any:
+    """Decode the model's JSON arguments, passing malformed ones through as text."""
+    try:
+        return json.loads(raw) if raw else {}
+    except ValueError:
+        return raw
+
+
+class PendingToolCalls:
+    """Futures of one run's outstanding tool calls, keyed by toolCallId.
+
+    A toolCallId is only unique within one model turn, so opening an id again
+    in a later round forgets how the earlier call with that id was closed.
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[str, asyncio.Future[Dict[str, Any]]] = {}
+        self._closed: Dict[str, str] = {}
+
+    def open(self, tool_call_id: str) -> asyncio.Future[Dict[str, Any]]:
+        self._closed.pop(tool_call_id, None)
+        future = self._calls[tool_call_id] = asyncio.get_running_loop().create_future()
+        return future
+
+    def check(self, tool_call_id: str) -> None:
+        """Raise unless the call is waiting for its result."""
+        if tool_call_id in self._closed:
+            raise ToolCallClosedError(tool_call_id, self._closed[tool_call_id])
+        if tool_call_id not in self._calls:
+            raise ToolCallNotFoundError(tool_call_id)
+
+    def resolve(self, tool_call_id: str, result: Dict[str, Any]) -> None:
+        self.check(tool_call_id)
+        self._calls.pop(tool_call_id).set_result(result)
+        self._closed[tool_call_id] = "TOOL_RESULT_RECEIVED"
+
+    def close(self, tool_call_id: str, error_code: str) -> None:
+        """Stop waiting for a call, e.g. after ``TOOL_TIMEOUT``; late results are refused."""
+        future = self._calls.pop(tool_call_id, None)
+        if future is not None:
+            future.cancel()
+            self._closed[tool_call_id] = error_code
+
+    def close_all(self, error_code: str) -> None:
+        for tool_call_id in list(self._calls):
+            self.close(tool_call_id, error_code)
+
+
+def tool_message(tool_call_id: str, result: Dict[str, Any], max_chars: int) -> Dict[str, Any]:
+    """The ``tool`` message reporting ``result`` back to the model."""
+    content = {key: value for key, value in result.items() if value is not None}
+    for stream in ("stdout", "stderr"):
+        text = content.get(stream)
+        if isinstance(text, str) and len(text) > max_chars:
+            content[stream] = text[:max_chars] + f"\n[truncated {len(text) - max_chars} characters]"
+    return {"role": "tool", "tool_call_id": tool_call_id, "content": json.dumps(content, ensure_ascii=False)}
@@ -0,0 +1,141 @@
+"""Run ownership and the IPC channel between worker processes.
+
+With ``--workers N`` every worker accepts connections on the shared listening
+socket, but a run lives in exactly one worker's ``RunManager``: the one picked
+by a stable hash of its run id. Requests that land elsewhere are forwarded
+over the owner's private endpoint (a Unix socket, or a loopback port where
+Unix sockets are unavailable) with ``FORWARDED_HEADER`` set, and the owner
+serves them locally.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import uuid
+import zlib
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+FORWARDED_HEADER = "X-AgentRelay-Worker"
+UNIX_ENDPOINT_PREFIX = "unix:"
+
+
+@dataclass(frozen=True)
+class WorkerTopology:
+    """This worker's index plus the IPC endpoint of every worker, by index."""
+
+    index: int
+    endpoints: Tuple[str, ...]
+
+    @property
+    def count(self) -> int:
+        return len(self.endpoints)
+
+    def owner(self, run_id: str) -> int:
+        # crc32 rather than hash(): str hashes are salted per process.
+        return zlib.crc32(run_id.encode("utf-8")) % self.count
+
+    def is_local(self, run_id: str) -> bool:
+        return self.owner(run_id) == self.index
+
+    def peers(self) -> List[int]:
+        return [index for index in range(self.count) if index != self.index]
+
+    def new_run_id(self, owner: Optional[int] = None) -> str:
+        """A fresh run id owned by ``owner`` (this worker by default), so creating it needs no hop."""
+        owner = self.index if owner is None else owner
+        while True:
+            run_id = str(uuid.uuid4())
+            if self.owner(run_id) == owner:
+                return run_id
+
+
+class WorkerUnavailableError(RuntimeError):
+    """Raised when a peer worker cannot be reached over its IPC endpoint."""
+
+
+class WorkerRouter:
+    """HTTP clients for the peer workers' IPC endpoints."""
+
+    def __init__(
+        self,
+        topology: WorkerTopology,
+        transports: Optional[Mapping[int, httpx.AsyncBaseTransport]] = None,
+    ):
+        self.topology = topology
+        self._transports = dict(transports or {})
+        self._clients: Dict[int, httpx.AsyncClient] = {}
+
+    def _client(self, index: int) -> httpx.AsyncClient:
+        client = self._clients.get(index)
+        if client is not None:
+            return client
+        import httpx
+
+        endpoint = self.topology.endpoints[index]
+        transport = self._transports.get(index)
+        base_url = endpoint
+        if endpoint.startswith(UNIX_ENDPOINT_PREFIX):
+            base_url = "http://agentrelay-worker"
+            if transport is None:
+                transport = httpx.AsyncHTTPTransport(uds=endpoint[len(UNIX_ENDPOINT_PREFIX) :])
+        client = httpx.AsyncClient(
+            base_url=base_url,
+            transport=transport,
+            timeout=httpx.Timeout(30.0, read=None),
+            headers={FORWARDED_HEADER: str(self.topology.index)},
+        )
+        self._clients[index] = client
+        return client
+
+    async def send(self, index: int, method: str, path: str, *, stream: bool = False, **kwargs: Any) -> httpx.Response:
+        """Issue a request to worker ``index``; with ``stream`` the body is left unread."""
+        import httpx
+
+        client = self._client(index)
+        request = client.build_request(method, path, **kwargs)
+        try:
+            return await client.send(request, stream=stream)
+        except httpx.HTTPError as exc:
+            raise WorkerUnavailableError(f"Worker {index} is unavailable") from exc
+
+    async def gather(self, path: str, params: Optional[Mapping[str, Any]] = None) -> List[Tuple[int, Any]]:
+        """GET ``path`` from every peer concurrently; unreachable peers are skipped."""
+
+        async def fetch(index: int) -> Optional[Tuple[int, Any]]:
+            try:
+                response = await self.send(index, "GET", path, params=params)
+                response.raise_for_status()
+                return index, response.json()
+            except Exception:  # noqa: BLE001
+                logger.warning("Worker %s did not answer %s", index, path, exc_info=True)
+                return None
+
+        results = await asyncio.gather(*(fetch(index) for index in self.topology.peers()))
+        return [result for result in results if result is not None]
+
+    async def aclose(self) -> None:
+        clients = list(self._clients.values())
+        self._clients.clear()
+        await asyncio.gather(*(client.aclose() for client in clients))
+
+
+def merge_counts(items: Iterable[Any]) -> Any:
+    """Sum numeric leaves of same-shaped stats dicts; other leaves keep the first value."""
+    items = [item for item in items if item is not None]
+    if not items:
+        return None
+    if all(isinstance(item, dict) for item in items):
+        keys: Dict[str, None] = {}
+        for item in items:
+            keys.update(dict.fromkeys(item))
+        return {key: merge_counts(item.get(key) for item in items) for key in keys}
+    if all(isinstance(item, (int, float)) and not isinstance(item, bool) for item in items):
+        return sum(items)
+    return items[0]
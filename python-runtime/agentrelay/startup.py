@@ -0,0 +1,170 @@
+"""Cold-start helpers: phase timings, import profiling and post-READY warm-up.
+
+This module only depends on the standard library so ``entrypoint.py`` can
+import it (and install the import profiler) before anything heavy loads.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import importlib
+import logging
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Loaded off the event loop after READY so the first run does not pay for them.
+WARMUP_MODULES: Tuple[str, ...] = (
+    "httpx",
+    "openai",
+    "openai.types.chat",
+)
+
+
+@dataclass
+class StartupProfile:
+    """Wall-clock duration of each startup phase, in the order they finished."""
+
+    started_at: float = field(default_factory=time.perf_counter)
+    phases: Dict[str, float] = field(default_factory=dict)
+    on_complete: Optional[Callable[["StartupProfile"], None]] = None
+    completed: bool = False
+
+    def __post_init__(self) -> None:
+        self._last = self.started_at
+
+    def mark(self, phase: str) -> float:
+        now = time.perf_counter()
+        elapsed = now - self._last
+        self.phases[phase] = self.phases.get(phase, 0.0) + elapsed
+        self._last = now
+        return elapsed
+
+    def complete(self) -> None:
+        if self.completed:
+            return
+        self.completed = True
+        if self.on_complete is not None:
+            self.on_complete(self)
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "phasesMs": {phase: round(seconds * 1000.0, 3) for phase, seconds in self.phases.items()},
+            "totalMs": round((self._last - self.started_at) * 1000.0, 3),
+            "complete": self.completed,
+        }
+
+
+class ImportProfiler:
+    """``sys.meta_path`` hook timing every module executed while installed.
+
+    Like ``python -X importtime`` it records, per module, the cumulative time
+    spent executing it (children included) and its self time, but it can be
+    switched on from inside the process. Only loader instances are wrapped;
+    shared class-level loaders (builtins, frozen modules) are left alone.
+    """
+
+    def __init__(self) -> None:
+        self._timings: Dict[str, Tuple[float, float]] = {}
+        self._local = threading.local()
+
+    def install(self) -> None:
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+
+    def uninstall(self) -> None:
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, fullname: str, path: Any = None, target: Any = None) -> Any:
+        for finder in sys.meta_path:
+            if finder is self:
+                continue
+            find_spec = getattr(finder, "find_spec", None)
+            if find_spec is None:
+                continue
+            spec = find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        loader = spec.loader
+        if loader is not None and not isinstance(loader, type) and hasattr(loader, "exec_module"):
+            self._wrap(fullname, loader)
+        return spec
+
+    def _wrap(self, name: str, loader: Any) -> None:
+        exec_module = loader.exec_module
+
+        def timed_exec_module(module: Any) -> None:
+            stack = self._stack()
+            stack.append(0.0)
+            began = time.perf_counter()
+            try:
+                exec_module(module)
+            finally:
+                elapsed = time.perf_counter() - began
+                children = stack.pop()
+                if stack:
+                    stack[-1] += elapsed
+                self._timings[name] = (elapsed, elapsed - children)
+
+        loader.exec_module = timed_exec_module
+
+    def _stack(self) -> List[float]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def timings(self) -> Dict[str, Tuple[float, float]]:
+        """``{module: (cumulative_sec, self_sec)}`` for every module seen."""
+        return dict(self._timings)
+
+    def report(self, limit: int = 25) -> List[Tuple[str, float, float]]:
+        """The ``limit`` slowest modules by self time."""
+        ranked = sorted(self._timings.items(), key=lambda item: item[1][1], reverse=True)
+        return [(name, cumulative, own) for name, (cumulative, own) in ranked[:limit]]
+
+
+def format_report(profile: StartupProfile, profiler: Optional[ImportProfiler] = None, limit: int = 25) -> str:
+    lines = ["startup phases (ms):"]
+    for phase, seconds in profile.phases.items():
+        lines.append(f"  {phase:<16} {seconds * 1000.0:>10.1f}")
+    lines.append(f"  {'total':<16} {profile.summary()['totalMs']:>10.1f}")
+    if profiler is not None:
+        timings = profiler.timings()
+        packages: Dict[str, float] = {}
+        for name, (_, own) in timings.items():
+            root = name.split(".", 1)[0]
+            packages[root] = packages.get(root, 0.0) + own
+        lines.append("import time by top-level package (ms, self time summed):")
+        for root, seconds in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:limit]:
+            lines.append(f"  {seconds * 1000.0:>10.1f}  {root}")
+        lines.append(f"slowest modules (ms, self | cumulative), {len(timings)} imported:")
+        for name, cumulative, own in profiler.report(limit):
+            lines.append(f"  {own * 1000.0:>10.1f} | {cumulative * 1000.0:>10.1f}  {name}")
+    return "\n".join(lines)
+
+
+def _import_all(modules: Iterable[str]) -> None:
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except Exception:  # noqa: BLE001
+            logger.debug("Warm-up import of %s failed", name, exc_info=True)
+
+
+async def warm_up(modules: Iterable[str] = WARMUP_MODULES) -> float:
+    """Import ``modules`` in a worker thread; returns the seconds it took.
+
+    A run that needs one of these modules while the warm-up is still going
+    simply blocks on the module's import lock and picks up the result.
+    """
+    began = time.perf_counter()
+    await asyncio.to_thread(_import_all, tuple(modules))
+    return time.perf_counter() - began
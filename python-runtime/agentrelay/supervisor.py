@@ -0,0 +1,178 @@
+"""Multi-process serving for ``entrypoint.py --workers N``.
+
+The supervisor binds the public listening socket once and hands it to N
+spawned worker processes, so the kernel spreads connections across them.
+Each worker also gets a private IPC socket through which its peers reach the
+runs it owns (see ``agentrelay.services.workers``). The supervisor prints
+``AGENTRELAY READY`` once every worker has started, restarts workers that
+exit unexpectedly, and forwards SIGINT/SIGTERM to them.
+"""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import queue
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import time
+from multiprocessing.connection import wait
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .config import AgentRelaySettings
+from .services.workers import UNIX_ENDPOINT_PREFIX, WorkerTopology
+from .startup import StartupProfile
+
+logger = logging.getLogger(__name__)
+
+READY_TIMEOUT_SEC = 60.0
+SHUTDOWN_TIMEOUT_SEC = 10.0
+
+
+def _bind_listener(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _bind_ipc(ipc_dir: Path, index: int) -> tuple[socket.socket, str]:
+    if hasattr(socket, "AF_UNIX"):
+        path = ipc_dir / f"worker-{index}.sock"
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(str(path))
+        endpoint = f"{UNIX_ENDPOINT_PREFIX}{path}"
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind(("127.0.0.1", 0))
+        endpoint = f"http://127.0.0.1:{sock.getsockname()[1]}"
+    sock.listen(256)
+    sock.set_inheritable(True)
+    return sock, endpoint
+
+
+def _worker_main(
+    settings_data: Dict[str, Any],
+    topology: WorkerTopology,
+    sockets: List[socket.socket],
+    ready: Any,
+) -> None:
+    import asyncio
+
+    import uvicorn
+
+    from .app import create_app
+
+    settings = AgentRelaySettings(**settings_data)
+    logging.basicConfig(level=settings.log_level)
+    app = create_app(settings, worker_topology=topology, announce_ready=lambda: ready.put(topology.index))
+    config = uvicorn.Config(app, log_level=settings.log_level.lower(), proxy_headers=False, reload=False)
+    server = uvicorn.Server(config=config)
+    try:
+        asyncio.run(server.serve(sockets=sockets))
+    except KeyboardInterrupt:
+        pass
+
+
+class WorkerSupervisor:
+    def __init__(self, settings: AgentRelaySettings, profile: Optional[StartupProfile] = None):
+        self._settings = settings
+        self._profile = profile or StartupProfile()
+        self._context = multiprocessing.get_context("spawn")
+        self._ready = self._context.Queue()
+        self._processes: Dict[int, Any] = {}
+        self._sockets: Dict[int, List[socket.socket]] = {}
+        self._topologies: Dict[int, WorkerTopology] = {}
+        self._stopping = False
+
+    def serve(self) -> None:
+        count = self._settings.workers
+        ipc_dir = Path(tempfile.mkdtemp(prefix="agentrelay-workers-"))
+        listener = _bind_listener(self._settings.host, self._settings.port)
+        ipc = [_bind_ipc(ipc_dir, index) for index in range(count)]
+        endpoints = tuple(endpoint for _, endpoint in ipc)
+        for index, (ipc_socket, _) in enumerate(ipc):
+            self._sockets[index] = [listener, ipc_socket]
+            self._topologies[index] = WorkerTopology(index=index, endpoints=endpoints)
+
+        previous = {sig: signal.signal(sig, self._request_stop) for sig in (signal.SIGINT, signal.SIGTERM)}
+        try:
+            for index in range(count):
+                self._start(index)
+            self._wait_ready(count)
+            self._profile.mark("workers_ready")
+            print(f"AGENTRELAY READY {self._settings.port}", flush=True)
+            self._profile.complete()
+            self._monitor()
+        finally:
+            self._stop_all()
+            for sig, handler in previous.items():
+                signal.signal(sig, handler)
+            listener.close()
+            for ipc_socket, _ in ipc:
+                ipc_socket.close()
+            shutil.rmtree(ipc_dir, ignore_errors=True)
+
+    def _start(self, index: int) -> None:
+        process = self._context.Process(
+            target=_worker_main,
+            args=(self._settings.model_dump(), self._topologies[index], self._sockets[index], self._ready),
+            name=f"agentrelay-worker-{index}",
+        )
+        process.start()
+        self._processes[index] = process
+
+    def _wait_ready(self, count: int) -> None:
+        pending = set(range(count))
+        deadline = time.monotonic() + READY_TIMEOUT_SEC
+        while pending and not self._stopping:
+            try:
+                pending.discard(self._ready.get(timeout=0.2))
+            except queue.Empty:
+                pass
+            for index in sorted(pending):
+                if not self._processes[index].is_alive():
+                    raise RuntimeError(f"Worker {index} exited during startup")
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Workers {sorted(pending)} did not become ready")
+
+    def _monitor(self) -> None:
+        while not self._stopping:
+            sentinels = {process.sentinel: index for index, process in self._processes.items()}
+            for sentinel in wait(list(sentinels), timeout=1.0):
+                index = sentinels[sentinel]
+                if self._stopping:
+                    break
+                logger.warning(
+                    "Worker %s exited with code %s; restarting", index, self._processes[index].exitcode
+                )
+                self._start(index)
+
+    def _request_stop(self, signum: int, frame: Any) -> None:
+        self._stopping = True
+
+    def _stop_all(self) -> None:
+        self._stopping = True
+        for process in self._processes.values():
+            if process.is_alive():
+                process.terminate()
+        for process in self._processes.values():
+            process.join(SHUTDOWN_TIMEOUT_SEC)
+            if process.is_alive():
+                process.kill()
+                process.join()
+
+
+def serve_workers(settings: AgentRelaySettings, profile: Optional[StartupProfile] = None) -> None:
+    try:
+        WorkerSupervisor(settings, profile).serve()
+    except RuntimeError as exc:
+        print(f"agentrelay: {exc}", file=sys.stderr, flush=True)
+        raise SystemExit(1) from None
@@ -1 +1,5 @@
-"""LangGraph workflow definitions will live here."""
+"""LangGraph workflows, keyed by agentId."""
+
+from .registry import WorkflowBuilder, WorkflowNotFoundError, WorkflowRegistry, WorkflowUnavailableError
+
+__all__ = ["WorkflowBuilder", "WorkflowNotFoundError", "WorkflowRegistry", "WorkflowUnavailableError"]
@@ -0,0 +1,157 @@
+"""Agent workflows as LangGraph graphs, compiled once and reused by every run.
+
+Each ``agentId`` maps to a builder returning an uncompiled ``StateGraph``
+(a callable, or a ``"module:attribute"`` path imported on first use). The
+compiled graph is cached until the builder is replaced or the agents etag
+changes, so a run only pays for ``astream``.
+
+All graphs share one in-memory checkpointer. Threads are keyed by session
+(or by run, and then dropped when the run ends) and the least recently used
+ones are deleted beyond ``max_threads``. With a ``checkpoint_path`` the
+checkpoints are pickled there on ``aclose`` and reloaded on first use.
+
+LangGraph is only imported once a workflow is compiled.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import importlib
+import logging
+import os
+import pickle
+from collections import OrderedDict, defaultdict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+WorkflowBuilder = Union[Callable[[], Any], str]
+
+
+class WorkflowNotFoundError(Exception):
+    pass
+
+
+class WorkflowUnavailableError(Exception):
+    """The workflow cannot be compiled, e.g. LangGraph or the builder's module is missing."""
+
+
+class WorkflowRegistry:
+    def __init__(self, etag: str, checkpoint_path: Optional[Path] = None, max_threads: int = 1024):
+        self._builders: Dict[str, WorkflowBuilder] = {}
+        self._compiled: Dict[str, Any] = {}
+        self._etag = etag
+        self._checkpoint_path = checkpoint_path
+        self._max_threads = max_threads
+        self._saver: Any = None
+        self._threads: OrderedDict[str, None] = OrderedDict()
+        self._compiles = 0
+        self._hits = 0
+
+    def __contains__(self, agent_id: Optional[str]) -> bool:
+        return agent_id in self._builders
+
+    def register(self, agent_id: str, builder: WorkflowBuilder) -> None:
+        self._builders[agent_id] = builder
+        self._compiled.pop(agent_id, None)
+
+    def unregister(self, agent_id: str) -> bool:
+        self._compiled.pop(agent_id, None)
+        return self._builders.pop(agent_id, None) is not None
+
+    def get(self, agent_id: str, etag: str) -> Any:
+        """The compiled graph for ``agent_id``, compiling it if ``etag`` moved on since."""
+        if etag != self._etag:
+            self._compiled.clear()
+            self._etag = etag
+        graph = self._compiled.get(agent_id)
+        if graph is not None:
+            self._hits += 1
+            return graph
+        builder = self._builders.get(agent_id)
+        if builder is None:
+            raise WorkflowNotFoundError(agent_id)
+        try:
+            graph = _resolve(builder)().compile(checkpointer=self._checkpointer())
+        except ImportError as exc:
+            raise WorkflowUnavailableError(f"Workflow {agent_id} cannot be loaded: {exc}") from exc
+        self._compiled[agent_id] = graph
+        self._compiles += 1
+        return graph
+
+    def touch_thread(self, thread_id: str) -> None:
+        """Mark a checkpoint thread as used, deleting the least recently used beyond the cap."""
+        self._threads[thread_id] = None
+        self._threads.move_to_end(thread_id)
+        while len(self._threads) > self._max_threads:
+            self.release_thread(next(iter(self._threads)))
+
+    def release_thread(self, thread_id: str) -> None:
+        self._threads.pop(thread_id, None)
+        if self._saver is not None:
+            self._saver.delete_thread(thread_id)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "registered": len(self._builders),
+            "compiled": len(self._compiled),
+            "compiles": self._compiles,
+            "cacheHits": self._hits,
+            "threads": len(self._threads),
+        }
+
+    async def aclose(self) -> None:
+        if self._saver is None or self._checkpoint_path is None:
+            return
+        # Copied on the loop so runs cannot mutate what the thread is pickling.
+        saver = self._saver
+        snapshot = {
+            "storage": {thread: {ns: dict(items) for ns, items in spaces.items()} for thread, spaces in saver.storage.items()},
+            "writes": {key: dict(items) for key, items in saver.writes.items()},
+            "blobs": dict(saver.blobs),
+        }
+        await asyncio.to_thread(_write_snapshot, self._checkpoint_path, snapshot)
+
+    def _checkpointer(self) -> Any:
+        if self._saver is None:
+            from langgraph.checkpoint.memory import InMemorySaver
+
+            self._saver = InMemorySaver()
+            if self._checkpoint_path is not None and self._checkpoint_path.exists():
+                self._load(self._checkpoint_path)
+        return self._saver
+
+    def _load(self, path: Path) -> None:
+        try:
+            with open(path, "rb") as handle:
+                snapshot = pickle.load(handle)
+        except Exception:  # noqa: BLE001
+            logger.warning("Ignoring unreadable workflow checkpoints at %s", path, exc_info=True)
+            return
+        saver = self._saver
+        for thread, spaces in snapshot["storage"].items():
+            saver.storage[thread] = defaultdict(dict, spaces)
+            self._threads[thread] = None
+        saver.writes.update(snapshot["writes"])
+        saver.blobs.update(snapshot["blobs"])
+
+
+def _resolve(builder: WorkflowBuilder) -> Callable[[], Any]:
+    if callable(builder):
+        return builder
+    module, _, attribute = builder.partition(":")
+    if not attribute:
+        raise ImportError(f"Workflow builder {builder!r} is not of the form 'module:attribute'")
+    try:
+        return getattr(importlib.import_module(module), attribute)
+    except AttributeError:
+        raise ImportError(f"Module {module!r} has no attribute {attribute!r}") from None
+
+
+def _write_snapshot(path: Path, snapshot: Dict[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "wb") as handle:
+        pickle.dump(snapshot, handle, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
@@ -0,0 +1 @@
+"""Offline benchmarks and load tooling for the AgentRelay runtime."""
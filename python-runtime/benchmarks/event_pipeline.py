@@ -0,0 +1,184 @@
+"""Microbenchmarks for the RunManager event pipeline.
+
+Drives ``RunManager.create_run``/``stream_events`` against the in-process fake
+upstream and reports, per scenario, delivered events/sec, CPU time per event,
+peak traced allocations and p50/p99 inter-event latency seen by subscribers.
+
+Run from ``python-runtime``::
+
+    python -m benchmarks.event_pipeline                 # compare with the baseline
+    python -m benchmarks.event_pipeline --save-baseline # record a new baseline
+
+Absolute numbers depend on the machine; record a baseline on the machine you
+compare on and look at the relative change.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, List, Optional, Sequence
+
+from agentrelay.config import AgentRelaySettings
+from agentrelay.services.client_pool import UpstreamClientPool
+from agentrelay.services.run_manager import RunManager
+from agentrelay.services.settings_store import SettingsStore
+
+from .fake_upstream import UpstreamProfile, fake_transport
+from .report import compare, environment, load_report, percentile, print_table, write_report
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baselines" / "event_pipeline.json"
+
+# Metric -> which direction is better, used when comparing with a baseline.
+DIRECTIONS = {
+    "eventsPerSec": "higher",
+    "cpuUsPerEvent": "lower",
+    "interEventP50Us": "lower",
+    "interEventP99Us": "lower",
+    "peakKiB": "lower",
+}
+
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    runs: int = 1
+    subscribers: int = 1
+    profile: UpstreamProfile = UpstreamProfile()
+    settings: dict[str, Any] = field(default_factory=dict)
+
+
+SCENARIOS = [
+    Scenario("single_run", profile=UpstreamProfile(tokens=2000)),
+    Scenario("fanout_8", subscribers=8, profile=UpstreamProfile(tokens=2000)),
+    Scenario("concurrent_16", runs=16, profile=UpstreamProfile(tokens=500)),
+    Scenario("coalesced", profile=UpstreamProfile(tokens=2000), settings={"delta_coalescing": "coalesce"}),
+    Scenario("paced_jitter", profile=UpstreamProfile(tokens=200, tokens_per_sec=2000, jitter=0.5)),
+]
+
+
+@dataclass
+class _Pass:
+    events: int
+    wall_sec: float
+    cpu_sec: float
+    gaps: List[float]
+
+
+async def _drive(scenario: Scenario, data_dir: Path) -> _Pass:
+    store = SettingsStore(settings_dir=data_dir)
+    store.set_deepseek_settings("sk-bench", "https://bench-upstream/v1")
+    overrides = {"completion_cache_enabled": False, "max_concurrent_runs": max(scenario.runs, 1)}
+    settings = AgentRelaySettings(**{**overrides, **scenario.settings})
+    manager = RunManager(settings, store, UpstreamClientPool(settings, transport=fake_transport(scenario.profile)))
+    gaps: List[float] = []
+    counts: List[int] = []
+
+    async def subscribe(run_id: str) -> None:
+        received = 0
+        previous: Optional[float] = None
+        async for _ in manager.stream_events(run_id):
+            now = time.perf_counter()
+            if previous is not None:
+                gaps.append(now - previous)
+            previous = now
+            received += 1
+        counts.append(received)
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    subscribers = []
+    for index in range(scenario.runs):
+        run_id = f"bench-{index}"
+        # Distinct prompts keep runs from being deduplicated into one upstream stream.
+        await manager.create_run(run_id, {"conversation": [{"role": "user", "content": f"bench {index}"}]})
+        subscribers.extend(asyncio.create_task(subscribe(run_id)) for _ in range(scenario.subscribers))
+    await asyncio.gather(*subscribers)
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    await manager.aclose()
+    return _Pass(events=sum(counts), wall_sec=wall, cpu_sec=cpu, gaps=gaps)
+
+
+def run_scenario(scenario: Scenario, repeat: int = 5) -> dict[str, Any]:
+    passes: List[_Pass] = []
+    with tempfile.TemporaryDirectory() as data_dir:
+        asyncio.run(_drive(scenario, Path(data_dir)))  # warm-up: imports, pools, caches
+        for _ in range(repeat):
+            passes.append(asyncio.run(_drive(scenario, Path(data_dir))))
+
+        tracemalloc.start()
+        try:
+            asyncio.run(_drive(scenario, Path(data_dir)))
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    events = passes[0].events
+    gaps = [gap for run in passes for gap in run.gaps]
+    return {
+        "events": events,
+        "eventsPerSec": round(statistics.median(run.events / run.wall_sec for run in passes), 1),
+        "cpuUsPerEvent": round(statistics.median(run.cpu_sec / run.events * 1e6 for run in passes), 2),
+        "interEventP50Us": round((percentile(gaps, 0.5) or 0.0) * 1e6, 2),
+        "interEventP99Us": round((percentile(gaps, 0.99) or 0.0) * 1e6, 2),
+        "peakKiB": round(peak / 1024, 1),
+    }
+
+
+def run_suite(scenarios: Sequence[Scenario], repeat: int) -> dict[str, Any]:
+    return {
+        "environment": environment(),
+        "repeat": repeat,
+        "results": {scenario.name: run_scenario(scenario, repeat) for scenario in scenarios},
+    }
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="AgentRelay event pipeline microbenchmarks")
+    parser.add_argument("--scenario", action="append", choices=[s.name for s in SCENARIOS], help="Run only these.")
+    parser.add_argument("--repeat", type=int, default=5, help="Measured passes per scenario.")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH, help="Baseline report to compare with.")
+    parser.add_argument("--save-baseline", action="store_true", help="Write the results as the new baseline.")
+    parser.add_argument("--output", type=Path, help="Also write the JSON report here.")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Relative change flagged as a regression.")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit with status 1 on regressions.")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+    scenarios = [s for s in SCENARIOS if not args.scenario or s.name in args.scenario]
+    report = run_suite(scenarios, args.repeat)
+
+    print_table(
+        ({"scenario": name, **metrics} for name, metrics in report["results"].items()),
+        ["scenario", "events", *DIRECTIONS],
+    )
+    if args.output:
+        write_report(args.output, report)
+    if args.save_baseline:
+        write_report(args.baseline, report)
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+
+    baseline = load_report(args.baseline)
+    if baseline is None:
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to create one.")
+        return 0
+    rows = compare(report["results"], baseline["results"], DIRECTIONS, args.threshold)
+    print(f"\nCompared with {args.baseline}:")
+    print_table(rows, ["case", "metric", "baseline", "current", "change", "regression"])
+    regressed = any(row["regression"] for row in rows)
+    return 1 if regressed and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""Fake OpenAI-compatible streaming provider used by the benchmarks.
+
+``stream_chunks`` produces the ``chat.completion.chunk`` SSE body for a
+configurable token rate, chunk size and jitter. ``fake_transport`` serves it
+in-process through ``httpx.MockTransport`` so ``UpstreamClientPool`` can be
+pointed at it without opening sockets.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+from dataclasses import dataclass
+from typing import AsyncIterator, List, Optional
+
+import httpx
+
+
+@dataclass(frozen=True)
+class UpstreamProfile:
+    tokens: int = 500
+    tokens_per_sec: float = 0.0
+    chunk_tokens: int = 1
+    jitter: float = 0.0
+    token_text: str = "tok "
+    seed: Optional[int] = 0
+
+    def chunk_delay(self, rng: random.Random) -> float:
+        if self.tokens_per_sec <= 0:
+            return 0.0
+        delay = self.chunk_tokens / self.tokens_per_sec
+        if self.jitter:
+            delay *= 1 + rng.uniform(-self.jitter, self.jitter)
+        return max(delay, 0.0)
+
+
+def _frame(content: Optional[str] = None, finish_reason: Optional[str] = None) -> bytes:
+    delta = {"content": content} if content is not None else {}
+    chunk = {
+        "id": "chatcmpl-bench",
+        "object": "chat.completion.chunk",
+        "created": 0,
+        "model": "deepseek-chat",
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return b"data: " + json.dumps(chunk).encode("utf-8") + b"\n\n"
+
+
+def chunk_texts(profile: UpstreamProfile) -> List[str]:
+    texts = []
+    remaining = profile.tokens
+    while remaining > 0:
+        count = min(profile.chunk_tokens, remaining)
+        texts.append(profile.token_text * count)
+        remaining -= count
+    return texts
+
+
+async def stream_chunks(profile: UpstreamProfile) -> AsyncIterator[bytes]:
+    """Yield the SSE body of one streamed chat completion."""
+    rng = random.Random(profile.seed)
+    for text in chunk_texts(profile):
+        delay = profile.chunk_delay(rng)
+        if delay:
+            await asyncio.sleep(delay)
+        yield _frame(text)
+    yield _frame(finish_reason="stop")
+    yield b"data: [DONE]\n\n"
+
+
+def fake_transport(profile: UpstreamProfile) -> httpx.MockTransport:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(
+            200,
+            headers={"content-type": "text/event-stream"},
+            content=stream_chunks(profile),
+        )
+
+    return httpx.MockTransport(handler)
@@ -0,0 +1,378 @@
+"""End-to-end load and soak harness against the real uvicorn server.
+
+Starts ``benchmarks.mock_upstream`` and ``entrypoint.py`` (pointed at the mock
+with ``--deepseek-base`` and an isolated ``--data-dir``) as subprocesses, then:
+
+* sweeps concurrency levels, each level keeping N clients busy with
+  ``POST /runs`` + ``GET /runs/{id}/events`` for ``--duration`` seconds;
+* optionally soaks at one level for ``--soak-minutes``.
+
+For every level it records run-start latency (POST round trip), time to
+``run.started`` and to the first ``run.delta``, completion latency, error and
+429 rates, and the server's RSS and open file descriptors over time. The JSON
+report can be compared against a previous one::
+
+    python -m benchmarks.load_harness --concurrency 1,10,20,50 --duration 30 \\
+        --output load.json --compare previous-load.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, List, Optional, Sequence
+
+import httpx
+
+from .mock_upstream import READY_MARKER
+from .report import compare, environment, load_report, percentile, print_table, write_report
+
+RUNTIME_DIR = Path(__file__).resolve().parent.parent
+SERVER_READY_MARKER = "AGENTRELAY READY"
+
+DIRECTIONS = {
+    "runsPerSec": "higher",
+    "startLatencyP50Ms": "lower",
+    "startLatencyP99Ms": "lower",
+    "runStartedP99Ms": "lower",
+    "ttftP50Ms": "lower",
+    "ttftP99Ms": "lower",
+    "completionP50Ms": "lower",
+    "completionP99Ms": "lower",
+    "errorRate": "lower",
+    "rejectedRate": "lower",
+    "rssGrowthMiB": "lower",
+    "fdGrowth": "lower",
+}
+
+
+@dataclass
+class RunSample:
+    status: str
+    start_latency: Optional[float] = None
+    started: Optional[float] = None
+    first_delta: Optional[float] = None
+    completion: Optional[float] = None
+
+
+@dataclass
+class LevelResult:
+    concurrency: int
+    samples: List[RunSample] = field(default_factory=list)
+    resources: List[dict[str, float]] = field(default_factory=list)
+    elapsed: float = 0.0
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def process_resources(pid: int) -> Optional[dict[str, float]]:
+    """RSS (MiB) and open file descriptors of ``pid``; psutil when available, else /proc."""
+    try:
+        import psutil  # type: ignore[import-not-found]
+    except ImportError:
+        psutil = None
+    if psutil is not None:
+        try:
+            process = psutil.Process(pid)
+            fds = process.num_fds() if hasattr(process, "num_fds") else process.num_handles()
+            return {"rssMiB": process.memory_info().rss / 1048576, "fds": fds}
+        except psutil.Error:
+            return None
+    proc = Path("/proc") / str(pid)
+    try:
+        status = (proc / "status").read_text()
+        rss_kib = next(int(line.split()[1]) for line in status.splitlines() if line.startswith("VmRSS:"))
+        return {"rssMiB": rss_kib / 1024, "fds": len(os.listdir(proc / "fd"))}
+    except (OSError, StopIteration, ValueError):
+        return None
+
+
+class ManagedProcess:
+    """A subprocess whose output goes to a log file, considered ready once it prints ``marker``."""
+
+    def __init__(self, name: str, args: Sequence[str], marker: str, log_dir: Path, env: Optional[dict] = None):
+        self.name = name
+        self.log_path = log_dir / f"{name}.log"
+        self._log = self.log_path.open("wb")
+        self.process = subprocess.Popen(
+            list(args),
+            cwd=RUNTIME_DIR,
+            stdout=self._log,
+            stderr=subprocess.STDOUT,
+            env={**os.environ, **(env or {})},
+        )
+        self._marker = marker
+
+    def wait_ready(self, timeout: float = 30.0) -> None:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"{self.name} exited early; see {self.log_path}")
+            if self._marker in self.log_path.read_text(errors="replace"):
+                return
+            time.sleep(0.05)
+        raise TimeoutError(f"{self.name} did not become ready; see {self.log_path}")
+
+    def stop(self) -> None:
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self._log.close()
+
+
+async def _one_run(client: httpx.AsyncClient, index: int) -> RunSample:
+    payload = {
+        "runId": f"load-{uuid.uuid4().hex}",
+        "conversation": [{"role": "user", "content": f"load test {index}"}],
+    }
+    began = time.perf_counter()
+    try:
+        response = await client.post("/runs", json=payload)
+    except httpx.HTTPError:
+        return RunSample(status="error")
+    sample = RunSample(status="error", start_latency=time.perf_counter() - began)
+    if response.status_code == 429:
+        sample.status = "rejected"
+        retry_after = float(response.headers.get("Retry-After", "1"))
+        await asyncio.sleep(min(retry_after, 1.0))
+        return sample
+    if response.status_code != 202:
+        return sample
+
+    try:
+        async with client.stream("GET", f"/runs/{payload['runId']}/events") as stream:
+            async for line in stream.aiter_lines():
+                if not line.startswith("event: "):
+                    continue
+                name = line[len("event: ") :]
+                elapsed = time.perf_counter() - began
+                if name == "run.started" and sample.started is None:
+                    sample.started = elapsed
+                elif name == "run.delta" and sample.first_delta is None:
+                    sample.first_delta = elapsed
+                elif name in ("run.completed", "run.failed", "run.cancelled"):
+                    sample.completion = elapsed
+                    sample.status = name.removeprefix("run.")
+                    break
+    except httpx.HTTPError:
+        sample.status = "error"
+    return sample
+
+
+async def run_level(
+    base_url: str,
+    concurrency: int,
+    duration: float,
+    server_pid: int,
+    sample_interval: float,
+) -> LevelResult:
+    result = LevelResult(concurrency=concurrency)
+    limits = httpx.Limits(max_connections=concurrency * 2 + 4, max_keepalive_connections=concurrency * 2 + 4)
+    timeout = httpx.Timeout(60.0, connect=10.0)
+    deadline = time.monotonic() + duration
+    counter = 0
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+
+        async def worker() -> None:
+            nonlocal counter
+            while time.monotonic() < deadline:
+                counter += 1
+                result.samples.append(await _one_run(client, counter))
+
+        async def sampler() -> None:
+            while True:
+                stats = process_resources(server_pid)
+                if stats is not None:
+                    result.resources.append({"t": round(time.monotonic() - started, 2), **stats})
+                await asyncio.sleep(sample_interval)
+
+        started = time.monotonic()
+        sampling = asyncio.create_task(sampler())
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        result.elapsed = time.monotonic() - started
+        sampling.cancel()
+    final = process_resources(server_pid)
+    if final is not None:
+        result.resources.append({"t": round(result.elapsed, 2), **final})
+    return result
+
+
+def summarise(result: LevelResult) -> dict[str, Any]:
+    samples = result.samples
+    total = len(samples) or 1
+
+    def ms(values: List[float], q: float) -> Optional[float]:
+        value = percentile(values, q)
+        return round(value * 1000, 1) if value is not None else None
+
+    accepted = [s for s in samples if s.status != "rejected" and s.start_latency is not None]
+    starts = [s.start_latency for s in accepted]
+    run_started = [s.started for s in samples if s.started is not None]
+    ttft = [s.first_delta for s in samples if s.first_delta is not None]
+    done = [s.completion for s in samples if s.status == "completed" and s.completion is not None]
+    rss = [r["rssMiB"] for r in result.resources]
+    fds = [r["fds"] for r in result.resources]
+    return {
+        "concurrency": result.concurrency,
+        "runs": len(samples),
+        "completed": len(done),
+        "runsPerSec": round(len(done) / result.elapsed, 2) if result.elapsed else 0.0,
+        "startLatencyP50Ms": ms(starts, 0.5),
+        "startLatencyP99Ms": ms(starts, 0.99),
+        "runStartedP50Ms": ms(run_started, 0.5),
+        "runStartedP99Ms": ms(run_started, 0.99),
+        "ttftP50Ms": ms(ttft, 0.5),
+        "ttftP99Ms": ms(ttft, 0.99),
+        "completionP50Ms": ms(done, 0.5),
+        "completionP99Ms": ms(done, 0.99),
+        "errorRate": round(sum(s.status in ("error", "failed") for s in samples) / total, 4),
+        "rejectedRate": round(sum(s.status == "rejected" for s in samples) / total, 4),
+        "rssStartMiB": round(rss[0], 1) if rss else None,
+        "rssMaxMiB": round(max(rss), 1) if rss else None,
+        "rssGrowthMiB": round(rss[-1] - rss[0], 1) if rss else None,
+        "fdStart": fds[0] if fds else None,
+        "fdMax": max(fds) if fds else None,
+        "fdGrowth": fds[-1] - fds[0] if fds else None,
+    }
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="AgentRelay end-to-end load and soak harness")
+    parser.add_argument("--concurrency", default="1,5,10,20,50", help="Comma-separated concurrency sweep.")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds per sweep level.")
+    parser.add_argument("--soak-minutes", type=float, default=0.0, help="Soak duration after the sweep (0 = skip).")
+    parser.add_argument("--soak-concurrency", type=int, default=20)
+    parser.add_argument("--sample-interval", type=float, default=1.0, help="Seconds between RSS/FD samples.")
+    parser.add_argument("--tokens", type=int, default=300, help="Mock upstream tokens per completion.")
+    parser.add_argument("--tokens-per-sec", type=float, default=60.0, help="Mock upstream streaming rate.")
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument(
+        "--server-max-concurrent",
+        type=int,
+        help="AGENTRELAY_MAX_CONCURRENT_RUNS for the server (default: the largest level).",
+    )
+    parser.add_argument(
+        "--server-env",
+        action="append",
+        default=[],
+        metavar="KEY=VALUE",
+        help="Extra environment for the server, e.g. AGENTRELAY_DELTA_COALESCING=coalesce.",
+    )
+    parser.add_argument("--output", type=Path, help="Write the JSON report here.")
+    parser.add_argument("--compare", type=Path, help="Previous report to compare with.")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Relative change flagged as a regression.")
+    parser.add_argument("--keep-logs", action="store_true", help="Keep the server/mock logs directory.")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+    levels = [int(value) for value in args.concurrency.split(",") if value.strip()]
+    work_dir = Path(tempfile.mkdtemp(prefix="agentrelay-load-"))
+    upstream_port, server_port = free_port(), free_port()
+
+    server_env = {
+        "AGENTRELAY_MAX_CONCURRENT_RUNS": str(args.server_max_concurrent or max(levels + [args.soak_concurrency])),
+        "PYTHONUNBUFFERED": "1",
+    }
+    for item in args.server_env:
+        key, _, value = item.partition("=")
+        server_env[key] = value
+
+    upstream = ManagedProcess(
+        "mock-upstream",
+        [
+            sys.executable, "-m", "benchmarks.mock_upstream",
+            "--port", str(upstream_port),
+            "--tokens", str(args.tokens),
+            "--tokens-per-sec", str(args.tokens_per_sec),
+            "--jitter", str(args.jitter),
+        ],
+        READY_MARKER,
+        work_dir,
+    )
+    server: Optional[ManagedProcess] = None
+    report: dict[str, Any] = {
+        "environment": environment(),
+        "config": {key: str(value) if isinstance(value, Path) else value for key, value in vars(args).items()},
+        "levels": {},
+    }
+    try:
+        upstream.wait_ready()
+        server = ManagedProcess(
+            "agentrelay",
+            [
+                sys.executable, "entrypoint.py",
+                "--port", str(server_port),
+                "--log-level", "WARNING",
+                "--deepseek-base", f"http://127.0.0.1:{upstream_port}/v1",
+                "--data-dir", str(work_dir / "data"),
+            ],
+            SERVER_READY_MARKER,
+            work_dir,
+            env=server_env,
+        )
+        server.wait_ready()
+        base_url = f"http://127.0.0.1:{server_port}"
+        httpx.post(f"{base_url}/settings/deepseek", json={"apiKey": "sk-load-test"}, timeout=10).raise_for_status()
+
+        for level in levels:
+            result = asyncio.run(run_level(base_url, level, args.duration, server.process.pid, args.sample_interval))
+            report["levels"][f"c{level}"] = summarise(result)
+        if args.soak_minutes > 0:
+            result = asyncio.run(
+                run_level(base_url, args.soak_concurrency, args.soak_minutes * 60, server.process.pid, args.sample_interval)
+            )
+            report["soak"] = {**summarise(result), "resources": result.resources}
+        report["serverStatus"] = httpx.get(f"{base_url}/status", timeout=10).json().get("metadata", {})
+    finally:
+        if server is not None:
+            server.stop()
+        upstream.stop()
+
+    cases = dict(report["levels"])
+    if "soak" in report:
+        cases["soak"] = report["soak"]
+    print_table(
+        ({"case": name, **metrics} for name, metrics in cases.items()),
+        ["case", "runs", "runsPerSec", "startLatencyP99Ms", "ttftP50Ms", "ttftP99Ms", "completionP99Ms",
+         "errorRate", "rejectedRate", "rssGrowthMiB", "fdGrowth"],
+    )
+    if args.output:
+        write_report(args.output, report)
+    if args.keep_logs:
+        print(f"\nLogs kept in {work_dir}")
+
+    if args.compare:
+        previous = load_report(args.compare)
+        if previous is None:
+            print(f"\nNo report at {args.compare} to compare with.")
+            return 0
+        previous_cases = dict(previous.get("levels", {}))
+        if "soak" in previous:
+            previous_cases["soak"] = previous["soak"]
+        rows = compare(cases, previous_cases, DIRECTIONS, args.threshold)
+        print(f"\nCompared with {args.compare}:")
+        print_table(rows, ["case", "metric", "baseline", "current", "change", "regression"])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
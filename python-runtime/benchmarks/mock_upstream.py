@@ -0,0 +1,66 @@
+"""Standalone mock DeepSeek server for load testing.
+
+Serves ``POST /v1/chat/completions`` as a streamed chat completion generated by
+``fake_upstream.stream_chunks``, so the runtime can be started with
+``--deepseek-base http://127.0.0.1:<port>/v1`` and exercised end to end::
+
+    python -m benchmarks.mock_upstream --port 18080 --tokens 300 --tokens-per-sec 60
+"""
+
+from __future__ import annotations
+
+import argparse
+from typing import Callable, List, Optional, Sequence
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import StreamingResponse
+from starlette.routing import Route
+
+from .fake_upstream import UpstreamProfile, stream_chunks
+
+READY_MARKER = "MOCK UPSTREAM READY"
+
+
+def create_mock_app(profile: UpstreamProfile, on_startup: Optional[List[Callable]] = None) -> Starlette:
+    async def chat_completions(request: Request) -> StreamingResponse:
+        await request.body()
+        return StreamingResponse(stream_chunks(profile), media_type="text/event-stream")
+
+    return Starlette(
+        routes=[Route("/v1/chat/completions", chat_completions, methods=["POST"])],
+        on_startup=on_startup or [],
+    )
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible streaming upstream")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18080)
+    parser.add_argument("--tokens", type=int, default=300, help="Tokens per completion.")
+    parser.add_argument("--tokens-per-sec", type=float, default=60.0, help="Streaming rate (0 = unpaced).")
+    parser.add_argument("--chunk-tokens", type=int, default=1, help="Tokens per streamed chunk.")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Relative jitter applied to chunk delays.")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    args = parse_args(argv)
+    profile = UpstreamProfile(
+        tokens=args.tokens,
+        tokens_per_sec=args.tokens_per_sec,
+        chunk_tokens=args.chunk_tokens,
+        jitter=args.jitter,
+        seed=None,
+    )
+
+    async def announce_ready() -> None:
+        print(f"{READY_MARKER} {args.port}", flush=True)
+
+    app = create_mock_app(profile, on_startup=[announce_ready])
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning", access_log=False)
+
+
+if __name__ == "__main__":
+    main()
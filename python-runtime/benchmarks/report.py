@@ -0,0 +1,90 @@
+"""Helpers shared by the benchmark and load harness reports."""
+
+from __future__ import annotations
+
+import json
+import platform
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+
+def percentile(values: Sequence[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def environment() -> dict[str, str]:
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
+
+
+def load_report(path: Path) -> Optional[dict[str, Any]]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+
+
+def write_report(path: Path, report: Mapping[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+
+def compare(
+    current: Mapping[str, Mapping[str, Any]],
+    baseline: Mapping[str, Mapping[str, Any]],
+    directions: Mapping[str, str],
+    threshold: float,
+) -> List[dict[str, Any]]:
+    """Compare per-case metrics; ``directions`` maps metric -> "higher"/"lower" is better.
+
+    Returns one row per metric present in both reports, flagging regressions
+    that are worse than the baseline by more than ``threshold`` (a fraction).
+    """
+    rows = []
+    for case, metrics in current.items():
+        reference = baseline.get(case)
+        if not reference:
+            continue
+        for metric, direction in directions.items():
+            now, before = metrics.get(metric), reference.get(metric)
+            if not isinstance(now, (int, float)) or not isinstance(before, (int, float)) or not before:
+                continue
+            change = (now - before) / before
+            worse = -change if direction == "higher" else change
+            rows.append(
+                {
+                    "case": case,
+                    "metric": metric,
+                    "baseline": before,
+                    "current": now,
+                    "change": round(change, 4),
+                    "regression": worse > threshold,
+                }
+            )
+    return rows
+
+
+def print_table(rows: Iterable[Dict[str, Any]], columns: Sequence[str], file: Any = None) -> None:
+    rows = list(rows)
+    out = file or sys.stdout
+    widths = {column: max([len(column)] + [len(_cell(row.get(column))) for row in rows]) for column in columns}
+    print("  ".join(column.ljust(widths[column]) for column in columns), file=out)
+    for row in rows:
+        print("  ".join(_cell(row.get(column)).ljust(widths[column]) for column in columns), file=out)
+
+
+def _cell(value: Any) -> str:
+    if isinstance(value, bool):
+        return "REGRESSION" if value else ""
+    if isinstance(value, float):
+        return f"{value:.4g}"
+    return "" if value is None else str(value)
@@ -3,12 +3,16 @@ from __future__ import annotations
 import argparse
 import asyncio
 import logging
-from typing import Any
+import sys
+from typing import TYPE_CHECKING, Any, Optional
 
-import uvicorn
+from agentrelay.startup import ImportProfiler, StartupProfile, format_report
 
-from agentrelay import create_app
-from agentrelay.config import AgentRelaySettings
+if TYPE_CHECKING:
+    from agentrelay.config import AgentRelaySettings
+
+# Everything beyond the standard library and agentrelay.startup is imported
+# inside main() so --profile-startup can time those imports.
 
 
 def parse_args() -> argparse.Namespace:
@@ -42,10 +46,26 @@ def parse_args() -> argparse.Namespace:
         "--deepseek-model",
         help="Override default DeepSeek model identifier.",
     )
+    parser.add_argument(
+        "--data-dir",
+        help="Directory for settings and caches (defaults to the per-user data directory).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Number of worker processes (default 1). Runs are routed to their owning worker.",
+    )
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="Print per-phase and per-import startup timings to stderr once the warm-up finishes.",
+    )
     return parser.parse_args()
 
 
 def build_settings(args: argparse.Namespace) -> AgentRelaySettings:
+    from agentrelay.config import AgentRelaySettings
+
     overrides: dict[str, Any] = {}
     if args.host:
         overrides["host"] = args.host
@@ -65,11 +85,20 @@ def build_settings(args: argparse.Namespace) -> AgentRelaySettings:
         overrides["deepseek_api_base"] = args.deepseek_base
     if args.deepseek_model:
         overrides["deepseek_model"] = args.deepseek_model
+    if args.data_dir:
+        overrides["data_dir"] = args.data_dir
+    if args.workers:
+        overrides["workers"] = args.workers
     return AgentRelaySettings(**overrides)
 
 
-async def run_uvicorn(settings: AgentRelaySettings) -> None:
-    app = create_app(settings)
+async def run_uvicorn(settings: AgentRelaySettings, profile: StartupProfile) -> None:
+    import uvicorn
+
+    from agentrelay import create_app
+
+    profile.mark("imports")
+    app = create_app(settings, startup_profile=profile)
     config = uvicorn.Config(
         app,
         host=settings.host,
@@ -83,13 +112,33 @@ async def run_uvicorn(settings: AgentRelaySettings) -> None:
 
 
 def main() -> None:
+    profile = StartupProfile()
     args = parse_args()
+    profiler: Optional[ImportProfiler] = None
+    if args.profile_startup:
+        profiler = ImportProfiler()
+        profiler.install()
+
+        def report(completed: StartupProfile) -> None:
+            profiler.uninstall()
+            print(format_report(completed, profiler), file=sys.stderr, flush=True)
+
+        profile.on_complete = report
+
     settings = build_settings(args)
+    profile.mark("settings")
 
     logging.basicConfig(level=settings.log_level)
 
+    if settings.workers > 1:
+        from agentrelay.supervisor import serve_workers
+
+        profile.mark("imports")
+        serve_workers(settings, profile)
+        return
+
     try:
-        asyncio.run(run_uvicorn(settings))
+        asyncio.run(run_uvicorn(settings, profile))
     except KeyboardInterrupt:
         pass
 
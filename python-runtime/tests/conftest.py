@@ -1,6 +1,9 @@
 from pathlib import Path
+import asyncio
+import json
 import sys
 
+import httpx
 import pytest
 
 ROOT = Path(__file__).resolve().parents[1]
@@ -12,11 +15,107 @@ from agentrelay.services.settings_store import SettingsStore
 
 class TempSettingsStore(SettingsStore):
     def __init__(self, base_dir: Path):
-        self._settings_dir = base_dir
-        self._settings_file = base_dir / "settings.json"
-        self._settings_dir.mkdir(parents=True, exist_ok=True)
+        super().__init__(settings_dir=base_dir)
+
+
+@pytest.fixture(autouse=True)
+def reset_sse_exit_event():
+    """sse-starlette keeps one exit event per process, bound to the first loop that streams."""
+    from sse_starlette.sse import AppStatus
+
+    AppStatus.should_exit_event = None
+    yield
+    AppStatus.should_exit_event = None
 
 
 @pytest.fixture
 def temp_store(tmp_path: Path) -> TempSettingsStore:
     return TempSettingsStore(tmp_path)
+
+
+def _chat_chunk(content: str | None = None, finish_reason: str | None = None, delta: dict | None = None) -> dict:
+    if delta is None:
+        delta = {"content": content} if content is not None else {}
+    return {
+        "id": "chatcmpl-test",
+        "object": "chat.completion.chunk",
+        "created": 0,
+        "model": "deepseek-chat",
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+
+
+def _sse(frame: dict | str) -> bytes:
+    data = frame if isinstance(frame, str) else json.dumps(frame)
+    return f"data: {data}\n\n".encode("utf-8")
+
+
+@pytest.fixture
+def chat_stream_transport():
+    """Build an httpx transport that streams the given deltas as a chat completion.
+
+    Each delta is a content string, a raw delta dict (e.g. ``tool_calls``
+    fragments) or an ``asyncio.Event`` the stream waits on before going on.
+    ``responses`` gives ``(deltas, finish_reason)`` per request instead, the
+    last one repeating. The factory records ``requests``, the number of
+    ``frames_sent`` and one ``closed`` entry per finished response body.
+    """
+
+    def factory(
+        deltas: list | None = None,
+        usage: dict | None = None,
+        finish_reason: str = "stop",
+        responses: list | None = None,
+    ) -> httpx.MockTransport:
+        rounds = responses or [(deltas or [], finish_reason)]
+
+        async def body(items: list, finish: str):
+            try:
+                for item in items:
+                    if isinstance(item, asyncio.Event):
+                        await item.wait()
+                        continue
+                    factory.frames_sent += 1
+                    yield _sse(_chat_chunk(delta=item) if isinstance(item, dict) else _chat_chunk(item))
+                yield _sse(_chat_chunk(finish_reason=finish))
+                if usage is not None:
+                    yield _sse({**_chat_chunk(), "choices": [], "usage": usage})
+                yield _sse("[DONE]")
+            finally:
+                factory.closed.append(True)
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            factory.requests.append(request)
+            items, finish = rounds[min(len(factory.requests), len(rounds)) - 1]
+            return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=body(items, finish))
+
+        return httpx.MockTransport(handler)
+
+    factory.requests = []
+    factory.closed = []
+    factory.frames_sent = 0
+    return factory
+
+
+@pytest.fixture
+def collect_events():
+    """Read a run's event stream to the end."""
+
+    async def collect(manager, run_id: str, last_event_id: int | None = None) -> list:
+        return [event async for event in manager.stream_events(run_id, last_event_id)]
+
+    return collect
+
+
+@pytest.fixture
+def wait_for():
+    """Poll ``predicate`` for up to a second."""
+
+    async def wait(predicate) -> None:
+        for _ in range(200):
+            if predicate():
+                return
+            await asyncio.sleep(0.005)
+        raise AssertionError("condition not reached")
+
+    return wait
@@ -0,0 +1,36 @@
+import pytest
+
+from agentrelay.config import AgentRelaySettings
+from agentrelay.services.admission import AdmissionController, TooManyRunsError
+from agentrelay.services.run_manager import RunManager
+
+
+@pytest.mark.asyncio
+async def test_admission_queues_then_rejects():
+    controller = AdmissionController(max_active=1, max_queued=1, default_run_sec=4.0)
+    first = controller.reserve("run-1")
+    second = controller.reserve("run-2")
+
+    assert first.granted.done()
+    assert controller.position(second) == 1
+    with pytest.raises(TooManyRunsError) as excinfo:
+        controller.reserve("run-3")
+    assert excinfo.value.retry_after_sec == 8
+
+    controller.release(first)
+    assert second.granted.done()
+    assert controller.stats()["activeRuns"] == 1
+    assert controller.stats()["queuedRuns"] == 0
+
+
+@pytest.mark.asyncio
+async def test_run_manager_reports_queue_position(temp_store):
+    manager = RunManager(AgentRelaySettings(max_concurrent_runs=1), temp_store)
+
+    await manager.create_run("run-a", {"runId": "run-a"})
+    await manager.create_run("run-b", {"runId": "run-b"})
+
+    events = [event async for event in manager.stream_events("run-b")]
+    names = [event["event"] for event in events]
+    assert names == ["run.started", "run.queued", "run.failed"]
+    assert '"position": 1' in events[1]["data"]
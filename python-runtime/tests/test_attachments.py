@@ -0,0 +1,97 @@
+import base64
+import hashlib
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from agentrelay.app import create_app
+from agentrelay.config import AgentRelaySettings
+from agentrelay.services.attachment_store import AttachmentStore, AttachmentTooLargeError
+from agentrelay.services.client_pool import UpstreamClientPool
+from agentrelay.services.run_manager import RunManager
+
+PNG = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 4
+
+
+async def chunks(data, size=100):
+    for start in range(0, len(data), size):
+        yield data[start : start + size]
+
+
+@pytest.mark.asyncio
+async def test_uploads_are_deduplicated_by_content(tmp_path):
+    store = AttachmentStore(tmp_path, max_bytes=10_000, max_attachment_bytes=5_000)
+
+    first, existed = await store.put(chunks(PNG), "image/png")
+    again, existed_again = await store.put(chunks(PNG, size=7), "image/png")
+
+    assert first.attachment_id == hashlib.sha256(PNG).hexdigest()
+    assert (existed, existed_again) == (False, True)
+    assert again.path == first.path and first.content_type == "image/png"
+    assert await store.data_url(first.attachment_id) == "data:image/png;base64," + base64.b64encode(PNG).decode()
+    reopened = AttachmentStore(tmp_path, max_bytes=10_000, max_attachment_bytes=5_000)
+    assert reopened.get(first.attachment_id).size == len(PNG)
+
+    with pytest.raises(AttachmentTooLargeError):
+        await store.put(chunks(b"x" * 6_000))
+    assert store.stats()["attachments"] == 1
+    assert not list(tmp_path.glob("*.upload"))
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_unpinned_attachments_are_evicted(tmp_path):
+    store = AttachmentStore(tmp_path, max_bytes=250, max_attachment_bytes=1_000)
+    pinned, _ = await store.put(chunks(b"a" * 100))
+    store.pin(pinned.attachment_id)
+    old, _ = await store.put(chunks(b"b" * 100))
+    await store.put(chunks(b"c" * 100))
+
+    assert store.get(pinned.attachment_id) is not None
+    assert store.get(old.attachment_id) is None and not old.path.exists()
+
+    store.unpin(pinned.attachment_id)
+    await store.put(chunks(b"d" * 100))
+    assert store.stats()["evicted"] == 2 and store.stats()["bytes"] == 200
+
+
+@pytest.mark.asyncio
+async def test_runs_send_referenced_images_upstream(temp_store, chat_stream_transport):
+    temp_store.set_deepseek_settings("sk-test", "https://mock-upstream/v1")
+    settings = AgentRelaySettings()
+    transport = chat_stream_transport(["A cat."])
+    manager = RunManager(settings, temp_store, UpstreamClientPool(settings, transport=transport))
+    attachment, _ = await manager.attachments.put(chunks(PNG), "image/png")
+
+    payload = {"imageReference": attachment.attachment_id, "conversation": [{"role": "user", "content": "Describe"}]}
+    await manager.create_run("run-1", payload)
+    events = [event async for event in manager.stream_events("run-1")]
+
+    assert events[-1]["event"] == "run.completed"
+    message = json.loads(chat_stream_transport.requests[0].content)["messages"][-1]
+    assert message["content"][0] == {"type": "text", "text": "Describe"}
+    assert message["content"][1]["image_url"]["url"].startswith("data:image/png;base64,iVBORw0KGgo")
+    assert manager.attachments.stats()["pinned"] == 0
+    await manager.aclose()
+
+
+def test_attachment_api(temp_store):
+    settings = AgentRelaySettings(attachment_max_bytes=2_000)
+    app = create_app(settings)
+    app.state.settings_store = temp_store
+    app.state.run_manager = RunManager(settings, temp_store)
+    app.state.settings_config = settings
+    with TestClient(app) as client:
+        created = client.post("/attachments", content=PNG, headers={"Content-Type": "image/png"})
+        assert created.status_code == 201
+        attachment_id = created.json()["attachmentId"]
+        assert created.headers["location"] == f"/attachments/{attachment_id}"
+        repeated = client.post("/attachments", content=PNG, headers={"Content-Type": "image/png"})
+        assert repeated.status_code == 200 and repeated.json()["deduplicated"] is True
+        assert client.get(f"/attachments/{attachment_id}").json()["size"] == len(PNG)
+        assert client.post("/attachments", content=b"x" * 3_000).status_code == 413
+
+        assert client.post("/runs", json={"imageReference": attachment_id}).status_code == 202
+        missing = client.post("/runs", json={"imageReference": "0" * 64})
+        assert missing.status_code == 422
+        assert missing.json()["detail"]["errorCode"] == "ATTACHMENT_NOT_FOUND"
@@ -0,0 +1,51 @@
+from benchmarks.event_pipeline import DIRECTIONS, Scenario, run_scenario
+from benchmarks.fake_upstream import UpstreamProfile
+from benchmarks.report import compare
+
+
+def test_event_pipeline_scenario_reports_metrics():
+    result = run_scenario(Scenario("smoke", subscribers=2, profile=UpstreamProfile(tokens=20)), repeat=1)
+
+    # run.started + one delta per token + run.completed, for each subscriber
+    assert result["events"] == 2 * 22
+    assert result["eventsPerSec"] > 0
+    assert result["interEventP99Us"] >= result["interEventP50Us"]
+
+
+def test_compare_flags_regressions_by_direction():
+    rows = compare(
+        {"case": {"eventsPerSec": 50.0, "cpuUsPerEvent": 10.0}},
+        {"case": {"eventsPerSec": 100.0, "cpuUsPerEvent": 10.0}},
+        DIRECTIONS,
+        threshold=0.25,
+    )
+    flagged = {row["metric"]: row["regression"] for row in rows}
+    assert flagged == {"eventsPerSec": True, "cpuUsPerEvent": False}
+
+
+def test_load_harness_summarises_samples():
+    import os
+
+    from benchmarks.load_harness import LevelResult, RunSample, process_resources, summarise
+
+    result = LevelResult(
+        concurrency=2,
+        samples=[
+            RunSample("completed", start_latency=0.01, started=0.02, first_delta=0.1, completion=0.5),
+            RunSample("completed", start_latency=0.03, started=0.04, first_delta=0.2, completion=0.7),
+            RunSample("rejected", start_latency=0.001),
+            RunSample("error"),
+        ],
+        resources=[{"t": 0, "rssMiB": 50.0, "fds": 10}, {"t": 1, "rssMiB": 52.5, "fds": 12}],
+        elapsed=2.0,
+    )
+    summary = summarise(result)
+
+    assert summary["completed"] == 2
+    assert summary["runsPerSec"] == 1.0
+    assert summary["rejectedRate"] == 0.25
+    assert summary["errorRate"] == 0.25
+    assert summary["rssGrowthMiB"] == 2.5
+    assert summary["fdGrowth"] == 2
+    if os.path.isdir("/proc/self"):
+        assert process_resources(os.getpid())["fds"] > 0
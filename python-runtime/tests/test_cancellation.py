@@ -0,0 +1,68 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from agentrelay.config import AgentRelaySettings
+from agentrelay.services.client_pool import UpstreamClientPool
+from agentrelay.services.run_manager import RunManager
+
+
+def _stalled_transport(requests: list, closed: list) -> httpx.MockTransport:
+    async def body():
+        try:
+            await asyncio.Event().wait()  # the first token never arrives
+            yield b""
+        finally:
+            closed.append(True)
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=body())
+
+    return httpx.MockTransport(handler)
+
+
+@pytest.mark.asyncio
+async def test_cancel_does_not_wait_for_a_stalled_upstream(temp_store, wait_for):
+    temp_store.set_deepseek_settings("sk-test", "https://mock-upstream/v1")
+    settings = AgentRelaySettings(max_concurrent_runs=1)
+    requests, closed = [], []
+    pool = UpstreamClientPool(settings, transport=_stalled_transport(requests, closed))
+    manager = RunManager(settings, temp_store, pool)
+
+    await manager.create_run("run-1", {"conversation": [{"role": "user", "content": "Hi"}]})
+    await manager.create_run("run-2", {"conversation": [{"role": "user", "content": "Other"}]})
+    await wait_for(lambda: requests)
+
+    began = time.perf_counter()
+    await manager.cancel_run("run-1")
+    assert manager.admission.stats()["queuedRuns"] == 0
+    events = [event async for event in manager.stream_events("run-1")]
+
+    assert events[-1]["event"] == "run.cancelled"
+    assert time.perf_counter() - began < 0.5
+    await wait_for(lambda: closed)
+    # The freed slot lets the queued run reach the upstream.
+    await wait_for(lambda: len(requests) == 2)
+    assert manager.metrics.cancel_latency.count == 1
+    await manager.aclose()
+
+
+@pytest.mark.asyncio
+async def test_cancel_deadline_aborts_an_unresponsive_run(temp_store, collect_events):
+    settings = AgentRelaySettings(cancel_deadline_sec=0.05)
+    manager = RunManager(settings, temp_store)
+
+    async def ignore_cancellation(ctx, payload):
+        await asyncio.sleep(30)
+
+    manager._stream_completion = ignore_cancellation  # type: ignore[method-assign]
+    await manager.create_run("run-1", {})
+    await asyncio.sleep(0)
+    await manager.cancel_run("run-1")
+
+    events = await asyncio.wait_for(collect_events(manager, "run-1"), timeout=1)
+    assert [event["event"] for event in events] == ["run.started", "run.cancelled"]
+    await manager.aclose()
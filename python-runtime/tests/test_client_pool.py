@@ -0,0 +1,44 @@
+import pytest
+
+from agentrelay.config import AgentRelaySettings
+from agentrelay.services.client_pool import UpstreamClientPool
+from agentrelay.services.run_manager import RunManager
+
+
+@pytest.mark.asyncio
+async def test_pool_reuses_client_per_credentials():
+    pool = UpstreamClientPool(AgentRelaySettings())
+
+    async with pool.lease("sk-a", "https://one") as first:
+        pass
+    async with pool.lease("sk-a", "https://one") as second:
+        pass
+    async with pool.lease("sk-b", "https://one") as third:
+        pass
+
+    assert first is second
+    assert third is not first
+    assert pool.stats()["created"] == 2
+
+    pool.invalidate()
+    assert pool.stats()["clients"] == 0
+    await pool.aclose()
+    assert first.is_closed()
+
+
+@pytest.mark.asyncio
+async def test_runs_share_pooled_client(temp_store, chat_stream_transport, collect_events):
+    temp_store.set_deepseek_settings("sk-test", "https://mock-upstream/v1")
+    settings = AgentRelaySettings()
+    transport = chat_stream_transport(["Hel", "lo"])
+    manager = RunManager(settings, temp_store, UpstreamClientPool(settings, transport=transport))
+
+    for run_id in ("run-1", "run-2"):
+        await manager.create_run(run_id, {"runId": run_id, "conversation": [{"role": "user", "content": "Hi"}]})
+        events = await collect_events(manager, run_id)
+        assert events[-1]["event"] == "run.completed"
+        assert '"Hello"' in events[-1]["data"]
+
+    assert manager.client_pool.stats()["created"] == 1
+    assert len(chat_stream_transport.requests) == 2
+    await manager.aclose()
@@ -0,0 +1,85 @@
+import json
+import time
+
+import pytest
+
+from agentrelay.config import AgentRelaySettings
+from agentrelay.services.client_pool import UpstreamClientPool
+from agentrelay.services.completion_cache import CompletionCache, completion_cache_key
+from agentrelay.services.run_manager import RunManager
+
+
+def test_cache_key_is_canonical():
+    messages = [{"role": "user", "content": "Hi"}]
+    assert completion_cache_key(messages, "m", {"temperature": 0}) == completion_cache_key(
+        [{"content": "Hi", "role": "user"}], "m", {"temperature": 0}
+    )
+    assert completion_cache_key(messages, "m", {"temperature": 0}) != completion_cache_key(
+        messages, "m", {"temperature": 0.5}
+    )
+
+
+@pytest.mark.asyncio
+async def test_disk_tier_survives_restart_and_honours_ttl(tmp_path):
+    cache = CompletionCache(1024, ttl_sec=60, disk_dir=tmp_path, disk_max_bytes=1 << 20)
+    await cache.put("ab" * 32, ["Hel", "lo"])
+    assert (await cache.get("ab" * 32)).chunks == ["Hel", "lo"]
+
+    reopened = CompletionCache(1024, ttl_sec=60, disk_dir=tmp_path, disk_max_bytes=1 << 20)
+    entry = await reopened.get("ab" * 32)
+    assert entry is not None and entry.text == "Hello"
+    assert reopened.stats()["diskHits"] == 1
+
+    path = tmp_path / "ab" / f"{'ab' * 32}.json"
+    raw = json.loads(path.read_text(encoding="utf-8"))
+    raw["createdAt"] = time.time() - 120
+    path.write_text(json.dumps(raw), encoding="utf-8")
+    expired = CompletionCache(1024, ttl_sec=60, disk_dir=tmp_path, disk_max_bytes=1 << 20)
+    assert await expired.get("ab" * 32) is None
+    assert not path.exists()
+
+
+@pytest.mark.asyncio
+async def test_memory_tier_evicts_least_recently_used():
+    cache = CompletionCache(250, ttl_sec=60)
+    await cache.put("a", ["x" * 40])
+    await cache.put("b", ["y" * 40])
+    await cache.get("a")
+    await cache.put("c", ["z" * 40])
+    assert await cache.get("a") is not None
+    assert await cache.get("b") is None
+
+
+@pytest.mark.asyncio
+async def test_identical_run_is_served_from_cache(temp_store, chat_stream_transport):
+    temp_store.set_deepseek_settings("sk-test", "https://mock-upstream/v1")
+    settings = AgentRelaySettings(completion_cache_enabled=True)
+    pool = UpstreamClientPool(settings, transport=chat_stream_transport(["Hel", "lo"]))
+    manager = RunManager(settings, temp_store, pool)
+    payload = {"prompt": "Describe", "conversation": [{"role": "user", "content": "Hi"}], "constraints": {"temperature": 0}}
+
+    results = []
+    for run_id in ("run-1", "run-2"):
+        await manager.create_run(run_id, payload)
+        results.append([event async for event in manager.stream_events(run_id)])
+
+    assert len(chat_stream_transport.requests) == 1
+    first, second = results
+    assert [e["data"] for e in first if e["event"] == "run.delta"] != []
+    assert [json.loads(e["data"])["text"] for e in second if e["event"] == "run.delta"] == ["Hel", "lo"]
+    assert json.loads(first[-1]["data"])["metadata"]["cached"] is False
+    completed = json.loads(second[-1]["data"])
+    assert completed["response"] == "Hello"
+    assert completed["metadata"]["cached"] is True
+
+    await manager.create_run("run-3", dict(payload, constraints={"temperature": 0, "cache": False}))
+    [event async for event in manager.stream_events("run-3")]
+    assert len(chat_stream_transport.requests) == 2
+
+    # Answers cached for one upstream are not served once another is configured.
+    temp_store.set_deepseek_settings(None, "https://other-upstream/v1")
+    await manager.create_run("run-4", payload)
+    completed = [event async for event in manager.stream_events("run-4")][-1]
+    assert json.loads(completed["data"])["metadata"]["cached"] is False
+    assert chat_stream_transport.requests[-1].url.host == "other-upstream"
+    await manager.aclose()
@@ -0,0 +1,42 @@
+import asyncio
+
+import pytest
+
+from agentrelay.config import AgentRelaySettings
+from agentrelay.services.client_pool import UpstreamClientPool
+from agentrelay.services.delta_coalescer import CoalescingPolicy, DeltaCoalescer
+from agentrelay.services.run_manager import RunManager
+
+
+@pytest.mark.asyncio
+async def test_coalescer_flushes_on_first_token_sentence_size_and_timer():
+    emitted = []
+    policy = CoalescingPolicy(mode="coalesce", flush_interval_ms=10, flush_bytes=8)
+    coalescer = DeltaCoalescer(policy, emitted.append)
+
+    coalescer.push("Hi")
+    coalescer.push(" there")
+    coalescer.push(".")
+    coalescer.push("abcd")
+    coalescer.push("efgh")
+    coalescer.push("tail")
+    assert emitted == ["Hi", " there.", "abcdefgh"]
+
+    await asyncio.sleep(0.03)
+    assert emitted[-1] == "tail"
+
+
+@pytest.mark.asyncio
+async def test_run_constraints_enable_coalescing(temp_store, chat_stream_transport):
+    temp_store.set_deepseek_settings("sk-test", "https://mock-upstream/v1")
+    settings = AgentRelaySettings()
+    pool = UpstreamClientPool(settings, transport=chat_stream_transport(["One", " two", " three", " four."]))
+    manager = RunManager(settings, temp_store, pool)
+
+    payload = {"runId": "run-c", "constraints": {"deltaCoalescing": {"mode": "coalesce", "flushIntervalMs": 500}}}
+    await manager.create_run("run-c", payload)
+    events = [event async for event in manager.stream_events("run-c")]
+
+    deltas = [event["data"] for event in events if event["event"] == "run.delta"]
+    assert deltas == ['{"runId": "run-c", "text": "One"}', '{"runId": "run-c", "text": " two three four."}']
+    await manager.aclose()
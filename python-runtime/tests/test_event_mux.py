@@ -0,0 +1,160 @@
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from agentrelay.app import create_app
+from agentrelay.config import AgentRelaySettings
+from agentrelay.services.event_mux import EventMux, parse_cursor, parse_sse
+from agentrelay.services.events import RelayedEvent
+from agentrelay.services.run_manager import RunManager
+
+
+def fake_source(logs, gates=None):
+    """Runs whose events are ``logs[run_id]``; a run with a gate waits on it before ending."""
+
+    def source(run_id, last_event_id):
+        async def events():
+            for event_id, text in enumerate(logs[run_id], start=1):
+                if last_event_id is None or event_id > last_event_id:
+                    yield RelayedEvent(event_id, "run.delta", text)
+                    await asyncio.sleep(0)
+            if gates and run_id in gates:
+                await gates[run_id].wait()
+
+        return events()
+
+    return source
+
+
+async def collect(mux, limit=None):
+    received = []
+    async for run_id, event in mux.events():
+        received.append((run_id, event.data, mux.cursor))
+        if limit is not None and len(received) == limit:
+            break
+    return received
+
+
+def test_cursor_round_trips_run_ids_with_separators():
+    mux = EventMux(fake_source({}))
+    mux.add("a,b:c", 3)
+    mux.add("plain")
+
+    assert mux.cursor == "a%2Cb%3Ac:3,plain:0"
+    assert parse_cursor(mux.cursor) == {"a,b:c": 3, "plain": 0}
+    with pytest.raises(ValueError):
+        parse_cursor("missing-event-id")
+
+
+@pytest.mark.asyncio
+async def test_events_interleave_and_end_with_the_last_run():
+    mux = EventMux(fake_source({"a": ["a1", "a2"], "b": ["b1", "b2", "b3"]}))
+    mux.add("a")
+    mux.add("b")
+
+    received = await collect(mux)
+
+    assert [data for _, data, _ in received if data.startswith("a")] == ["a1", "a2"]
+    assert [data for _, data, _ in received if data.startswith("b")] == ["b1", "b2", "b3"]
+    assert received[1][0] != received[0][0]
+    assert received[-1][2] == "a:2,b:3"
+    assert (mux.run_cursor("a"), mux.run_cursor("b")) == ("a:2", "b:3")
+    assert mux.runs == []
+
+
+@pytest.mark.asyncio
+async def test_runs_can_be_added_removed_and_resumed():
+    gates = {"a": asyncio.Event(), "b": asyncio.Event()}
+    mux = EventMux(fake_source({"a": ["a1"], "b": ["b1", "b2"], "late": ["late-1"]}, gates), persistent=True)
+    mux.add("a")
+    task = asyncio.create_task(collect(mux, limit=3))
+    await asyncio.sleep(0.01)
+
+    mux.add("b", last_event_id=1)
+    await asyncio.sleep(0.01)
+    assert mux.remove("a")
+    mux.add("late", ephemeral=True)
+    received = await asyncio.wait_for(task, 1)
+
+    assert [data for _, data, _ in received] == ["a1", "b2", "late-1"]
+    assert parse_cursor(received[-1][2]) == {"b": 2, "late": 1}
+
+
+@pytest.mark.asyncio
+async def test_finished_ephemeral_runs_leave_the_cursor():
+    mux = EventMux(fake_source({"kept": ["k1"], "client": ["c1"]}))
+    mux.add("kept")
+    mux.add("client", ephemeral=True)
+
+    await collect(mux)
+
+    assert mux.cursor == "kept:1"
+    assert not mux.add("client", ephemeral=True)
+
+
+@pytest.mark.asyncio
+async def test_parse_sse_reads_relayed_frames():
+    async def lines():
+        for line in ["id: 4", "event: run.delta", 'data: {"delta": "x"}', "", ": ping", "", "event: run.completed", "data: {}", ""]:
+            yield line
+
+    events = [event async for event in parse_sse(lines())]
+
+    assert [(event.id, event.event, event.data) for event in events] == [
+        (4, "run.delta", '{"delta": "x"}'),
+        (None, "run.completed", "{}"),
+    ]
+    assert events[0].encode_as("run:4") == b'id: run:4\r\nevent: run.delta\r\ndata: {"delta": "x"}\r\n\r\n'
+
+
+def build_app(store):
+    settings = AgentRelaySettings()
+    app = create_app(settings)
+    app.state.settings_store = store
+    app.state.run_manager = RunManager(settings, store)
+    app.state.settings_config = settings
+    return app
+
+
+def wait_finished(client, run_id):
+    for _ in range(100):
+        if client.get(f"/runs/{run_id}").json()["status"] == "failed":
+            return
+        time.sleep(0.02)
+    pytest.fail(f"{run_id} did not finish")
+
+
+def test_events_endpoint_ids_name_only_the_delivering_run(temp_store):
+    with TestClient(build_app(temp_store)) as client:
+        for run_id in ("run-a", "run-b"):
+            assert client.post("/runs", json={"runId": run_id}).status_code == 202
+            wait_finished(client, run_id)
+
+        response = client.get("/events?runs=run-a,run-b")
+
+        assert response.status_code == 200
+        frames = [frame for frame in response.text.split("\r\n\r\n") if frame.strip()]
+        assert frames[0].startswith("id: run-a:0,run-b:0\r\nevent: stream.opened\r\n")
+        assert '"runs": ["run-a", "run-b"]' in frames[0]
+        assert sum("event: run.failed" in frame for frame in frames) == 2
+        # The client rebuilds the composite cursor from the per-run frame ids.
+        cursor = {}
+        for frame in frames[1:]:
+            frame_cursor = parse_cursor(frame.split("\r\n")[0].removeprefix("id: "))
+            assert len(frame_cursor) == 1
+            cursor.update(frame_cursor)
+        assert cursor.keys() == {"run-a", "run-b"}
+
+        composite = ",".join(f"{run_id}:{event_id}" for run_id, event_id in cursor.items())
+        resumed = client.get("/events?runs=run-a,run-b", headers={"Last-Event-ID": composite})
+        assert "event: run." not in resumed.text
+        # A single run's id resumes that run; the others replay from the start.
+        resumed = client.get("/events?runs=run-a,run-b", headers={"Last-Event-ID": f"run-a:{cursor['run-a']}"})
+        assert resumed.text.count("event: run.failed") == 1
+
+        assert client.get("/events?runs=run-missing").status_code == 404
+        assert client.get("/events?runs=run-a", headers={"Last-Event-ID": "bogus"}).status_code == 400
+        assert client.get("/events").status_code == 400
+        assert client.post("/events/unknown", json={"add": ["run-a"]}).status_code == 404
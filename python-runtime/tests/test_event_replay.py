@@ -0,0 +1,168 @@
+import asyncio
+
+import pytest
+
+from agentrelay.config import AgentRelaySettings
+from agentrelay.services.client_pool import UpstreamClientPool
+from agentrelay.services.event_log import BufferBudget, RunEventLog
+from agentrelay.services.events import RunDelta
+from agentrelay.services.run_manager import RunManager
+
+
+@pytest.mark.asyncio
+async def test_event_log_keeps_undelivered_events_and_a_replay_window():
+    log = RunEventLog(capacity=3)
+    for index in range(5):
+        log.append(RunDelta("run", str(index)))
+    assert len(log) == 5
+
+    stream = log.follow()
+    assert [(await anext(stream)).id for _ in range(5)] == [1, 2, 3, 4, 5]
+    assert [event.id for event in log.since(None)] == [3, 4, 5]
+    assert [event.id for event in log.since(4)] == [5]
+    assert [event.id for event in log.since(1)] == [3, 4, 5]
+    assert log.since(5) == []
+
+
+@pytest.mark.asyncio
+async def test_finished_run_can_be_resumed_with_last_event_id(temp_store, chat_stream_transport):
+    temp_store.set_deepseek_settings("sk-test", "https://mock-upstream/v1")
+    settings = AgentRelaySettings()
+    pool = UpstreamClientPool(settings, transport=chat_stream_transport(["a", "b", "c"]))
+    manager = RunManager(settings, temp_store, pool)
+
+    await manager.create_run("run-replay", {"runId": "run-replay"})
+    first = [event async for event in manager.stream_events("run-replay")]
+    assert [event["id"] for event in first] == [1, 2, 3, 4, 5]
+
+    resumed = [event async for event in manager.stream_events("run-replay", last_event_id=3)]
+    assert [event["event"] for event in resumed] == ["run.delta", "run.completed"]
+    assert resumed[0]["id"] == 4
+
+    with pytest.raises(ValueError):
+        await manager.create_run("run-replay", {"runId": "run-replay"})
+    await manager.aclose()
+
+
+@pytest.mark.asyncio
+async def test_event_log_fans_out_to_every_subscriber():
+    log = RunEventLog(capacity=100)
+
+    async def collect():
+        return [event.text async for event in log.follow()]
+
+    early = [asyncio.create_task(collect()) for _ in range(2)]
+    await asyncio.sleep(0)
+    for index in range(3):
+        log.append(RunDelta("run", str(index)))
+        await asyncio.sleep(0)
+    late = asyncio.create_task(collect())
+    await asyncio.sleep(0)
+    assert log.subscribers == 3
+    log.append(RunDelta("run", "3"))
+    log.close()
+
+    results = await asyncio.gather(*early, late)
+    assert results == [["0", "1", "2", "3"]] * 3
+    assert log.subscribers == 0
+
+
+@pytest.mark.asyncio
+async def test_drop_policy_disconnects_lagging_subscriber():
+    budget = BufferBudget(limit_bytes=10_000)
+    log = RunEventLog(capacity=100, run_id="run", max_bytes=400, policy="drop", budget=budget)
+    stream = log.follow()
+    log.append(RunDelta("run", "first"))
+    assert (await anext(stream)).text == "first"
+
+    for index in range(20):
+        log.append(RunDelta("run", f"chunk-{index}"))
+    assert log.buffered_bytes <= 400
+    assert budget.used_bytes == log.buffered_bytes
+
+    failure = await anext(stream)
+    assert failure.event == "run.failed"
+    assert failure.error_code == "SLOW_CONSUMER"
+    assert budget.dropped_subscribers == 1
+
+
+@pytest.mark.asyncio
+async def test_coalesce_policy_merges_undelivered_deltas():
+    log = RunEventLog(capacity=100, run_id="run", max_bytes=600, policy="coalesce")
+    for index in range(20):
+        log.append(RunDelta("run", str(index % 10)))
+    assert len(log) < 20
+
+    stream = log.follow()
+    first = await anext(stream)
+    log.close()
+    texts = first.text + "".join([event.text async for event in stream])
+    assert texts.endswith("0123456789")
+
+
+@pytest.mark.asyncio
+async def test_coalesce_never_repeats_text_to_a_stalled_subscriber():
+    log = RunEventLog(capacity=100, run_id="run", max_bytes=600, policy="coalesce")
+    for index in range(4):
+        log.append(RunDelta("run", f"<{index}>"))
+    stream = log.follow()
+    received = [(await anext(stream)).text]
+
+    # Appended while the subscriber is stalled on its first event.
+    for index in range(4, 40):
+        log.append(RunDelta("run", f"<{index}>"))
+    log.close()
+    received.extend([event.text async for event in stream])
+
+    assert "".join(received) == "".join(f"<{index}>" for index in range(40))
+
+
+@pytest.mark.asyncio
+async def test_block_policy_waits_for_subscriber():
+    log = RunEventLog(capacity=1, run_id="run", max_bytes=200, policy="block")
+    log.append(RunDelta("run", "0"))
+    stream = log.follow()
+    await anext(stream)
+    for index in range(1, 6):
+        log.append(RunDelta("run", str(index)))
+
+    waiter = asyncio.create_task(log.wait_for_capacity(timeout=5))
+    await asyncio.sleep(0)
+    assert not waiter.done()
+
+    for _ in range(5):
+        await anext(stream)
+    assert await waiter is True
+    assert len(log) == 1
+
+
+@pytest.mark.asyncio
+async def test_block_policy_times_out_once_then_drops():
+    log = RunEventLog(capacity=1, run_id="run", max_bytes=1024, policy="block")
+    log.append(RunDelta("run", "first"))
+    stream = log.follow()
+    await anext(stream)  # subscribed, then stalled
+
+    loop = asyncio.get_running_loop()
+    waits = []
+    for index in range(40):
+        log.append(RunDelta("run", f"delta {index} " * 4))
+        started = loop.time()
+        await log.wait_for_capacity(timeout=0.2)
+        waits.append(loop.time() - started)
+
+    timed_out = [wait for wait in waits if wait >= 0.2]
+    assert len(timed_out) == 1
+    assert sum(waits) < 0.4
+    assert log.policy == "drop"
+    assert (await anext(stream)).error_code == "SLOW_CONSUMER"
+
+
+@pytest.mark.asyncio
+async def test_block_policy_does_not_wait_without_subscribers():
+    log = RunEventLog(capacity=1, run_id="run", max_bytes=1024, policy="block")
+    for index in range(40):
+        log.append(RunDelta("run", f"delta {index} " * 4))
+        assert await asyncio.wait_for(log.wait_for_capacity(timeout=5), 0.1) in (True, False)
+
+    assert log.buffered_bytes <= 1024
@@ -0,0 +1,41 @@
+import json
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from sse_starlette.sse import ServerSentEvent
+
+from agentrelay.services.events import (
+    RunCancelled,
+    RunCompleted,
+    RunDelta,
+    RunFailed,
+    RunQueued,
+    RunStarted,
+)
+
+SAMPLES = [
+    RunStarted("run-1"),
+    RunQueued("run-1", 3),
+    RunDelta("run-1", 'He said "hi"\nthen 你好 \\   done'),
+    RunDelta("run-1", ""),
+    RunCompleted("run-1", "final", {"queueTimeMs": 1.5, "nested": {"ok": True, "items": [1, None]}}),
+    RunCompleted("run-1", "final"),
+    RunFailed("run-1", "MODEL_ERROR", "boom\r\nline two"),
+    RunFailed("run-1", "SLOW_CONSUMER", "dropped", {"bufferedBytes": 10}),
+    RunCancelled("run-1"),
+]
+
+
+@pytest.mark.parametrize("event", SAMPLES, ids=lambda event: event.event)
+@pytest.mark.parametrize("event_id", [None, 42])
+def test_encoded_frames_match_sse_starlette(event, event_id):
+    event.id = event_id
+    event._data = event._frame = None
+    reference = ServerSentEvent(
+        id=event_id,
+        event=event.event,
+        data=json.dumps(jsonable_encoder(event.payload())),
+    ).encode()
+
+    assert event.data == json.dumps(jsonable_encoder(event.payload()))
+    assert event.encode() == reference
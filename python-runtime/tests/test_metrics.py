@@ -0,0 +1,62 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from agentrelay.app import create_app
+from agentrelay.config import AgentRelaySettings
+from agentrelay.services.client_pool import UpstreamClientPool
+from agentrelay.services.metrics import Histogram
+from agentrelay.services.run_manager import RunManager
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("demo_seconds", "Demo.", (0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        histogram.observe(value)
+
+    lines = list(histogram.render())
+    assert 'demo_seconds_bucket{le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{le="1"} 3' in lines
+    assert 'demo_seconds_bucket{le="+Inf"} 4' in lines
+    assert "demo_seconds_count 4" in lines
+    assert 0.1 < histogram.quantile(0.5) <= 1.0
+
+
+@pytest.mark.asyncio
+async def test_completed_run_reports_timings(temp_store, chat_stream_transport):
+    temp_store.set_deepseek_settings("sk-test", "https://mock-upstream/v1")
+    settings = AgentRelaySettings()
+    pool = UpstreamClientPool(settings, transport=chat_stream_transport(["Hel", "lo", "!"]))
+    manager = RunManager(settings, temp_store, pool)
+
+    await manager.create_run("run-1", {"conversation": [{"role": "user", "content": "Hi"}]})
+    events = [event async for event in manager.stream_events("run-1")]
+
+    metadata = json.loads(events[-1]["data"])["metadata"]
+    for key in ("queueTimeMs", "settingsLoadMs", "clientAcquireMs", "upstreamOpenMs", "timeToFirstTokenMs", "durationMs"):
+        assert metadata[key] >= 0
+
+    exposition = manager.render_metrics()
+    assert 'agentrelay_runs_finished_total{status="completed"} 1' in exposition
+    assert "agentrelay_run_time_to_first_token_seconds_count 1" in exposition
+    assert "agentrelay_active_runs 0" in exposition
+    assert manager.metrics.summary()["durationMs"]["count"] == 1
+    await manager.aclose()
+
+
+def test_metrics_endpoint_and_status_summary(temp_store):
+    settings = AgentRelaySettings()
+    app = create_app(settings)
+    app.state.settings_store = temp_store
+    app.state.run_manager = RunManager(settings, temp_store)
+    client = TestClient(app)
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE agentrelay_run_duration_seconds histogram" in response.text
+
+    summary = client.get("/status").json()["metadata"]["metrics"]
+    assert summary["runsStarted"] == 0
+    assert summary["timeToFirstTokenMs"]["p95"] is None
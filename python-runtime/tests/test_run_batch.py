@@ -0,0 +1,68 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from agentrelay.app import create_app
+from agentrelay.config import AgentRelaySettings
+from agentrelay.services.admission import AdmissionController
+from agentrelay.services.run_manager import RunManager
+
+
+def build_app(store, **overrides):
+    settings = AgentRelaySettings(max_concurrent_runs=1, max_queued_runs=2, **overrides)
+    app = create_app(settings)
+    app.state.settings_store = store
+    app.state.run_manager = RunManager(settings, store)
+    app.state.settings_config = settings
+    return app
+
+
+@pytest.mark.asyncio
+async def test_batched_tickets_take_turns_with_other_runs():
+    controller = AdmissionController(max_active=1, max_queued=10)
+    running = controller.reserve("run-0")
+    batch = [controller.reserve(f"batch-{n}", group="host") for n in range(3)]
+    single = controller.reserve("single")
+
+    assert [controller.position(ticket) for ticket in (*batch, single)] == [1, 3, 4, 2]
+    assert controller.available() == 6
+
+    controller.release(running)
+    assert batch[0].granted.done()
+    controller.release(batch[0])
+    assert single.granted.done() and not batch[1].granted.done()
+
+
+def test_partial_batch_reports_each_run(temp_store):
+    client = TestClient(build_app(temp_store))
+    body = [{"runId": f"run-{n}"} for n in range(4)] + [{"runId": "run-0"}]
+
+    response = client.post("/runs:batch", json=body)
+
+    assert response.status_code == 207
+    payload = response.json()
+    assert payload["accepted"] == 3
+    assert [run["status"] for run in payload["runs"]] == [202, 202, 202, 429, 409]
+    assert payload["runs"][0]["eventsUrl"] == "/runs/run-0/events"
+    assert payload["runs"][3]["errorCode"] == "TOO_MANY_RUNS"
+
+
+def test_atomic_batch_creates_nothing_when_one_run_cannot_be_admitted(temp_store):
+    client = TestClient(build_app(temp_store))
+
+    response = client.post("/runs:batch?mode=atomic", json=[{"runId": f"run-{n}"} for n in range(4)])
+
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert [run["errorCode"] for run in response.json()["runs"]] == ["BATCH_ABORTED"] * 3 + ["TOO_MANY_RUNS"]
+    assert client.get("/runs/run-0").status_code == 404
+
+    accepted = client.post("/runs:batch?mode=atomic", json=[{}, {}])
+    assert accepted.status_code == 202
+    assert all(run["status"] == 202 for run in accepted.json()["runs"])
+
+
+def test_batch_size_is_limited(temp_store):
+    client = TestClient(build_app(temp_store, max_batch_runs=2))
+
+    assert client.post("/runs:batch", json=[{}, {}, {}]).status_code == 413
+    assert client.post("/runs:batch", json=[]).status_code == 422
@@ -0,0 +1,54 @@
+import pytest
+
+from agentrelay.config import AgentRelaySettings
+from agentrelay.services.event_log import RunEventLog
+from agentrelay.services.run_manager import RunManager
+from agentrelay.services.run_registry import RunContext, RunRegistry
+
+
+def _ctx(run_id, **kwargs):
+    return RunContext(run_id=run_id, log=RunEventLog(100, run_id=run_id), **kwargs)
+
+
+def test_registry_keeps_indexes_in_sync():
+    registry = RunRegistry()
+    first = _ctx("run-1", agent_id="describe", client_id="host")
+    second = _ctx("run-2", agent_id="describe", client_id="electron")
+    registry.add(first)
+    registry.add(second)
+
+    with pytest.raises(ValueError):
+        registry.add(_ctx("run-1"))
+    assert [ctx.run_id for ctx in registry.query(agent_id="describe")] == ["run-1", "run-2"]
+    assert registry.query(state="running") == []
+
+    registry.set_state(first, "running")
+    assert registry.query(state="running", agent_id="describe") == [first]
+    assert registry.query(state="queued", client_id="electron") == [second]
+
+    registry.remove("run-1")
+    assert registry.counts() == {
+        "queued": 1,
+        "running": 0,
+        "byAgent": {"describe": 1},
+        "byClient": {"electron": 1},
+    }
+
+
+@pytest.mark.asyncio
+async def test_run_manager_lists_runs_by_state_and_finalizes_without_extra_task(temp_store):
+    manager = RunManager(AgentRelaySettings(max_concurrent_runs=1), temp_store)
+
+    await manager.create_run("run-a", {"agentId": "describe", "clientId": "host"})
+    await manager.create_run("run-b", {"agentId": "chat"})
+
+    assert manager.list_runs(state="queued") == [{"runId": "run-b", "status": "queued", "agentId": "chat"}]
+    assert manager.list_runs(client_id="host") == [
+        {"runId": "run-a", "status": "running", "agentId": "describe", "clientId": "host"}
+    ]
+
+    [event async for event in manager.stream_events("run-b")]
+    # The done callback moves the run into retention directly.
+    assert manager.list_runs() == []
+    assert (await manager.get_run("run-b"))["status"] == "failed"
+    await manager.aclose()
@@ -0,0 +1,65 @@
+import pytest
+
+from agentrelay.config import AgentRelaySettings
+from agentrelay.services.client_pool import UpstreamClientPool
+from agentrelay.services.events import RunCompleted, RunDelta, RunStarted
+from agentrelay.services.run_manager import RunManager
+from agentrelay.services.run_retention import RetainedRun, RunRetentionStore
+
+
+def _record(run_id: str, text: str = "abc") -> RetainedRun:
+    events = [RunStarted(run_id)] + [RunDelta(run_id, char) for char in text] + [RunCompleted(run_id, text)]
+    for index, event in enumerate(events, start=1):
+        event.id = index
+    return RetainedRun.from_events(run_id, events, len(events))
+
+
+def test_retained_run_replays_compacted_deltas():
+    record = _record("run-1", "abc")
+
+    assert record.status == "completed"
+    assert [(event.event, event.id) for event in record.replay()] == [
+        ("run.started", 1),
+        ("run.delta", 4),
+        ("run.completed", 5),
+    ]
+    resumed = list(record.replay(last_event_id=2))
+    assert resumed[0].text == "bc"
+    assert resumed[0].id == 4
+
+
+def test_retention_store_evicts_lru_and_expired_runs():
+    first, second = _record("run-1"), _record("run-2")
+    store = RunRetentionStore(ttl_sec=60, max_bytes=first.size_bytes + second.size_bytes, sweep_interval_sec=1)
+    store.add(first)
+    store.add(second)
+    assert store.get("run-1") is first
+
+    store.add(_record("run-3"))
+    assert "run-2" not in store
+    assert "run-1" in store
+    assert store.stats()["evicted"] == 1
+
+    store.get("run-1").expires_at = 0
+    assert store.sweep() == 1
+    assert store.stats()["expired"] == 1
+
+
+@pytest.mark.asyncio
+async def test_finished_run_result_is_retained(temp_store, chat_stream_transport):
+    temp_store.set_deepseek_settings("sk-test", "https://mock-upstream/v1")
+    settings = AgentRelaySettings()
+    manager = RunManager(settings, temp_store, UpstreamClientPool(settings, transport=chat_stream_transport(["Hi", "!"])))
+
+    await manager.create_run("run-late", {"runId": "run-late"})
+    assert (await manager.get_run("run-late"))["status"] == "running"
+    await manager.create_run("run-other", {"runId": "run-other"})
+    _ = [event async for event in manager.stream_events("run-other")]
+
+    summary = await manager.get_run("run-late")
+    assert summary["status"] == "completed"
+    assert summary["response"] == "Hi!"
+    late = [event async for event in manager.stream_events("run-late")]
+    assert [event.event for event in late] == ["run.started", "run.delta", "run.completed"]
+    assert late[1].text == "Hi!"
+    await manager.aclose()
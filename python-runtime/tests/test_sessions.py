@@ -0,0 +1,101 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from agentrelay.app import create_app
+from agentrelay.config import AgentRelaySettings
+from agentrelay.services.client_pool import UpstreamClientPool
+from agentrelay.services.run_manager import RunManager
+from agentrelay.services.session_store import SessionBusyError, SessionStore
+
+
+def user(text):
+    return {"role": "user", "content": text}
+
+
+def test_turns_are_recorded_only_when_the_run_completes():
+    store = SessionStore(max_sessions=10, ttl_sec=60, token_budget=10_000)
+
+    sent = store.begin_turn("s", "run-1", [user("hi")], system={"role": "system", "content": "Be brief."})
+    assert sent == [{"role": "system", "content": "Be brief."}, user("hi")]
+    with pytest.raises(SessionBusyError):
+        store.begin_turn("s", "run-2", [user("again")])
+    store.end_turn("s", "run-1", "hello")
+
+    store.begin_turn("s", "run-2", [user("lost")])
+    store.end_turn("s", "run-2", None)
+    sent = store.begin_turn("s", "run-3", [user("next")])
+
+    assert [message["content"] for message in sent] == ["Be brief.", "hi", "hello", "next"]
+
+
+def test_history_is_truncated_in_stable_steps():
+    store = SessionStore(max_sessions=10, ttl_sec=60, token_budget=1000)
+    for turn in range(40):
+        sent = store.begin_turn("s", f"run-{turn}", [user("q" * 80)])
+        store.end_turn("s", f"run-{turn}", "a" * 80)
+        assert sent[0]["role"] == "user"
+        assert sum(len(message["content"]) // 4 + 4 for message in sent) <= 1000
+
+    # The window start moves in jumps, so most turns reuse the previous prefix.
+    assert 0 < store.stats()["truncated"] <= 8
+    assert store.get("s").summary()["droppedMessages"] > 40
+
+
+def test_sessions_are_evicted_by_lru_and_ttl(monkeypatch):
+    store = SessionStore(max_sessions=2, ttl_sec=60, token_budget=1000)
+    for session_id in ("a", "b", "c"):
+        store.begin_turn(session_id, f"run-{session_id}", [user("hi")])
+        store.end_turn(session_id, f"run-{session_id}", "ok")
+
+    assert "a" not in store and "b" in store and "c" in store
+
+    clock = store.get("b").last_used
+    monkeypatch.setattr("agentrelay.services.session_store.time.monotonic", lambda: clock + 61)
+    assert "b" not in store
+    assert store.stats()["evicted"] == 2
+
+
+@pytest.mark.asyncio
+async def test_session_runs_send_history_and_only_new_turns(temp_store, chat_stream_transport):
+    temp_store.set_deepseek_settings("sk-test", "https://mock-upstream/v1")
+    settings = AgentRelaySettings()
+    transport = chat_stream_transport(["Hel", "lo"])
+    manager = RunManager(settings, temp_store, UpstreamClientPool(settings, transport=transport))
+
+    for turn, text in enumerate(["Hi", "And again"]):
+        run_id = f"run-{turn}"
+        await manager.create_run(run_id, {"runId": run_id, "sessionId": "chat", "conversation": [user(text)]})
+        events = [event async for event in manager.stream_events(run_id)]
+        assert events[-1]["event"] == "run.completed"
+
+    sent = json.loads(chat_stream_transport.requests[-1].content)["messages"]
+    assert sent == [user("Hi"), {"role": "assistant", "content": "Hello"}, user("And again")]
+    assert manager.sessions.get("chat").summary()["messages"] == 4
+    await manager.aclose()
+
+
+def test_session_api_rejects_concurrent_turns(temp_store):
+    async def stalled_upstream(request):
+        await asyncio.sleep(30)
+
+    temp_store.set_deepseek_settings("sk-test", "https://mock-upstream/v1")
+    settings = AgentRelaySettings()
+    pool = UpstreamClientPool(settings, transport=httpx.MockTransport(stalled_upstream))
+    app = create_app(settings)
+    app.state.settings_store = temp_store
+    app.state.run_manager = RunManager(settings, temp_store, pool)
+    app.state.settings_config = settings
+    with TestClient(app) as client:
+        assert client.post("/runs", json={"sessionId": "chat", "conversation": [user("hi")]}).status_code == 202
+
+        conflict = client.post("/runs", json={"sessionId": "chat", "conversation": [user("again")]})
+        assert conflict.status_code == 409
+        assert conflict.json()["detail"]["errorCode"] == "SESSION_BUSY"
+        assert client.get("/sessions/chat").json()["activeRunId"] == conflict.json()["detail"]["runId"]
+
+        assert client.delete("/sessions/chat").status_code == 204
+        assert client.get("/sessions/chat").status_code == 404
@@ -1,3 +1,10 @@
+import json
+
+import pytest
+
+from agentrelay.services.settings_store import SettingsStore
+
+
 def test_settings_store_persists_base_and_key(temp_store):
     store = temp_store
     base_url = "https://mock-base"
@@ -14,3 +21,35 @@ def test_settings_store_persists_base_and_key(temp_store):
     resolved_after_clear = store.get_deepseek_settings(default_base="https://default")
     assert resolved_after_clear["apiKey"] is None
     assert resolved_after_clear["baseUrl"] == "https://default"
+
+
+def test_settings_store_notifies_and_picks_up_external_edits(tmp_path):
+    # Revalidate on every read instead of waiting for the interval.
+    store = SettingsStore(settings_dir=tmp_path, revalidate_interval=0.0)
+    seen = []
+    unsubscribe = store.subscribe(seen.append)
+
+    store.set_deepseek_settings("sk-one", None)
+    assert seen[-1]["deepseek"]["apiKey"] == "sk-one"
+    assert not list(store.settings_path.parent.glob(".settings-*.tmp"))
+
+    store.settings_path.write_text('{"deepseek": {"apiKey": "sk-external"}}', encoding="utf-8")
+    assert store.get_deepseek_api_key() == "sk-external"
+    assert seen[-1]["deepseek"]["apiKey"] == "sk-external"
+
+    unsubscribe()
+    store.set_deepseek_settings("sk-two", None)
+    assert len(seen) == 2
+
+
+@pytest.mark.asyncio
+async def test_settings_store_coalesces_saves_inside_event_loop(temp_store):
+    store = temp_store
+    for index in range(5):
+        store.set_deepseek_settings(f"sk-{index}", None)
+
+    assert store.get_deepseek_api_key() == "sk-4"
+    assert not store.settings_path.exists()
+
+    store.flush()
+    assert json.loads(store.settings_path.read_text(encoding="utf-8"))["deepseek"]["apiKey"] == "sk-4"
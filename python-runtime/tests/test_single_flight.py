@@ -0,0 +1,132 @@
+import asyncio
+import json
+
+import pytest
+
+from agentrelay.config import AgentRelaySettings
+from agentrelay.services.client_pool import UpstreamClientPool
+from agentrelay.services.run_manager import RunManager
+
+
+def _manager(temp_store, transport, **overrides):
+    temp_store.set_deepseek_settings("sk-test", "https://mock-upstream/v1")
+    settings = AgentRelaySettings(**overrides)
+    return RunManager(settings, temp_store, UpstreamClientPool(settings, transport=transport))
+
+
+PAYLOAD = {"conversation": [{"role": "user", "content": "Hi"}], "constraints": {"temperature": 0}}
+
+
+@pytest.mark.asyncio
+async def test_identical_runs_share_one_upstream_stream(
+    temp_store, chat_stream_transport, wait_for, collect_events
+):
+    gate = asyncio.Event()
+    manager = _manager(temp_store, chat_stream_transport(["Hel", gate, "lo"]))
+    requests = chat_stream_transport.requests
+
+    await manager.create_run("run-1", PAYLOAD)
+    await wait_for(lambda: requests)
+    await manager.create_run("run-2", PAYLOAD)
+    gate.set()
+
+    first = await collect_events(manager, "run-1")
+    second = await collect_events(manager, "run-2")
+
+    assert len(requests) == 1
+    for events in (first, second):
+        completed = json.loads(events[-1]["data"])
+        assert events[-1]["event"] == "run.completed"
+        assert completed["response"] == "Hello"
+    assert json.loads(second[-1]["data"])["runId"] == "run-2"
+    assert json.loads(second[-1]["data"])["metadata"]["deduplicated"] is True
+    assert manager.stats()["singleFlight"]["deduplicated"] == 1
+    await manager.aclose()
+
+
+@pytest.mark.asyncio
+async def test_upstream_stops_only_after_every_attached_run_cancels(
+    temp_store, chat_stream_transport, wait_for, collect_events
+):
+    gate = asyncio.Event()
+    manager = _manager(temp_store, chat_stream_transport(["Hel", gate, "lo"]))
+    requests = chat_stream_transport.requests
+
+    await manager.create_run("run-1", PAYLOAD)
+    await wait_for(lambda: requests)
+    await manager.create_run("run-2", PAYLOAD)
+    await manager.create_run("run-3", PAYLOAD)
+
+    await manager.cancel_run("run-1")
+    gate.set()
+    first = await collect_events(manager, "run-1")
+    second = await collect_events(manager, "run-2")
+    assert first[-1]["event"] == "run.cancelled"
+    assert second[-1]["event"] == "run.completed"
+    assert len(requests) == 1
+    await manager.aclose()
+
+
+@pytest.mark.asyncio
+async def test_a_cancelled_originator_keeps_its_slot_while_a_joiner_streams(
+    temp_store, chat_stream_transport, wait_for, collect_events
+):
+    gate = asyncio.Event()
+    manager = _manager(temp_store, chat_stream_transport(["Hel", gate, "lo"]), max_concurrent_runs=1)
+    await manager.create_run("run-1", PAYLOAD)
+    await wait_for(lambda: chat_stream_transport.requests)
+    await manager.create_run("run-2", PAYLOAD)
+    available = manager.admission.available()
+    assert manager.admission.active == 1
+
+    await manager.cancel_run("run-1")
+    assert (await collect_events(manager, "run-1"))[-1]["event"] == "run.cancelled"
+    assert manager.admission.available() == available
+    assert manager.admission.active == 1
+
+    gate.set()
+    assert (await collect_events(manager, "run-2"))[-1]["event"] == "run.completed"
+    await wait_for(lambda: manager.admission.available() == available + 1)
+    await manager.aclose()
+
+
+@pytest.mark.asyncio
+async def test_last_cancel_closes_upstream(
+    temp_store, chat_stream_transport, wait_for, collect_events
+):
+    gate = asyncio.Event()
+    manager = _manager(temp_store, chat_stream_transport(["Hel", gate, "lo"]))
+    requests, closed = chat_stream_transport.requests, chat_stream_transport.closed
+
+    await manager.create_run("run-1", PAYLOAD)
+    await wait_for(lambda: requests)
+    await manager.create_run("run-2", PAYLOAD)
+    await manager.cancel_run("run-1")
+    await manager.cancel_run("run-2")
+    await wait_for(lambda: manager.stats()["singleFlight"]["inFlight"] == 0)
+    await wait_for(lambda: closed)
+
+    events = await collect_events(manager, "run-2")
+    assert events[-1]["event"] == "run.cancelled"
+    await manager.aclose()
+
+
+@pytest.mark.asyncio
+async def test_a_stalled_subscriber_pauses_the_upstream_read(temp_store, chat_stream_transport, wait_for):
+    transport = chat_stream_transport([f"token {index} " for index in range(2000)])
+    manager = _manager(
+        temp_store, transport, slow_consumer_policy="block", run_buffer_max_bytes=1024, upstream_read_ahead_chunks=8
+    )
+    await manager.create_run("run-1", PAYLOAD)
+    events = manager.stream_events("run-1")
+    await anext(events)  # subscribed, then never reads again
+
+    await wait_for(lambda: chat_stream_transport.frames_sent > 0)
+    await asyncio.sleep(0.1)
+    paused_at = chat_stream_transport.frames_sent
+    await asyncio.sleep(0.1)
+
+    assert chat_stream_transport.frames_sent == paused_at
+    assert paused_at < 200
+    await events.aclose()
+    await manager.aclose()
@@ -0,0 +1,57 @@
+import subprocess
+import sys
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from agentrelay.app import create_app
+from agentrelay.config import AgentRelaySettings
+from agentrelay.startup import ImportProfiler, StartupProfile, format_report
+
+RUNTIME_DIR = Path(__file__).resolve().parents[1]
+
+
+def test_importing_the_app_does_not_load_upstream_client_libraries():
+    probe = "import sys, agentrelay.app; print(sorted(m for m in ('openai', 'httpx', 'langgraph') if m in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-c", probe], cwd=RUNTIME_DIR, capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == "[]"
+
+
+def test_import_profiler_records_cumulative_and_self_time(tmp_path, monkeypatch):
+    (tmp_path / "startup_probe_outer.py").write_text("import time\nimport startup_probe_inner\ntime.sleep(0.01)\n")
+    (tmp_path / "startup_probe_inner.py").write_text("import time\ntime.sleep(0.02)\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    for name in ("startup_probe_outer", "startup_probe_inner"):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+
+    profiler = ImportProfiler()
+    profiler.install()
+    try:
+        import startup_probe_outer  # noqa: F401
+    finally:
+        profiler.uninstall()
+
+    timings = profiler.timings()
+    outer_total, outer_self = timings["startup_probe_outer"]
+    inner_total, _ = timings["startup_probe_inner"]
+    assert inner_total >= 0.02
+    assert outer_total >= outer_self + inner_total - 1e-6
+    assert profiler.report(1)[0][0] == "startup_probe_inner"
+    assert "startup_probe_inner" in format_report(StartupProfile(), profiler)
+
+
+def test_status_reports_startup_phases_after_warm_up(temp_store):
+    reports = []
+    profile = StartupProfile(on_complete=reports.append)
+    app = create_app(AgentRelaySettings(data_dir=temp_store.data_dir), startup_profile=profile)
+
+    with TestClient(app) as client:
+        app.state.settings_store = temp_store
+        startup = client.get("/status").json()["metadata"]["startup"]
+        assert {"create_app", "server_start"} <= set(startup["phasesMs"])
+
+    # Shutdown waits for the background warm-up, which completes the profile.
+    assert reports == [profile]
+    assert "warm_up" in profile.phases
@@ -0,0 +1,162 @@
+import asyncio
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from agentrelay.app import create_app
+from agentrelay.config import AgentRelaySettings
+from agentrelay.services.client_pool import UpstreamClientPool
+from agentrelay.services.run_manager import RunManager
+from agentrelay.services.tool_calls import ToolCallClosedError, tool_message, tool_specs
+
+TOOLS = [{"id": "fs.read", "timeoutSec": 5}, {"id": "web.fetch"}]
+
+
+# Two tool calls streamed as interleaved fragments, as the upstream does.
+TOOL_CALL_DELTAS = [
+    {"tool_calls": [{"index": 0, "id": "call-a", "type": "function", "function": {"name": "fs_read", "arguments": ""}}]},
+    {"tool_calls": [{"index": 1, "id": "call-b", "type": "function", "function": {"name": "web_fetch", "arguments": ""}}]},
+    {"tool_calls": [{"index": 0, "function": {"arguments": '{"path": '}}]},
+    {"tool_calls": [{"index": 1, "function": {"arguments": '{"url": "x"}'}}]},
+    {"tool_calls": [{"index": 0, "function": {"arguments": '"a.txt"}'}}]},
+]
+
+
+def build_manager(temp_store, chat_stream_transport, rounds=None, **overrides):
+    """A manager whose upstream asks for ``rounds`` of tool calls, then answers "Done."."""
+    temp_store.set_deepseek_settings("sk-test", "https://mock-upstream/v1")
+    settings = AgentRelaySettings(**overrides)
+    responses = [(deltas, "tool_calls") for deltas in rounds or [TOOL_CALL_DELTAS]] + [(["Done."], "stop")]
+    transport = chat_stream_transport(responses=responses)
+    return RunManager(settings, temp_store, UpstreamClientPool(settings, transport=transport))
+
+
+def sent_bodies(chat_stream_transport):
+    return [json.loads(request.content) for request in chat_stream_transport.requests]
+
+
+async def next_event(events, name):
+    while True:
+        event = await asyncio.wait_for(events.__anext__(), 2)
+        if event.event == name:
+            return event.payload()
+
+
+def test_tool_specs_sanitize_names_and_tool_messages_truncate_output():
+    specs = tool_specs([{"id": "fs.read", "description": "Read a file"}])
+
+    assert specs["fs_read"].tool_id == "fs.read"
+    assert specs["fs_read"].declaration()["function"]["description"] == "Read a file"
+    message = tool_message("call-1", {"status": "ok", "stdout": "x" * 300, "stderr": None}, max_chars=256)
+    content = json.loads(message["content"])
+    assert message["role"] == "tool" and "stderr" not in content
+    assert content["stdout"].endswith("[truncated 44 characters]")
+
+
+def test_tool_specs_keep_tools_whose_names_collide():
+    specs = tool_specs([{"id": "fs.read"}, {"id": "fs:read"}, {"id": "x" * 70}, {"id": "x" * 64 + "-other"}])
+
+    assert len(specs) == 4
+    assert [spec.tool_id for spec in specs.values()] == ["fs.read", "fs:read", "x" * 70, "x" * 64 + "-other"]
+    assert all(len(name) <= 64 and name == spec.name for name, spec in specs.items())
+    assert specs["fs_read"].tool_id == "fs.read"
+
+
+@pytest.mark.asyncio
+async def test_tool_calls_are_dispatched_together_and_results_sent_back(temp_store, chat_stream_transport):
+    manager = build_manager(temp_store, chat_stream_transport)
+    await manager.create_run("run-1", {"conversation": [{"role": "user", "content": "Go"}], "toolInventory": TOOLS})
+    events = manager.stream_events("run-1")
+
+    first = await next_event(events, "run.tool_call")
+    second = await next_event(events, "run.tool_call")
+    # Both calls are out before either result arrives.
+    assert (first["toolId"], first["arguments"], first["timeoutSec"]) == ("fs.read", {"path": "a.txt"}, 5)
+    assert (second["toolId"], second["timeoutSec"]) == ("web.fetch", 60.0)
+
+    manager.report_tool_progress("run-1", "call-b", "fetching")
+    assert (await next_event(events, "run.tool_progress"))["streamChunk"] == "fetching"
+    manager.submit_tool_result("run-1", "call-b", {"status": "ok", "stdout": "page"})
+    manager.submit_tool_result("run-1", "call-a", {"status": "ok", "stdout": "file"})
+    with pytest.raises(ToolCallClosedError):
+        manager.submit_tool_result("run-1", "call-a", {"status": "ok"})
+
+    completed = await next_event(events, "run.completed")
+    assert completed["response"] == "Done."
+    assert completed["metadata"]["toolRounds"] == 1
+    requests = sent_bodies(chat_stream_transport)
+    assert [tool["function"]["name"] for tool in requests[0]["tools"]] == ["fs_read", "web_fetch"]
+    replayed = requests[1]["messages"]
+    assert replayed[1]["tool_calls"][0]["function"]["arguments"] == '{"path": "a.txt"}'
+    assert [(message["tool_call_id"], json.loads(message["content"])["stdout"]) for message in replayed[2:]] == [
+        ("call-a", "file"),
+        ("call-b", "page"),
+    ]
+    await manager.aclose()
+
+
+@pytest.mark.asyncio
+async def test_tool_call_ids_may_be_reused_in_a_later_round(temp_store, chat_stream_transport):
+    manager = build_manager(temp_store, chat_stream_transport, rounds=[TOOL_CALL_DELTAS[:1], TOOL_CALL_DELTAS[:1]])
+    await manager.create_run("run-1", {"toolInventory": TOOLS})
+    events = manager.stream_events("run-1")
+
+    for stdout in ("first", "second"):
+        assert (await next_event(events, "run.tool_call"))["toolCallId"] == "call-a"
+        manager.submit_tool_result("run-1", "call-a", {"status": "ok", "stdout": stdout})
+
+    completed = await next_event(events, "run.completed")
+    assert completed["metadata"]["toolRounds"] == 2
+    results = [message for message in sent_bodies(chat_stream_transport)[2]["messages"] if message["role"] == "tool"]
+    assert [json.loads(message["content"])["stdout"] for message in results] == ["first", "second"]
+    await manager.aclose()
+
+
+@pytest.mark.asyncio
+async def test_max_tool_concurrency_limits_dispatch(temp_store, chat_stream_transport):
+    manager = build_manager(temp_store, chat_stream_transport)
+    payload = {"toolInventory": TOOLS, "constraints": {"maxToolConcurrency": 1}}
+    await manager.create_run("run-1", payload)
+    events = manager.stream_events("run-1")
+
+    assert (await next_event(events, "run.tool_call"))["toolCallId"] == "call-a"
+    await asyncio.sleep(0.05)
+    assert [event.event for event in manager._runs.get("run-1").log.since(None)].count("run.tool_call") == 1
+
+    manager.submit_tool_result("run-1", "call-a", {"status": "ok"})
+    assert (await next_event(events, "run.tool_call"))["toolCallId"] == "call-b"
+    manager.submit_tool_result("run-1", "call-b", {"status": "error", "exitCode": 1})
+    assert (await next_event(events, "run.completed"))["response"] == "Done."
+    assert manager.metrics.summary()["toolCalls"] == {"ok": 1, "error": 1}
+    await manager.aclose()
+
+
+def test_stragglers_time_out_and_late_results_are_gone(temp_store, chat_stream_transport):
+    manager = build_manager(temp_store, chat_stream_transport)
+    app = create_app(manager._settings)
+    app.state.settings_store = temp_store
+    app.state.run_manager = manager
+    app.state.settings_config = manager._settings
+    tools = [{"id": "fs.read", "timeoutSec": 1}, {"id": "web.fetch"}]
+    with TestClient(app) as client:
+        run_id = client.post("/runs", json={"toolInventory": tools}).json()["runId"]
+        time.sleep(1.2)
+
+        late = client.post(f"/runs/{run_id}/tools/call-a", json={"status": "ok"})
+        assert late.status_code == 410
+        assert late.json()["detail"]["errorCode"] == "TOOL_TIMEOUT"
+        assert client.post(f"/runs/{run_id}/tools/call-b/progress", json={"streamChunk": "..."}).status_code == 202
+        assert client.post(f"/runs/{run_id}/tools/call-b", json={"status": "ok", "stdout": "page"}).status_code == 200
+
+        events = client.get(f"/runs/{run_id}/events").text
+        assert "event: run.tool_progress" in events and "event: run.completed" in events
+        assert client.post(f"/runs/{run_id}/tools/call-b", json={"status": "ok"}).json()["detail"]["errorCode"] == "RUN_FINISHED"
+        assert client.post(f"/runs/{run_id}/tools/call-c", json={"status": "ok"}).status_code == 410
+        assert client.post("/runs/missing/tools/call-b", json={"status": "ok"}).status_code == 404
+
+    messages = sent_bodies(chat_stream_transport)[1]["messages"]
+    results = [json.loads(message["content"]) for message in messages if message["role"] == "tool"]
+    assert results == [{"status": "timeout", "errorCode": "TOOL_TIMEOUT"}, {"status": "ok", "stdout": "page"}]
+    assert manager.metrics.summary()["toolCalls"] == {"timeout": 1, "ok": 1}
@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+from agentrelay.config import AgentRelaySettings
+from agentrelay.services.client_pool import UpstreamClientPool
+from agentrelay.services.run_manager import RunManager
+
+USAGE = {
+    "prompt_tokens": 120,
+    "completion_tokens": 2,
+    "total_tokens": 122,
+    "prompt_cache_hit_tokens": 96,
+    "prompt_cache_miss_tokens": 24,
+}
+
+
+def user(text):
+    return {"role": "user", "content": text}
+
+
+async def run_to_end(manager, run_id, payload):
+    await manager.create_run(run_id, payload)
+    return [event async for event in manager.stream_events(run_id)]
+
+
+@pytest.mark.asyncio
+async def test_usage_is_reported_per_run_and_counted(temp_store, chat_stream_transport):
+    temp_store.set_deepseek_settings("sk-test", "https://mock-upstream/v1")
+    settings = AgentRelaySettings()
+    transport = chat_stream_transport(["Hel", "lo"], usage=USAGE)
+    manager = RunManager(settings, temp_store, UpstreamClientPool(settings, transport=transport))
+
+    events = await run_to_end(manager, "run-1", {"conversation": [user("Hi")]})
+
+    assert json.loads(chat_stream_transport.requests[0].content)["stream_options"] == {"include_usage": True}
+    completed = json.loads(events[-1]["data"])
+    assert completed["response"] == "Hello"
+    assert completed["metadata"]["usage"] == {"promptTokens": 120, "completionTokens": 2, "cachedPromptTokens": 96}
+    assert 'agentrelay_upstream_tokens_total{kind="cached_prompt"} 96' in manager.render_metrics()
+    assert manager.metrics.summary()["upstreamTokens"] == {"prompt": 120, "completion": 2, "cached_prompt": 96}
+    await manager.aclose()
+
+
+@pytest.mark.asyncio
+async def test_openai_style_cached_tokens_and_opting_out(temp_store, chat_stream_transport):
+    temp_store.set_deepseek_settings("sk-test", "https://mock-upstream/v1")
+    usage = {"prompt_tokens": 50, "completion_tokens": 1, "total_tokens": 51, "prompt_tokens_details": {"cached_tokens": 32}}
+    settings = AgentRelaySettings(upstream_include_usage=False)
+    transport = chat_stream_transport(["ok"], usage=usage)
+    manager = RunManager(settings, temp_store, UpstreamClientPool(settings, transport=transport))
+
+    events = await run_to_end(manager, "run-1", {"conversation": [user("Hi")]})
+
+    assert "stream_options" not in json.loads(chat_stream_transport.requests[0].content)
+    assert json.loads(events[-1]["data"])["metadata"]["usage"]["cachedPromptTokens"] == 32
+    await manager.aclose()
+
+
+@pytest.mark.asyncio
+async def test_each_turn_repeats_the_previous_request_as_a_prefix(temp_store, chat_stream_transport):
+    temp_store.set_deepseek_settings("sk-test", "https://mock-upstream/v1")
+    settings = AgentRelaySettings()
+    transport = chat_stream_transport(["Hello"])
+    manager = RunManager(settings, temp_store, UpstreamClientPool(settings, transport=transport))
+
+    conversation = [user("Hi")]
+    await run_to_end(manager, "plain-1", {"prompt": "Be brief.", "conversation": conversation})
+    conversation = conversation + [{"role": "assistant", "content": "Hello", "name": "bot"}, user("More")]
+    await run_to_end(manager, "plain-2", {"prompt": "Be brief.", "conversation": conversation})
+    for turn, text in enumerate(["Hi", "More"]):
+        payload = {"prompt": "Be brief.", "sessionId": "chat", "conversation": [user(text)]}
+        await run_to_end(manager, f"session-{turn}", payload)
+
+    bodies = [json.dumps(json.loads(request.content)["messages"]) for request in chat_stream_transport.requests]
+    assert bodies[1].startswith(bodies[0][:-1])
+    assert bodies[2:] == bodies[:2]
+    await manager.aclose()
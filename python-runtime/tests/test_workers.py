@@ -0,0 +1,139 @@
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+
+from agentrelay.app import create_app
+from agentrelay.config import AgentRelaySettings
+from agentrelay.services.metrics import RunMetrics, merge_expositions
+from agentrelay.services.workers import WorkerRouter, WorkerTopology, merge_counts
+
+RUNTIME_DIR = Path(__file__).resolve().parents[1]
+ENDPOINTS = ("http://worker-0", "http://worker-1")
+
+
+def _run_id_owned_by(topology: WorkerTopology, index: int, prefix: str = "run") -> str:
+    return next(f"{prefix}-{n}" for n in range(100) if topology.owner(f"{prefix}-{n}") == index)
+
+
+def test_topology_routes_runs_by_stable_hash():
+    first = WorkerTopology(index=0, endpoints=ENDPOINTS)
+    second = WorkerTopology(index=1, endpoints=ENDPOINTS)
+
+    assert {first.owner(f"run-{n}") for n in range(20)} == {0, 1}
+    assert all(first.owner(f"run-{n}") == second.owner(f"run-{n}") for n in range(20))
+    assert all(second.is_local(second.new_run_id()) for _ in range(10))
+    assert first.peers() == [1]
+
+
+def test_stats_and_expositions_merge_by_summing():
+    merged = merge_counts(
+        [
+            {"activeRuns": 1, "registry": {"byAgent": {"a": 1}}, "http2": False},
+            {"activeRuns": 2, "registry": {"byAgent": {"b": 3}}, "http2": False},
+        ]
+    )
+    assert merged == {"activeRuns": 3, "registry": {"byAgent": {"a": 1, "b": 3}}, "http2": False}
+
+    text = "# TYPE x counter\nx 1\ny_bucket{le=\"+Inf\"} 2\n"
+    assert merge_expositions([text, text]) == "# TYPE x counter\nx 2\ny_bucket{le=\"+Inf\"} 4\n"
+
+
+def test_merged_exposition_keeps_late_label_values_in_their_family():
+    parser = pytest.importorskip("prometheus_client.parser")
+    first = RunMetrics()
+    first.runs_finished.inc(label="completed")
+    first.duration.observe(0.2)
+    second = RunMetrics()
+    second.runs_finished.inc(label="completed")
+    second.runs_finished.inc(label="failed")
+    second.duration.observe(3.0)
+
+    merged = merge_expositions([first.render({"agentrelay_active_runs": ("Runs.", 1)}), second.render()])
+    families = {family.name: family for family in parser.text_string_to_metric_families(merged)}
+
+    finished = {sample.labels["status"]: sample.value for sample in families["agentrelay_runs_finished"].samples}
+    assert finished == {"completed": 2, "failed": 1}
+    duration = {sample.name: sample.value for sample in families["agentrelay_run_duration_seconds"].samples}
+    assert duration["agentrelay_run_duration_seconds_count"] == 2
+    assert duration["agentrelay_run_duration_seconds_sum"] == 3.2
+    assert families["agentrelay_active_runs"].samples[0].value == 1
+
+
+@pytest.mark.asyncio
+async def test_requests_are_forwarded_to_the_owning_worker(tmp_path):
+    settings = AgentRelaySettings(data_dir=tmp_path)
+    apps = [create_app(settings, worker_topology=WorkerTopology(index, ENDPOINTS)) for index in range(2)]
+    for index, app in enumerate(apps):
+        peer = 1 - index
+        app.state.worker_router = WorkerRouter(app.state.worker_router.topology, {peer: httpx.ASGITransport(apps[peer])})
+
+    topology = apps[0].state.worker_router.topology
+    remote_run = _run_id_owned_by(topology, 1)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(apps[0]), base_url="http://front") as client:
+        created = await client.post("/runs", json={"runId": remote_run, "agentId": "describe"})
+        assert created.status_code == 202
+        assert created.headers["location"] == f"/runs/{remote_run}/events"
+        local = (await client.post("/runs", json={})).json()["runId"]
+        assert topology.is_local(local)
+        batch = await client.post("/runs:batch", json=[{"runId": _run_id_owned_by(topology, 1, "batch")}, {}])
+        assert [run["status"] for run in batch.json()["runs"]] == [202, 202]
+        session = _run_id_owned_by(topology, 1, "session")
+        in_session = await client.post("/runs", json={"sessionId": session})
+        assert topology.owner(in_session.json()["runId"]) == 1
+        assert (await client.get(f"/sessions/{session}")).status_code == 200
+        assert (await client.post("/runs", json={"runId": local, "sessionId": session})).status_code == 400
+
+        events = await client.get(f"/runs/{remote_run}/events")
+        assert "event: run.failed" in events.text
+        assert (await client.get(f"/runs/{remote_run}")).json()["status"] == "failed"
+        assert (await client.get("/runs/run-missing")).status_code == 404
+
+        metadata = (await client.get("/status")).json()["metadata"]
+        assert metadata["workers"]["count"] == 2
+        assert [worker["index"] for worker in metadata["workers"]["perWorker"]] == [0, 1]
+        assert metadata["workers"]["reachable"] == 2
+        assert "agentrelay_runs_started_total 5" in (await client.get("/metrics")).text
+
+    assert remote_run in apps[1].state.run_manager._retention
+    for app in apps:
+        await app.state.run_manager.aclose()
+        await app.state.worker_router.aclose()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_workers_mode_serves_runs_from_every_process(tmp_path):
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, "entrypoint.py", "--port", str(port), "--workers", "2", "--data-dir", str(tmp_path)],
+        cwd=RUNTIME_DIR,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+    try:
+        assert process.stdout.readline().strip() == f"AGENTRELAY READY {port}"
+        topology = WorkerTopology(index=0, endpoints=ENDPOINTS)
+        base = f"http://127.0.0.1:{port}"
+        for index in range(2):
+            run_id = _run_id_owned_by(topology, index)
+            assert httpx.post(f"{base}/runs", json={"runId": run_id}).status_code == 202
+            for _ in range(50):
+                if httpx.get(f"{base}/runs/{run_id}").json()["status"] == "failed":
+                    break
+                time.sleep(0.05)
+            else:
+                pytest.fail(f"{run_id} did not finish")
+        assert httpx.get(f"{base}/status").json()["metadata"]["workers"]["reachable"] == 2
+    finally:
+        process.terminate()
+        process.wait(timeout=15)
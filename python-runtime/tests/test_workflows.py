@@ -0,0 +1,93 @@
+import json
+from typing import Annotated, TypedDict
+
+import pytest
+from langgraph.graph import END, START, StateGraph
+from langgraph.graph.message import add_messages
+
+from agentrelay.config import AgentRelaySettings
+from agentrelay.services.run_manager import RunManager
+from agentrelay.workflows import WorkflowNotFoundError, WorkflowRegistry, WorkflowUnavailableError
+
+builds = []
+
+
+class State(TypedDict):
+    messages: Annotated[list, add_messages]
+    response: str
+
+
+def build_echo():
+    """Two nodes: ``count`` reports how many messages the thread holds, ``reply`` answers."""
+    builds.append("echo")
+    graph = StateGraph(State)
+    graph.add_node("count", lambda state: {"response": f"seen {len(state['messages'])}"})
+    graph.add_node("reply", lambda state: {"messages": [{"role": "assistant", "content": state["response"]}]})
+    graph.add_edge(START, "count")
+    graph.add_edge("count", "reply")
+    graph.add_edge("reply", END)
+    return graph
+
+
+def user(text):
+    return {"role": "user", "content": text}
+
+
+async def run_to_end(manager, run_id, payload):
+    await manager.create_run(run_id, payload)
+    return [event async for event in manager.stream_events(run_id)]
+
+
+def test_graphs_compile_once_per_etag():
+    builds.clear()
+    registry = WorkflowRegistry("v1")
+    registry.register("echo", build_echo)
+
+    assert registry.get("echo", "v1") is registry.get("echo", "v1")
+    assert len(builds) == 1
+    registry.get("echo", "v2")
+    registry.register("echo", build_echo)
+    registry.get("echo", "v2")
+    assert len(builds) == 3
+    assert registry.stats()["cacheHits"] == 1
+
+    with pytest.raises(WorkflowNotFoundError):
+        registry.get("missing", "v2")
+    registry.register("broken", "agentrelay_no_such_module:build")
+    with pytest.raises(WorkflowUnavailableError):
+        registry.get("broken", "v2")
+
+
+@pytest.mark.asyncio
+async def test_workflow_runs_stream_node_outputs(temp_store):
+    settings = AgentRelaySettings(workflows={"echo": f"{__name__}:build_echo"})
+    manager = RunManager(settings, temp_store)
+
+    events = await run_to_end(manager, "run-1", {"agentId": "echo", "conversation": [user("hi")]})
+
+    assert [event.event for event in events] == ["run.started", "run.node_output", "run.node_output", "run.completed"]
+    assert json.loads(events[1].data) == {"runId": "run-1", "node": "count", "output": {"response": "seen 1"}}
+    completed = json.loads(events[-1].data)
+    assert completed["response"] == "seen 1"
+    assert completed["metadata"]["workflow"] == {"agentId": "echo", "nodes": 2}
+    # Threads of runs without a session are dropped with the run.
+    assert manager.stats()["workflows"]["threads"] == 0
+    await manager.aclose()
+
+
+@pytest.mark.asyncio
+async def test_session_checkpoints_survive_a_restart(temp_store):
+    settings = AgentRelaySettings(workflow_checkpoint_persist=True)
+    manager = RunManager(settings, temp_store)
+    manager.workflows.register("echo", build_echo)
+    await run_to_end(manager, "run-1", {"agentId": "echo", "sessionId": "chat", "conversation": [user("hi")]})
+    events = await run_to_end(manager, "run-2", {"agentId": "echo", "sessionId": "chat", "conversation": [user("more")]})
+    assert json.loads(events[-1].data)["response"] == "seen 3"
+    await manager.aclose()
+
+    restarted = RunManager(settings, temp_store)
+    restarted.workflows.register("echo", build_echo)
+    events = await run_to_end(restarted, "run-3", {"agentId": "echo", "sessionId": "chat", "conversation": [user("again")]})
+
+    assert json.loads(events[-1].data)["response"] == "seen 5"
+    await restarted.aclose()